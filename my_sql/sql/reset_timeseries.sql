@@ -0,0 +1,3 @@
+DROP TABLE IF EXISTS `%(schema_name)s`.`thsensor_readings`;
+DROP TABLE IF EXISTS `%(schema_name)s`.`watermetercontroller_readings`;
+DROP TABLE IF EXISTS `%(schema_name)s`.`sensor_readings`;
\ No newline at end of file
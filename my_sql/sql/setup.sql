@@ -1,16 +1,18 @@
 CREATE TABLE IF NOT EXISTS `%(schema_name)s`.devices (
-  device_id INT NOT NULL,
+  device_id INT NOT NULL AUTO_INCREMENT,
+  device_uid VARCHAR(32) NOT NULL,
   device_type_id INT NOT NULL,
   device_name VARCHAR(60) NOT NULL,
-  PRIMARY KEY (device_id)
+  PRIMARY KEY (device_id),
+  UNIQUE INDEX device_uid_idx (device_uid ASC)
 ) ENGINE = InnoDB;
 
 CREATE TABLE IF NOT EXISTS `%(schema_name)s`.events (
-  event_id INT NOT NULL,
+  event_id BIGINT NOT NULL AUTO_INCREMENT,
   event_source_device_id INT NOT NULL,
   event_timestamp VARCHAR(45) NOT NULL,
   PRIMARY KEY (event_id),
-  INDEX event_source_device_id_idx (event_source_device_id ASC),
+  UNIQUE INDEX event_source_timestamp_idx (event_source_device_id ASC, event_timestamp ASC),
   CONSTRAINT event_source_device_id
     FOREIGN KEY (event_source_device_id)
     REFERENCES %(schema_name)s.devices (device_id)
@@ -19,8 +21,8 @@ CREATE TABLE IF NOT EXISTS `%(schema_name)s`.events (
 ) ENGINE = InnoDB;
 
 CREATE TABLE IF NOT EXISTS `%(schema_name)s`.data (
-  data_id INT NOT NULL,
-  event_id INT NOT NULL,
+  data_id BIGINT NOT NULL AUTO_INCREMENT,
+  event_id BIGINT NOT NULL,
   data_name VARCHAR(45) NOT NULL,
   data_value VARCHAR(45) NOT NULL,
   PRIMARY KEY (data_id),
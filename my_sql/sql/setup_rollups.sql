@@ -0,0 +1,19 @@
+CREATE TABLE IF NOT EXISTS `%(schema_name)s`.rollups (
+  device_uid VARCHAR(32) NOT NULL,
+  field VARCHAR(64) NOT NULL,
+  resolution INT NOT NULL,
+  bucket_start DATETIME NOT NULL,
+  min_value DOUBLE NOT NULL,
+  max_value DOUBLE NOT NULL,
+  sum_value DOUBLE NOT NULL,
+  value_count INT NOT NULL,
+  last_value DOUBLE NOT NULL,
+  last_at DATETIME(3) NOT NULL,
+  PRIMARY KEY (device_uid, field, resolution, bucket_start)
+) ENGINE = InnoDB;
+
+CREATE TABLE IF NOT EXISTS `%(schema_name)s`.rollup_watermarks (
+  device_uid VARCHAR(32) NOT NULL,
+  rolled_up_to DATETIME(3) NOT NULL,
+  PRIMARY KEY (device_uid)
+) ENGINE = InnoDB;
@@ -0,0 +1,44 @@
+CREATE TABLE IF NOT EXISTS `%(schema_name)s`.thsensor_readings (
+  device_id VARCHAR(32) NOT NULL,
+  reported_at DATETIME(3) NOT NULL,
+  temperature FLOAT NULL,
+  humidity FLOAT NULL,
+  dew_point FLOAT NULL,
+  PRIMARY KEY (device_id, reported_at)
+) ENGINE = InnoDB
+PARTITION BY RANGE (TO_DAYS(reported_at)) (
+  PARTITION p_history VALUES LESS THAN (TO_DAYS('2024-01-01')),
+  PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+CREATE TABLE IF NOT EXISTS `%(schema_name)s`.watermetercontroller_readings (
+  device_id VARCHAR(32) NOT NULL,
+  reported_at DATETIME(3) NOT NULL,
+  meter INT NULL,
+  daily_usage INT NULL,
+  water_flowing BOOLEAN NULL,
+  valve VARCHAR(8) NULL,
+  leak BOOLEAN NULL,
+  freeze_error BOOLEAN NULL,
+  temperature FLOAT NULL,
+  battery TINYINT NULL,
+  PRIMARY KEY (device_id, reported_at)
+) ENGINE = InnoDB
+PARTITION BY RANGE (TO_DAYS(reported_at)) (
+  PARTITION p_history VALUES LESS THAN (TO_DAYS('2024-01-01')),
+  PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+CREATE TABLE IF NOT EXISTS `%(schema_name)s`.sensor_readings (
+  device_id VARCHAR(32) NOT NULL,
+  reported_at DATETIME(3) NOT NULL,
+  device_type VARCHAR(20) NOT NULL,
+  state VARCHAR(16) NULL,
+  online BOOLEAN NULL,
+  battery TINYINT NULL,
+  PRIMARY KEY (device_id, reported_at)
+) ENGINE = InnoDB
+PARTITION BY RANGE (TO_DAYS(reported_at)) (
+  PARTITION p_history VALUES LESS THAN (TO_DAYS('2024-01-01')),
+  PARTITION p_future VALUES LESS THAN MAXVALUE
+);
\ No newline at end of file
@@ -1,52 +1,308 @@
 import json
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
 import mysql.connector
-from Interfaces.Database import Database
+from Interfaces.Database import Database, WriteRejected
+from Interfaces.Responses.Response import MethodNames
 from collections import OrderedDict
 import mysql
 
 from Interfaces.Credentials.MySQLCredentials import MySQLCredentials
+from Interfaces.Data.Event import Event, to_report_at
+from Interfaces.Data.QueryChunk import QueryChunk, ChunkBuilder, DEFAULT_CHUNK_SIZE, parse_value
+from Api.MySQLConnectionPool import MySQLConnectionPool, DEFAULT_POOL_SIZE, CONNECTION_ERRORS
+from Api.TimeSeriesSchema import ALL_TABLES, get_table, get_insert_statement, parse_timestamp, get_partition_name
+
+DEFAULT_BATCH_SIZE = 500 # Readings per transaction
+DEFAULT_FLUSH_INTERVAL = 5.0 # Seconds a reading may wait in the queue before its batch is flushed
+DEFAULT_MAX_QUEUE_SIZE = 10000 # Readings buffered before save blocks
+DEFAULT_WRITE_RETRIES = 3 # Retries of a failed batch before its readings are counted as failed
+DEFAULT_RETRY_DELAY = 1.0 # Seconds before the first retry of a failed batch, doubled per retry
+STOP_POLL_INTERVAL = 1.0 # Seconds close waits for space in the queue between checks that the writer is alive
+
+# Schema modes
+SCHEMA_EAV = "eav" # events and data tables, one data row per field
+SCHEMA_TIMESERIES = "timeseries" # Typed, partitioned tables per device type
+SCHEMA_FILES = {
+    SCHEMA_EAV: ("./../my_sql/sql/setup.sql", "./../my_sql/sql/reset.sql"),
+    SCHEMA_TIMESERIES: ("./../my_sql/sql/setup_timeseries.sql", "./../my_sql/sql/reset_timeseries.sql"),
+}
+PARTITION_MONTHS_AHEAD = 3 # Monthly partitions created ahead of time in the time-series schema
+FIRST_PARTITION_MONTH = datetime(2024, 1, 1) # Matches the p_history bound in setup_timeseries.sql
+
+# Stable IDs for the devices table's device_type_id, in the order of MethodNames
+DEVICE_TYPE_IDS = {
+    method.value.split(".")[0]: type_id
+    for type_id, method in enumerate(method for method in MethodNames if method.name.endswith("_GET_STATE"))
+}
+UNKNOWN_DEVICE_TYPE_ID = len(DEVICE_TYPE_IDS)
+
+def load_mysql_credentials(current_user: str) -> MySQLCredentials:
+    '''
+    Load a user's MySQL credentials from the credentials file.
+    '''
+    with open("./../credentials.json", "r") as file:
+        credentials_json = json.load(file)
+
+    return MySQLCredentials(
+        database_name = credentials_json[current_user + "_mysql_database_name"],
+        host          = credentials_json[current_user + "_mysql_host"],
+        port          = credentials_json[current_user + "_mysql_port"],
+        username      = credentials_json[current_user + "_mysql_username"],
+        password      = credentials_json[current_user + "_mysql_password"]
+    )
+
+def to_naive_utc(seconds: float) -> datetime:
+    '''
+    Convert epoch seconds to the naive UTC datetime the time-series tables store.
+    '''
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+def get_epoch_milliseconds(value: datetime) -> int:
+    '''
+    Convert a naive UTC datetime to milliseconds since the epoch.
+    '''
+    return round(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+@dataclass
+class WriterStats:
+    '''
+    Attributes:
+        queued (int): Readings accepted by save.
+        written (int): Readings committed to MySQL.
+        batches (int): Transactions committed.
+        failed (int): Readings in batches that were rolled back on every retry.
+        retried (int): Batches written again after being rolled back.
+        blocked (int): Calls to save that had to wait for space in the queue.
+    '''
+    queued: int = 0
+    written: int = 0
+    batches: int = 0
+    failed: int = 0
+    retried: int = 0
+    blocked: int = 0
+
+class FlushRequest:
+    '''
+    Queued by DatabaseMySQL.flush. The writer completes it once every reading queued before it was written,
+    recording how many of them failed, and how many of those MySQL rejected rather than failed to reach.
+    '''
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.failed = 0
+        self.rejected = 0
 
 class DatabaseMySQL(Database):
-    
-    def __init__(self, current_user):
-        
+    '''
+    MySQL backend. Readings are buffered in a bounded queue and written by a background thread
+    in multi-row batches, one transaction per batch, so saving never waits on MySQL unless the queue is full.
+    A batch that is rolled back is written again with exponential backoff, up to write_retries times.
+    Call close to flush the remaining readings.
+
+    Connections come from a pool shared by every thread using the database. A statement that fails because
+    the connection dropped is retried on a fresh connection.
+
+    Two schemas are supported. SCHEMA_EAV stores every field as a string row of the data table.
+    SCHEMA_TIMESERIES stores readings in typed tables keyed on (device_id, reported_at) and partitioned by month,
+    see Api/TimeSeriesSchema.py. Existing EAV data can be converted with Api/migrate_eav.py.
+    '''
+
+    def __init__(self, current_user,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+            max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+            pool_size: int = DEFAULT_POOL_SIZE,
+            schema: str = SCHEMA_EAV,
+            reset_on_start: bool = False,
+            write_retries: int = DEFAULT_WRITE_RETRIES,
+            retry_delay: float = DEFAULT_RETRY_DELAY
+        ):
+
         # TODO: should these credential details be kept as class attributes?
         # This would allow for recreation of a connection without needing to reread the file.
         # But maybe its a security issue?
-        
+
         # Extract credentials as attributes
-        with open("./../credentials.json", "r") as file:
-            credentials_json = json.load(file)
-        
-        self.credentials = MySQLCredentials(
-            database_name = credentials_json[current_user + "_mysql_database_name"],
-            host          = credentials_json[current_user + "_mysql_host"],
-            port          = credentials_json[current_user + "_mysql_port"],
-            username      = credentials_json[current_user + "_mysql_username"],
-            password      = credentials_json[current_user + "_mysql_password"]
-        )
-        
-        # Create connection
-        self.connection = self.create_connection()
-        
+        self.credentials = load_mysql_credentials(current_user)
+        self.schema = schema
+
+        # Create connection pool
+        self.pool = MySQLConnectionPool(self.create_connection, size=pool_size)
+
         # Test connection
-        self.connection.ping()
-        
-        self.reset() # TODO: remove this at some point
+        self.pool.run(lambda connection: connection.ping())
+
+        if reset_on_start:
+            self.reset() # TODO: remove this at some point
         self.setup()
-    
+
+        # Surrogate keys of the devices table by YoLink device ID
+        self.device_ids: dict[str, int] = {}
+        self.device_ids_lock = threading.Lock()
+        if self.schema == SCHEMA_EAV:
+            self.check_eav_layout()
+            self.load_device_ids()
+
+        # Start the write-behind queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_retries = write_retries
+        self.retry_delay = retry_delay
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self.stats = WriterStats()
+        self.unflushed_failures = 0 # Readings that failed since the last flush request
+        self.unflushed_rejections = 0 # Of those, readings that failed with an error other than a connection error
+        self.closed = False
+        self.writer = threading.Thread(target=self.write_loop, name="mysql-writer", daemon=True)
+        self.writer.start()
+
     def setup(self):
-        self.execute_file("./../my_sql/sql/setup.sql", { "schema_name": self.credentials.database_name })
-    
+        self.execute_file(SCHEMA_FILES[self.schema][0], { "schema_name": self.credentials.database_name })
+        if self.schema == SCHEMA_TIMESERIES:
+            self.add_partitions()
+
     def reset(self):
-        self.execute_file("./../my_sql/sql/reset.sql", { "schema_name": self.credentials.database_name })
-      
-    def save(self, device_type: str, header: OrderedDict[str, str|int]) -> None:
-        cursor = self.connection.cursor()
-        
-    def add_device(self, device_id, device_name, device_type, timestamp):
-        return super().add_device(device_id, device_name, device_type, timestamp)
-    
+        self.execute_file(SCHEMA_FILES[self.schema][1], { "schema_name": self.credentials.database_name })
+
+    def add_partitions(self, months_ahead: int = PARTITION_MONTHS_AHEAD) -> None:
+        '''
+        Split the p_future partition of every time-series table into monthly partitions,
+        up to months_ahead months from now. Run it periodically, e.g. monthly, on long-lived databases.
+        '''
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        last_month = (now.replace(day=1) + timedelta(days=32 * months_ahead)).replace(day=1)
+
+        def reorganize(connection) -> None:
+            cursor = connection.cursor()
+            try:
+                for table in ALL_TABLES:
+                    cursor.execute(
+                        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+                        (self.credentials.database_name, table.name)
+                    )
+                    existing = {row[0] for row in cursor.fetchall()}
+
+                    # Continue from the newest monthly partition
+                    month = FIRST_PARTITION_MONTH
+                    while get_partition_name(month) in existing:
+                        month = (month + timedelta(days=32)).replace(day=1)
+
+                    partitions = []
+                    while month <= last_month:
+                        next_month = (month + timedelta(days=32)).replace(day=1)
+                        partitions.append(
+                            f"PARTITION {get_partition_name(month)} VALUES LESS THAN (TO_DAYS('{next_month:%Y-%m-%d}'))"
+                        )
+                        month = next_month
+                    if not partitions:
+                        continue
+
+                    partitions.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+                    cursor.execute(f"ALTER TABLE {table.name} REORGANIZE PARTITION p_future INTO ({', '.join(partitions)})")
+            finally:
+                cursor.close()
+
+        self.pool.run(reorganize)
+
+    def save(self, device_type: str, header: OrderedDict[str, str|int|float], timeout: float | None = None) -> None:
+        '''
+        Queue a reading to be written by the background writer. Blocks while the queue is full.
+
+        Args:
+            device_type (str): The type of device.
+            header (OrderedDict[str, str|int|float]): The reading. "deviceId" (or "name") identifies the device and "reportAt", if present, is the event time.
+            timeout (float, optional): Seconds to wait for space in the queue. Defaults to waiting indefinitely.
+
+        Raises:
+            queue.Full: The queue stayed full for timeout seconds.
+        '''
+        self.save_events([Event.from_row(device_type, header)], timeout)
+
+    def save_events(self, batch: list[Event], timeout: float | None = None) -> None:
+        '''
+        Queue events to be written by the background writer. Blocks while the queue is full.
+        Each event and its data entries are inserted together, with keys generated by the server.
+
+        Args:
+            batch (list[Event]): The events.
+            timeout (float, optional): Seconds to wait for space in the queue for each event. Defaults to waiting indefinitely.
+
+        Raises:
+            queue.Full: The queue stayed full for timeout seconds.
+        '''
+        if self.closed:
+            raise RuntimeError("database is closed")
+        for event in batch:
+            try:
+                self.queue.put_nowait(event)
+            except queue.Full:
+                self.stats.blocked += 1
+                self.queue.put(event, timeout=timeout)
+            self.stats.queued += 1
+
+    def flush(self, timeout: float | None = None) -> None:
+        '''
+        Wait until every reading queued so far is written.
+
+        Args:
+            timeout (float, optional): Seconds to wait. Defaults to waiting indefinitely.
+
+        Raises:
+            TimeoutError: The readings were not written within timeout seconds.
+            WriteRejected: Some of the readings were rejected by MySQL since the last flush, and none failed to reach it.
+            RuntimeError: Some of the readings could not be written since the last flush.
+        '''
+        if self.closed:
+            raise RuntimeError("database is closed")
+        request = FlushRequest()
+        try:
+            self.queue.put(request, timeout=timeout)
+        except queue.Full:
+            raise TimeoutError("timed out waiting for space in the queue")
+        if not request.done.wait(timeout):
+            raise TimeoutError("timed out waiting for queued readings to be written")
+        if request.failed and request.rejected == request.failed:
+            raise WriteRejected(f"{request.failed} readings were rejected")
+        if request.failed:
+            raise RuntimeError(f"{request.failed} readings could not be written")
+
+    def add_device(self, device_id, device_name, device_type, timestamp) -> int:
+        '''
+        Register a device, or update its name, and return its surrogate key.
+        Devices are also registered when their first event is written.
+        '''
+        def register_device(connection) -> int:
+            key = self.get_device_key(connection, device_id, device_name, device_type)
+            connection.commit()
+            return key
+
+        return self.pool.run(register_device)
+
+    def close(self) -> None:
+        '''
+        Flush every queued reading, stop the writer and close the connection pool.
+        If the writer has stopped, the readings left in the queue are reported and dropped.
+        '''
+        if self.closed:
+            return
+        self.closed = True
+        # A stopped writer never makes space in a full queue, so the stop marker is only waited on while it runs
+        while self.writer.is_alive():
+            try:
+                self.queue.put(None, timeout=STOP_POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        self.writer.join()
+        if not self.queue.empty():
+            print(f'Writer stopped with {self.queue.qsize()} readings left in the queue')
+        self.pool.close()
+
     def create_connection(self):
         return mysql.connector.connect(
             database = self.credentials.database_name,
@@ -55,17 +311,371 @@ class DatabaseMySQL(Database):
             username = self.credentials.username,
             password = self.credentials.password,
         )
-        
+
     def execute_file(self, filename, params):
         with open(filename, 'r') as sql_file:
             sql = sql_file.read()
             sql = sql % params
-            sql_statements = sql.split(";")
-            
-            for statement in sql_statements:
-                print('executing: ' + statement)
-                print(params)
-                self.connection.cursor().execute(statement)
-                
-        
-        
+            sql_statements = [statement for statement in sql.split(";") if statement.strip()]
+
+            def execute_statements(connection):
+                cursor = connection.cursor()
+                try:
+                    for statement in sql_statements:
+                        print('executing: ' + statement)
+                        print(params)
+                        cursor.execute(statement)
+                    connection.commit()
+                finally:
+                    cursor.close()
+
+            self.pool.run(execute_statements)
+
+    def check_eav_layout(self) -> None:
+        '''
+        Fail on EAV tables created before keys were generated on the server. setup.sql only creates missing tables,
+        so such tables lack the device_uid column, the AUTO_INCREMENT keys and the unique (device, timestamp) index,
+        and every write to them would fail or no longer skip duplicates. Their device IDs cannot be mapped to YoLink
+        device IDs, so they are recreated rather than migrated.
+
+        Raises:
+            RuntimeError: The tables have the old layout.
+        '''
+        def select_layout(connection) -> tuple[int, int, int]:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(
+                    "SELECT "
+                    "(SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s "
+                    "AND TABLE_NAME = 'devices' AND COLUMN_NAME = 'device_uid'), "
+                    "(SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s "
+                    "AND TABLE_NAME IN ('devices', 'events', 'data') AND COLUMN_KEY = 'PRI' AND EXTRA LIKE '%%auto_increment%%'), "
+                    "(SELECT COUNT(*) FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s "
+                    "AND TABLE_NAME = 'events' AND INDEX_NAME = 'event_source_timestamp_idx' AND NON_UNIQUE = 0)",
+                    (self.credentials.database_name,) * 3
+                )
+                return cursor.fetchone()
+            finally:
+                cursor.close()
+
+        has_device_uid, auto_increment_keys, unique_index_columns = self.pool.run(select_layout)
+        if not has_device_uid or auto_increment_keys < 3 or unique_index_columns < 2:
+            raise RuntimeError(
+                f"the devices, events and data tables of {self.credentials.database_name} predate device_uid, "
+                "AUTO_INCREMENT keys and the unique (device, timestamp) index of events; "
+                "start once with reset_on_start=True to recreate them, which drops their rows"
+            )
+
+    def load_device_ids(self) -> None:
+        '''
+        Load the surrogate keys of the known devices.
+        '''
+        def select_devices(connection) -> list[tuple[str, int]]:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT device_uid, device_id FROM devices")
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+        with self.device_ids_lock:
+            self.device_ids.update(self.pool.run(select_devices))
+
+    def get_device_key(self, connection, device_id: str, device_name: str, device_type: str) -> int:
+        '''
+        Look up the surrogate key of a device, inserting the device if it is new.
+        The upsert makes concurrent writers agree on one key per device.
+        '''
+        with self.device_ids_lock:
+            key = self.device_ids.get(device_id)
+        if key is not None:
+            return key
+
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO devices (device_uid, device_type_id, device_name) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE device_name = VALUES(device_name), device_id = LAST_INSERT_ID(device_id)",
+                (device_id, DEVICE_TYPE_IDS.get(device_type, UNKNOWN_DEVICE_TYPE_ID), device_name)
+            )
+            key = cursor.lastrowid
+        finally:
+            cursor.close()
+
+        with self.device_ids_lock:
+            self.device_ids[device_id] = key
+        return key
+
+    def write_loop(self) -> None:
+        '''
+        Collect readings into batches and write them, until close queues the stop marker.
+        A batch is written once it is full or its oldest reading has waited flush_interval seconds,
+        or as soon as a flush is requested.
+        '''
+        stopping = False
+        while not stopping:
+            batch = []
+            flush_request = None
+            reading = self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while reading is not None:
+                if isinstance(reading, FlushRequest):
+                    flush_request = reading
+                    break
+                batch.append(reading)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    reading = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            stopping = reading is None
+            if batch:
+                self.write_with_retries(batch)
+            if flush_request is not None:
+                flush_request.failed = self.unflushed_failures
+                flush_request.rejected = self.unflushed_rejections
+                self.unflushed_failures = self.unflushed_rejections = 0
+                flush_request.done.set()
+
+    def write_with_retries(self, batch: list[Event]) -> None:
+        '''
+        Write a batch, writing it again after a backoff delay while it is rolled back, up to write_retries times.
+        The readings of a batch that failed every retry are counted as failed.
+        '''
+        write = self.write_timeseries_batch if self.schema == SCHEMA_TIMESERIES else self.write_batch
+        attempt = 0
+        while True:
+            try:
+                write(batch)
+                break
+            except mysql.connector.Error as e:
+                if attempt >= self.write_retries:
+                    self.stats.failed += len(batch)
+                    self.unflushed_failures += len(batch)
+                    if not isinstance(e, CONNECTION_ERRORS):
+                        self.unflushed_rejections += len(batch)
+                    print(f'Failed to write {len(batch)} readings: {e}')
+                    return
+                delay = self.retry_delay * 2 ** attempt
+                print(f'Failed to write {len(batch)} readings, retrying in {delay:.0f}s: {e}')
+                time.sleep(delay)
+                self.stats.retried += 1
+                attempt += 1
+
+        self.stats.written += len(batch)
+        self.stats.batches += 1
+
+    def write_batch(self, batch: list[Event]) -> None:
+        '''
+        Write a batch of events in one transaction of three statements, whatever the batch size: a multi-row insert
+        of the events, a select of their generated keys on the (device, time) unique index, then a multi-row insert
+        of their data entries. Events already written, such as ones replayed from a spool, keep their data.
+        Raises mysql.connector.Error once the transaction is rolled back.
+        '''
+        def insert_batch(connection) -> None:
+            cursor = connection.cursor()
+            new_device_ids = []
+            try:
+                # The first event of the batch at each (device, time) is the one written
+                events: dict[tuple[int, str], Event] = {}
+                for event in batch:
+                    with self.device_ids_lock:
+                        known = event.device_id in self.device_ids
+                    device_key = self.get_device_key(connection, event.device_id, event.device_name, event.device_type)
+                    if not known:
+                        new_device_ids.append(event.device_id)
+                    events.setdefault((device_key, event.timestamp), event)
+
+                keys = [value for key in events for value in key]
+                placeholders = ", ".join(["(%s, %s)"] * len(events))
+                cursor.execute(
+                    f"INSERT IGNORE INTO events (event_source_device_id, event_timestamp) VALUES {placeholders}",
+                    keys
+                )
+                # Events without data rows are the ones just inserted
+                cursor.execute(
+                    "SELECT event_id, event_source_device_id, event_timestamp FROM events "
+                    f"WHERE (event_source_device_id, event_timestamp) IN ({placeholders}) "
+                    "AND NOT EXISTS (SELECT 1 FROM data WHERE data.event_id = events.event_id)",
+                    keys
+                )
+                data = [
+                    (event_key, entry.name, str(entry.value))
+                    for event_key, device_key, timestamp in cursor.fetchall()
+                    for entry in events[(device_key, timestamp)].data_entries
+                ]
+                if data:
+                    cursor.executemany("INSERT INTO data (event_id, data_name, data_value) VALUES (%s, %s, %s)", data)
+                connection.commit()
+            except mysql.connector.Error:
+                connection.rollback()
+                # Devices inserted by the rolled back transaction no longer exist
+                with self.device_ids_lock:
+                    for device_id in new_device_ids:
+                        self.device_ids.pop(device_id, None)
+                raise
+            finally:
+                cursor.close()
+
+        self.pool.run(insert_batch)
+
+    def write_timeseries_batch(self, batch: list[Event]) -> None:
+        '''
+        Write a batch of events to the typed time-series tables in one transaction, one multi-row insert per table.
+        Raises mysql.connector.Error once the transaction is rolled back.
+        '''
+        rows_by_table: dict[str, list[tuple]] = {}
+        statements: dict[str, str] = {}
+
+        for event in batch:
+            table = get_table(event.device_type)
+            values = {entry.name: entry.value for entry in event.data_entries}
+            row = [event.device_id, parse_timestamp(event.timestamp)]
+            if table.has_device_type:
+                row.append(event.device_type)
+            row.extend(values.get(field) for field in table.columns)
+
+            statements.setdefault(table.name, get_insert_statement(table))
+            rows_by_table.setdefault(table.name, []).append(tuple(row))
+
+        def insert_batch(connection) -> None:
+            cursor = connection.cursor()
+            try:
+                for table_name, rows in rows_by_table.items():
+                    cursor.executemany(statements[table_name], rows)
+                connection.commit()
+            except mysql.connector.Error:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        self.pool.run(insert_batch)
+
+    def query(self, device_ids: list[str] | None, fields: list[str] | None, start: float, end: float,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[QueryChunk]:
+        '''
+        Read the readings reported within a time range, in chunks of columns. Readings still in the write queue
+        are not included.
+
+        Each device is read as a series of pages of at most chunk_size readings, resuming after the last reading of
+        the previous page. Every page is a range scan of the (device, time) key of the schema, the time-series tables'
+        primary key or the events table's unique index, and no connection is held between chunks.
+
+        Args:
+            device_ids (list[str] | None): Devices to read. None reads every device.
+            fields (list[str] | None): Fields to read, in column order. None reads every field.
+            start (float): Start of the range in epoch seconds, included.
+            end (float): End of the range in epoch seconds, excluded.
+            chunk_size (int, optional): Most readings per chunk.
+        '''
+        if device_ids is not None and not device_ids:
+            return
+        builder = ChunkBuilder(fields)
+        if self.schema == SCHEMA_TIMESERIES:
+            pages = self.read_timeseries_pages(device_ids, fields, start, end, chunk_size)
+        else:
+            pages = self.read_eav_pages(device_ids, fields, start, end, chunk_size)
+        for device_id, readings in pages:
+            for at, values in readings:
+                builder.add(device_id, at, values)
+                if len(builder) >= chunk_size:
+                    yield builder.build()
+        if len(builder):
+            yield builder.build()
+
+    def read_timeseries_pages(self, device_ids: list[str] | None, fields: list[str] | None, start: float, end: float,
+            page_size: int) -> Iterator[tuple[str, list[tuple[int, dict]]]]:
+        '''
+        Yields pages of (reportAt in milliseconds, values) of every device from the time-series tables.
+        '''
+        for table in ALL_TABLES:
+            columns = {field: column for field, column in table.columns.items() if fields is None or field in fields}
+            if not columns:
+                continue
+            select = f"SELECT reported_at, {', '.join(columns.values())} FROM {table.name} WHERE device_id = %s"
+
+            def select_devices(connection) -> list[str]:
+                cursor = connection.cursor()
+                try:
+                    if device_ids is None:
+                        cursor.execute(f"SELECT DISTINCT device_id FROM {table.name}")
+                    else:
+                        cursor.execute(
+                            f"SELECT DISTINCT device_id FROM {table.name} WHERE device_id IN ({', '.join(['%s'] * len(device_ids))})",
+                            tuple(device_ids)
+                        )
+                    return [row[0] for row in cursor.fetchall()]
+                finally:
+                    cursor.close()
+
+            for device_id in self.pool.run(select_devices):
+                after, inclusive = to_naive_utc(start), True
+                while True:
+                    def select_page(connection) -> list[tuple]:
+                        cursor = connection.cursor()
+                        try:
+                            cursor.execute(
+                                f"{select} AND reported_at {'>=' if inclusive else '>'} %s AND reported_at < %s "
+                                "ORDER BY reported_at LIMIT %s",
+                                (device_id, after, to_naive_utc(end), page_size)
+                            )
+                            return cursor.fetchall()
+                        finally:
+                            cursor.close()
+
+                    rows = self.pool.run(select_page)
+                    yield device_id, [
+                        (get_epoch_milliseconds(row[0]), dict(zip(columns, row[1:])))
+                        for row in rows
+                    ]
+                    if len(rows) < page_size:
+                        break
+                    after, inclusive = rows[-1][0], False
+
+    def read_eav_pages(self, device_ids: list[str] | None, fields: list[str] | None, start: float, end: float,
+            page_size: int) -> Iterator[tuple[str, list[tuple[int, dict]]]]:
+        '''
+        Yields pages of (reportAt in milliseconds, values) of every device from the events and data tables.
+        Values are stored as text, and converted back to the type they were saved as.
+        '''
+        self.load_device_ids()
+        with self.device_ids_lock:
+            keys = dict(self.device_ids) if device_ids is None else {
+                device_id: self.device_ids[device_id] for device_id in device_ids if device_id in self.device_ids
+            }
+        field_filter = f" AND data.data_name IN ({', '.join(['%s'] * len(fields))})" if fields else ""
+
+        for device_id, key in keys.items():
+            after, inclusive = to_report_at(start), True
+            while True:
+                def select_page(connection) -> list[tuple]:
+                    cursor = connection.cursor()
+                    try:
+                        # The page is limited on events, then joined with their data
+                        cursor.execute(
+                            "SELECT page.event_timestamp, data.data_name, data.data_value FROM ("
+                            "SELECT event_id, event_timestamp FROM events WHERE event_source_device_id = %s "
+                            f"AND event_timestamp {'>=' if inclusive else '>'} %s AND event_timestamp < %s "
+                            "ORDER BY event_timestamp LIMIT %s"
+                            f") page LEFT JOIN data ON data.event_id = page.event_id{field_filter} "
+                            "ORDER BY page.event_timestamp",
+                            (key, after, to_report_at(end), page_size, *(fields or []))
+                        )
+                        return cursor.fetchall()
+                    finally:
+                        cursor.close()
+
+                readings: dict[str, dict] = {}
+                for timestamp, name, value in self.pool.run(select_page):
+                    values = readings.setdefault(timestamp, {})
+                    if name is not None:
+                        values[name] = parse_value(value)
+                yield device_id, [
+                    (get_epoch_milliseconds(parse_timestamp(timestamp)), values)
+                    for timestamp, values in readings.items()
+                ]
+                if len(readings) < page_size:
+                    break
+                after, inclusive = list(readings)[-1], False
@@ -0,0 +1,212 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterator
+
+from Api.SpooledDatabase import write_atomically
+from Interfaces.Database import Database
+from Interfaces.Data.Event import Event, EVENT_FIELDS, DEVICE_ID_FIELD, TIMESTAMP_FIELD
+from Interfaces.Data.QueryChunk import QueryChunk, DEFAULT_CHUNK_SIZE
+
+@dataclass
+class DeduplicationStats:
+    '''
+    Attributes:
+        received (int): Readings passed to save or save_events.
+        written (int): Readings passed on to the backend.
+        duplicates (int): Readings dropped because their reportAt and values were already seen.
+        within_deadband (int): Readings dropped because every value stayed within its deadband.
+    '''
+    received: int = 0
+    written: int = 0
+    duplicates: int = 0
+    within_deadband: int = 0
+
+    @property
+    def reduction_ratio(self) -> float:
+        '''
+        Share of the received readings that were not written.
+        '''
+        return 1 - self.written / self.received if self.received else 0.0
+
+@dataclass
+class DeviceState:
+    '''
+    What was last seen from and written for one device.
+
+    Attributes:
+        report_at (str | None): reportAt of the last reading seen.
+        values (dict): Values of the last reading seen.
+        written_values (dict): Values of the last reading written, which deadbands are measured from.
+        written_at (float): Epoch time the last reading was written.
+    '''
+    report_at: str | None
+    values: dict
+    written_values: dict
+    written_at: float
+
+def is_within_deadbands(values: dict, written_values: dict, deadbands: dict[str, float]) -> bool:
+    '''
+    Whether a reading has the same fields as the last written one, and every value is either equal to it
+    or within its field's deadband.
+    '''
+    if values.keys() != written_values.keys():
+        return False
+    for name, value in values.items():
+        written = written_values[name]
+        if value == written:
+            continue
+        deadband = deadbands.get(name)
+        if (deadband is None
+                or isinstance(value, bool) or not isinstance(value, (int, float))
+                or isinstance(written, bool) or not isinstance(written, (int, float))
+                or abs(value - written) > deadband):
+            return False
+    return True
+
+class DeduplicatingDatabase(Database):
+    '''
+    A stage in front of a Database that only passes on readings that are new.
+
+    Polling a device whose reportAt has not moved returns the reading it already returned, which is dropped.
+    With deadbands, a reading with a new reportAt is dropped as well when every value stayed within its field's
+    deadband of the last written reading, such as ±0.1 on temperature. Deadbands are measured from the last written
+    reading rather than the last seen one, so slow drifts are still written once they add up. A heartbeat writes
+    a reading at least that often even when it stayed within the deadbands, so gaps in the data mean the device
+    was silent.
+
+    The last seen reading of every device can be kept in a state file, so runs started by cron deduplicate against
+    the previous run. Readings without a deviceId are passed on as they are.
+
+    Methods:
+        save: Passes a reading on to the backend if it is new.
+        save_events: Passes the new events of a batch on to the backend, as one batch.
+        get_stats: Returns the readings received, written and dropped, and the write reduction ratio.
+        close: Saves the state file and closes the backend.
+    '''
+
+    def __init__(self, backend: Database,
+            deadbands: dict[str, float] | None = None,
+            heartbeat: float | None = None,
+            state_path: str | None = None
+        ):
+        '''
+        Args:
+            backend (Database): Receives the readings that are new.
+            deadbands (dict[str, float], optional): Largest change of a field, by field name, that is not written.
+            heartbeat (float, optional): Seconds after which a reading within the deadbands is written anyway.
+                None never writes them.
+            state_path (str, optional): File the last seen readings are kept in between runs. Defaults to no file.
+        '''
+        self.backend = backend
+        self.deadbands = deadbands or {}
+        self.heartbeat = heartbeat
+        self.state_path = state_path
+
+        self.lock = threading.Lock()
+        self.states: dict[str, DeviceState] = self.load_states()
+        self.stats = DeduplicationStats()
+
+    def save(self, device_type: str, header: OrderedDict[str, str|int|float]) -> None:
+        '''
+        Pass a reading on to the backend, unless it is a duplicate or within the deadbands.
+
+        Args:
+            device_type (str): The type of device.
+            header (OrderedDict[str, str|int|float]): The reading.
+        '''
+        device_id = header.get(DEVICE_ID_FIELD)
+        values = {name: value for name, value in header.items() if name not in EVENT_FIELDS}
+        report_at = header.get(TIMESTAMP_FIELD)
+        if device_id is None or self.is_new(str(device_id), str(report_at) if report_at else None, values):
+            self.backend.save(device_type, header)
+
+    def save_events(self, batch: list[Event]) -> None:
+        '''
+        Pass the new events of a batch on to the backend, as one batch.
+        '''
+        new_events = [
+            event for event in batch
+            if self.is_new(event.device_id, event.timestamp, {entry.name: entry.value for entry in event.data_entries})
+        ]
+        if new_events:
+            self.backend.save_events(new_events)
+
+    def is_new(self, device_id: str, report_at: str | None, values: dict) -> bool:
+        '''
+        Whether a reading should be written, recording it as seen and counting the decision.
+        '''
+        now = time.time()
+        with self.lock:
+            self.stats.received += 1
+            state = self.states.get(device_id)
+            if state is None:
+                self.states[device_id] = DeviceState(report_at, values, values, now)
+                self.stats.written += 1
+                return True
+
+            duplicate = report_at is not None and report_at == state.report_at and values == state.values
+            state.report_at = report_at
+            state.values = values
+            if duplicate:
+                self.stats.duplicates += 1
+                return False
+            if (self.deadbands
+                    and (self.heartbeat is None or now - state.written_at < self.heartbeat)
+                    and is_within_deadbands(values, state.written_values, self.deadbands)):
+                self.stats.within_deadband += 1
+                return False
+
+            state.written_values = values
+            state.written_at = now
+            self.stats.written += 1
+            return True
+
+    def add_device(self, device_id, device_name, device_type, timestamp) -> None:
+        self.backend.add_device(device_id, device_name, device_type, timestamp)
+
+    def query(self, device_ids: list[str] | None, fields: list[str] | None, start: float, end: float,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[QueryChunk]:
+        '''
+        Read the readings the backend stored within a time range. See Database.query.
+        '''
+        return self.backend.query(device_ids, fields, start, end, chunk_size)
+
+    def flush(self) -> None:
+        '''
+        Flush the backend, then save the state file.
+        '''
+        self.backend.flush()
+        self.save_states()
+
+    def get_stats(self) -> DeduplicationStats:
+        with self.lock:
+            return DeduplicationStats(**vars(self.stats))
+
+    def close(self) -> None:
+        '''
+        Close the backend, then save the state file.
+        '''
+        self.backend.close()
+        self.save_states()
+
+    def load_states(self) -> dict[str, DeviceState]:
+        '''
+        Returns the states kept in the state file, or none if there is no state file or it is missing or unreadable.
+        '''
+        if self.state_path is None:
+            return {}
+        try:
+            with open(self.state_path, 'r') as file:
+                return {device_id: DeviceState(**state) for device_id, state in json.load(file).items()}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def save_states(self) -> None:
+        if self.state_path is None:
+            return
+        with self.lock:
+            data = json.dumps({device_id: vars(state) for device_id, state in self.states.items()})
+        write_atomically(self.state_path, data.encode())
@@ -0,0 +1,235 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, TypeVar
+
+import mysql.connector
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0 # Seconds a connection may sit idle before it is pinged on checkout
+DEFAULT_RETRIES = 2 # Retries with a fresh connection after a connection error
+
+# Errors that mean the connection is unusable, rather than that the statement was wrong
+CONNECTION_ERRORS = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)
+
+T = TypeVar('T')
+
+@dataclass
+class PoolStats:
+    '''
+    Attributes:
+        size (int): Maximum number of connections.
+        open (int): Connections currently open.
+        in_use (int): Connections currently checked out.
+        created (int): Connections opened over the pool's lifetime.
+        reconnects (int): Connections replaced after failing a health check or a statement.
+        checkouts (int): Connections handed out.
+        waits (int): Checkouts that had to wait for a connection to be returned.
+        total_wait (float): Seconds spent waiting for connections.
+        max_wait (float): Longest wait for a connection in seconds.
+    '''
+    size: int
+    open: int
+    in_use: int
+    created: int
+    reconnects: int
+    checkouts: int
+    waits: int
+    total_wait: float
+    max_wait: float
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.checkouts if self.checkouts else 0.0
+
+class MySQLConnectionPool:
+    '''
+    A thread-safe pool of MySQL connections. Connections are opened on demand up to the pool size,
+    pinged on checkout when they have been idle, and replaced when a statement fails with a connection error.
+
+    Methods:
+        connection: Context manager that checks out a healthy connection.
+        run: Runs a function with a connection, retrying on a fresh connection after connection errors.
+        get_stats: Returns pool usage and wait-time metrics.
+        close: Closes every idle connection.
+    '''
+
+    def __init__(self, create_connection: Callable[[], Any],
+            size: int = DEFAULT_POOL_SIZE,
+            health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+            retries: int = DEFAULT_RETRIES
+        ):
+        '''
+        Args:
+            create_connection (Callable[[], Any]): Opens a new connection.
+            size (int, optional): Maximum number of open connections.
+            health_check_interval (float, optional): Seconds of idleness after which a connection is pinged on checkout.
+            retries (int, optional): Retries on a fresh connection after connection errors in run.
+        '''
+        self.create_connection = create_connection
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.retries = retries
+
+        self.idle: queue.LifoQueue = queue.LifoQueue() # (connection, time returned)
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.closed = False
+
+        self.open_count = 0
+        self.in_use = 0
+        self.created = 0
+        self.reconnects = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @contextmanager
+    def connection(self, timeout: float | None = None) -> Iterator[Any]:
+        '''
+        Check out a connection, returning it to the pool afterwards. If the block raises a connection error,
+        the connection is discarded instead.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a free connection. Defaults to waiting indefinitely.
+
+        Raises:
+            TimeoutError: No connection became free within timeout seconds.
+        '''
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        except CONNECTION_ERRORS:
+            self.discard(connection)
+            raise
+        except BaseException:
+            self.release(connection)
+            raise
+        self.release(connection)
+
+    def run(self, function: Callable[[Any], T]) -> T:
+        '''
+        Run a function with a pooled connection. If it fails with a connection error, it is run again on a
+        fresh connection, up to retries times. The function should be a complete transaction, so a retry
+        never repeats half of one.
+
+        Args:
+            function (Callable[[Any], T]): Receives the connection.
+
+        Returns:
+            T: The function's result.
+        '''
+        attempt = 0
+        while True:
+            try:
+                with self.connection() as connection:
+                    return function(connection)
+            except CONNECTION_ERRORS:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                with self.lock:
+                    self.reconnects += 1
+
+    def acquire(self, timeout: float | None = None) -> Any:
+        if self.closed:
+            raise RuntimeError("connection pool is closed")
+
+        start = time.monotonic()
+        waited = not self.slots.acquire(blocking=False)
+        if waited and not self.slots.acquire(timeout=timeout):
+            raise TimeoutError("timed out waiting for a MySQL connection")
+        wait = time.monotonic() - start
+
+        with self.lock:
+            self.checkouts += 1
+            self.in_use += 1
+            if waited:
+                self.waits += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+        try:
+            return self.get_healthy_connection()
+        except BaseException:
+            with self.lock:
+                self.in_use -= 1
+            self.slots.release()
+            raise
+
+    def get_healthy_connection(self) -> Any:
+        '''
+        Take an idle connection, pinging it if it sat idle for a while, or open a new one.
+        '''
+        while True:
+            try:
+                connection, returned_at = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - returned_at < self.health_check_interval:
+                return connection
+            try:
+                connection.ping(reconnect=True, attempts=1)
+                return connection
+            except CONNECTION_ERRORS:
+                self.close_connection(connection)
+                with self.lock:
+                    self.reconnects += 1
+
+        connection = self.create_connection()
+        with self.lock:
+            self.open_count += 1
+            self.created += 1
+        return connection
+
+    def release(self, connection: Any) -> None:
+        if self.closed:
+            self.close_connection(connection)
+        else:
+            self.idle.put((connection, time.monotonic()))
+        with self.lock:
+            self.in_use -= 1
+        self.slots.release()
+
+    def discard(self, connection: Any) -> None:
+        self.close_connection(connection)
+        with self.lock:
+            self.in_use -= 1
+        self.slots.release()
+
+    def close_connection(self, connection: Any) -> None:
+        with self.lock:
+            self.open_count -= 1
+        try:
+            connection.close()
+        except mysql.connector.Error:
+            pass
+
+    def get_stats(self) -> PoolStats:
+        with self.lock:
+            return PoolStats(
+                size = self.size,
+                open = self.open_count,
+                in_use = self.in_use,
+                created = self.created,
+                reconnects = self.reconnects,
+                checkouts = self.checkouts,
+                waits = self.waits,
+                total_wait = self.total_wait,
+                max_wait = self.max_wait
+            )
+
+    def close(self) -> None:
+        '''
+        Close every idle connection. Connections still checked out are closed when they are returned.
+        '''
+        self.closed = True
+        while True:
+            try:
+                connection, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self.close_connection(connection)
@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from Interfaces.Database import Database
+from Interfaces.Data.Event import Event
+
+DEFAULT_BATCH_SIZE = 200 # Events sent through the queue at once
+
+@dataclass
+class QueueWriterStats:
+    '''
+    Attributes:
+        batches (int): Batches saved to the backend.
+        events (int): Events saved to the backend.
+        failures (int): Batches the backend failed to save, which were dropped.
+    '''
+    batches: int = 0
+    events: int = 0
+    failures: int = 0
+
+class QueuedDatabase(Database):
+    '''
+    A Database that sends readings through a queue, usually a multiprocessing one, to a QueueWriter saving them
+    to the backend of another process. Readings are turned into events, and sent in batches of batch_size,
+    by the process saving them, so only unpickling is left to the writer.
+
+    Methods:
+        save: Adds a reading to the batch, sending the batch once it is full.
+        save_events: Adds events to the batch, sending the batch once it is full.
+        flush: Sends the batch, without waiting for the writer to save it.
+        close: Sends the batch.
+    '''
+
+    def __init__(self, queue: Any, batch_size: int = DEFAULT_BATCH_SIZE):
+        '''
+        Args:
+            queue (Any): Receives lists of events, such as a multiprocessing.Queue shared with a QueueWriter.
+            batch_size (int, optional): Events per batch sent.
+        '''
+        self.queue = queue
+        self.batch_size = batch_size
+        self.batch: list[Event] = []
+        self.lock = threading.Lock()
+
+    def save(self, device_type: str, header: OrderedDict[str, str|int|float]) -> None:
+        '''
+        Add a reading to the batch, sending the batch once it is full.
+
+        Args:
+            device_type (str): The type of device.
+            header (OrderedDict[str, str|int|float]): The reading.
+        '''
+        self.save_events([Event.from_row(device_type, header)])
+
+    def save_events(self, batch: list[Event]) -> None:
+        with self.lock:
+            self.batch.extend(batch)
+            if len(self.batch) < self.batch_size:
+                return
+            events, self.batch = self.batch, []
+        self.queue.put(events)
+
+    def add_device(self, device_id, device_name, device_type, timestamp) -> None:
+        '''
+        Does nothing; backends register devices with their first event.
+        '''
+        pass
+
+    def flush(self) -> None:
+        '''
+        Send the batch. The writer saves it asynchronously.
+        '''
+        with self.lock:
+            events, self.batch = self.batch, []
+        if events:
+            self.queue.put(events)
+
+    def close(self) -> None:
+        self.flush()
+
+class QueueWriter:
+    '''
+    Saves the batches QueuedDatabases put on a queue to a backend, from a thread, so processes collecting readings
+    share one backend. A batch the backend fails to save is counted and dropped, so the backend should be one that
+    does not lose readings while its storage is down, such as a SpooledDatabase.
+
+    Methods:
+        start: Starts the writer thread.
+        get_stats: Returns the batches and events saved.
+        stop: Saves the batches already queued, then stops the writer thread.
+    '''
+
+    def __init__(self, queue: Any, backend: Database):
+        '''
+        Args:
+            queue (Any): Delivers lists of events, such as a multiprocessing.Queue.
+            backend (Database): Saves the events. Only used by the writer thread.
+        '''
+        self.queue = queue
+        self.backend = backend
+        self.stats = QueueWriterStats()
+        self.lock = threading.Lock()
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.write_loop, name="queue-writer", daemon=True)
+        self.thread.start()
+
+    def get_stats(self) -> QueueWriterStats:
+        with self.lock:
+            return QueueWriterStats(**vars(self.stats))
+
+    def stop(self) -> None:
+        '''
+        Save the batches already queued, then stop the writer thread. Nothing should put batches on the queue anymore.
+        '''
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def write_loop(self) -> None:
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            try:
+                self.backend.save_events(batch)
+            except Exception as e:
+                print(f'Failed to save {len(batch)} queued readings: {e}')
+                with self.lock:
+                    self.stats.failures += 1
+                continue
+            with self.lock:
+                self.stats.batches += 1
+                self.stats.events += len(batch)
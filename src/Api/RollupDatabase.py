@@ -0,0 +1,646 @@
+'''
+Minute, hour and day rollups of the numeric fields of stored readings.
+
+RollupDatabase is a stage in front of a Database backend. Every reading passed on is added to in-memory aggregates
+of the buckets it falls in, one per resolution, and the aggregates are merged into a RollupStore once the backend's
+flush confirmed the readings are stored. Each bucket keeps the minimum, maximum, sum, count and last value of one field
+of one device, so merging a batch is a handful of upserts however many readings it held, and the mean is sum / count.
+
+    MySQLRollupStore    rollups and rollup_watermarks tables next to the readings, see my_sql/sql/setup_rollups.sql
+    FileRollupStore     One append-only JSON lines file per UTC day, for the file-based backends
+
+Stores keep a watermark per device, the reportAt of the last reading rolled up. Readings at or before it are not added
+again, so a batch replayed by a SpooledDatabase after a crash is counted once. Readings that arrive later than a newer
+reading of the same device are not rolled up either.
+
+query_rollups picks the coarsest resolution that still gives the requested number of points over a time range,
+and summarize_rollups aggregates a range from the fewest buckets: whole days, then whole hours, then minutes.
+'''
+import json
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Iterator
+
+from Api.SpooledDatabase import write_atomically
+from Api.persistence_archive import to_timestamp
+from Interfaces.Database import Database
+from Interfaces.Data.Event import Event, EVENT_FIELDS, DEVICE_ID_FIELD, TIMESTAMP_FIELD
+from Interfaces.Data.QueryChunk import QueryChunk, DEFAULT_CHUNK_SIZE
+
+if TYPE_CHECKING:
+    from Api.DatabaseMySQL import DatabaseMySQL
+
+# Bucket widths in seconds, finest first. Buckets are aligned to the epoch, so days are UTC days
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+DEFAULT_MIN_POINTS = 100 # Points query_rollups returns over a range, at least, where the finest resolution allows
+
+ROLLUP_SCHEMA_FILE = "./../my_sql/sql/setup_rollups.sql"
+DEFAULT_ROLLUP_DIR = "rollups"
+WATERMARKS_FILE = "watermarks.json"
+DEFAULT_CACHED_DAYS = 32 # Days of rollups FileRollupStore keeps in memory after reading them
+
+# (resolution, device ID, field, bucket start in epoch seconds)
+AggregateKey = tuple[int, str, str, int]
+# Buckets of one day by (resolution, device ID, field), then by bucket start
+DayIndex = dict[tuple[int, str, str], dict[int, 'Aggregate']]
+
+@dataclass
+class Aggregate:
+    '''
+    The readings of one field of one device within one bucket.
+
+    Attributes:
+        minimum (float): Smallest value.
+        maximum (float): Largest value.
+        total (float): Sum of the values.
+        count (int): Number of values.
+        last (float): Value of the latest reading.
+        last_at (int): reportAt of the latest reading, in milliseconds since the epoch.
+    '''
+    minimum: float
+    maximum: float
+    total: float
+    count: int
+    last: float
+    last_at: int
+
+    @classmethod
+    def of(cls, value: float, at: int) -> 'Aggregate':
+        return cls(value, value, value, 1, value, at)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count
+
+    def add(self, value: float, at: int) -> None:
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.total += value
+        self.count += 1
+        if at >= self.last_at:
+            self.last = value
+            self.last_at = at
+
+    def merge(self, other: 'Aggregate') -> None:
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.total += other.total
+        self.count += other.count
+        if other.last_at >= self.last_at:
+            self.last = other.last
+            self.last_at = other.last_at
+
+@dataclass
+class RollupBucket:
+    '''
+    One point of a queried series.
+
+    Attributes:
+        start (int): Start of the bucket, in epoch seconds.
+        minimum, maximum, mean, last (float): Of the values within the bucket.
+        count (int): Number of values within the bucket.
+    '''
+    start: int
+    minimum: float
+    maximum: float
+    mean: float
+    last: float
+    count: int
+
+@dataclass
+class RollupSeries:
+    '''
+    Attributes:
+        resolution (int): Width of the buckets in seconds, one of RESOLUTIONS.
+        buckets (list[RollupBucket]): The buckets with readings, in time order.
+    '''
+    resolution: int
+    buckets: list[RollupBucket]
+
+@dataclass
+class RollupStats:
+    '''
+    Attributes:
+        readings (int): Readings passed to save or save_events.
+        skipped (int): Readings at or before their device's watermark: replays, repeats and late readings.
+        values (int): Field values added to the aggregates.
+        merges (int): Merges into the store.
+        buckets (int): Aggregates merged into the store.
+    '''
+    readings: int = 0
+    skipped: int = 0
+    values: int = 0
+    merges: int = 0
+    buckets: int = 0
+
+def is_rollup_value(value: Any) -> bool:
+    '''
+    Whether a field value is aggregated: finite numbers, but not booleans.
+    '''
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def get_bucket_start(at: int, resolution: int) -> int:
+    '''
+    Start in epoch seconds of the bucket a time in milliseconds falls in.
+    '''
+    return at // 1000 // resolution * resolution
+
+def to_datetime(seconds: float) -> datetime:
+    '''
+    Convert epoch seconds to the naive UTC datetime MySQL stores.
+    '''
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+def from_datetime(value: datetime) -> float:
+    '''
+    Convert a naive UTC datetime read from MySQL to epoch seconds.
+    '''
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+class RollupStore(ABC):
+    '''
+    Durable storage of the aggregates and of the watermark of every device.
+    '''
+
+    @abstractmethod
+    def load_watermarks(self) -> dict[str, int]:
+        '''
+        Returns the reportAt in milliseconds of the last reading rolled up, by device ID.
+        '''
+        pass
+
+    @abstractmethod
+    def merge(self, aggregates: dict[AggregateKey, Aggregate], watermarks: dict[str, int]) -> None:
+        '''
+        Merge aggregates into the stored buckets and record the new watermarks of their devices.
+        Raises an exception if they could not be stored.
+        '''
+        pass
+
+    @abstractmethod
+    def read(self, device_id: str, field: str, resolution: int, start: int, end: int) -> dict[int, Aggregate]:
+        '''
+        Returns the buckets of a field of a device starting within [start, end), by start in epoch seconds.
+        '''
+        pass
+
+    def close(self) -> None:
+        pass
+
+class MySQLRollupStore(RollupStore):
+    '''
+    Keeps the rollups in MySQL, using the connection pool of a DatabaseMySQL. A merge is one transaction that upserts
+    every bucket and the watermarks together, so a replayed batch can never be counted twice.
+    '''
+
+    UPSERT_ROLLUP = (
+        "INSERT INTO rollups (device_uid, field, resolution, bucket_start, "
+        "min_value, max_value, sum_value, value_count, last_value, last_at) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE "
+        "min_value = LEAST(min_value, VALUES(min_value)), "
+        "max_value = GREATEST(max_value, VALUES(max_value)), "
+        "sum_value = sum_value + VALUES(sum_value), "
+        "value_count = value_count + VALUES(value_count), "
+        # Assignments run left to right, so last_value compares against the stored last_at
+        "last_value = IF(VALUES(last_at) >= last_at, VALUES(last_value), last_value), "
+        "last_at = GREATEST(last_at, VALUES(last_at))"
+    )
+    UPSERT_WATERMARK = (
+        "INSERT INTO rollup_watermarks (device_uid, rolled_up_to) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE rolled_up_to = GREATEST(rolled_up_to, VALUES(rolled_up_to))"
+    )
+
+    def __init__(self, database: 'DatabaseMySQL'):
+        '''
+        Args:
+            database (DatabaseMySQL): The database whose pool and schema the rollup tables share.
+        '''
+        self.pool = database.pool
+        database.execute_file(ROLLUP_SCHEMA_FILE, { "schema_name": database.credentials.database_name })
+
+    def load_watermarks(self) -> dict[str, int]:
+        def select_watermarks(connection) -> list[tuple[str, datetime]]:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT device_uid, rolled_up_to FROM rollup_watermarks")
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+        return {
+            device_id: round(from_datetime(rolled_up_to) * 1000)
+            for device_id, rolled_up_to in self.pool.run(select_watermarks)
+        }
+
+    def merge(self, aggregates: dict[AggregateKey, Aggregate], watermarks: dict[str, int]) -> None:
+        rollup_rows = [
+            (device_id, field, resolution, to_datetime(start), aggregate.minimum, aggregate.maximum,
+                aggregate.total, aggregate.count, aggregate.last, to_datetime(aggregate.last_at / 1000))
+            for (resolution, device_id, field, start), aggregate in aggregates.items()
+        ]
+        watermark_rows = [(device_id, to_datetime(at / 1000)) for device_id, at in watermarks.items()]
+
+        def upsert(connection) -> None:
+            cursor = connection.cursor()
+            try:
+                if rollup_rows:
+                    cursor.executemany(self.UPSERT_ROLLUP, rollup_rows)
+                if watermark_rows:
+                    cursor.executemany(self.UPSERT_WATERMARK, watermark_rows)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        self.pool.run(upsert)
+
+    def read(self, device_id: str, field: str, resolution: int, start: int, end: int) -> dict[int, Aggregate]:
+        def select_buckets(connection) -> list[tuple]:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(
+                    "SELECT bucket_start, min_value, max_value, sum_value, value_count, last_value, last_at FROM rollups "
+                    "WHERE device_uid = %s AND field = %s AND resolution = %s AND bucket_start >= %s AND bucket_start < %s "
+                    "ORDER BY bucket_start",
+                    (device_id, field, resolution, to_datetime(start), to_datetime(end))
+                )
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+        return {
+            round(from_datetime(bucket_start)): Aggregate(minimum, maximum, total, count, last, round(from_datetime(last_at) * 1000))
+            for bucket_start, minimum, maximum, total, count, last, last_at in self.pool.run(select_buckets)
+        }
+
+class FileRollupStore(RollupStore):
+    '''
+    Keeps the rollups in a directory, for the file-based backends. The directory holds:
+
+        <YYYY-MM-DD>.jsonl    One line per merge touching the UTC day: the aggregates of its buckets at every resolution
+        watermarks.json       The watermark of every device, replaced atomically after each merge
+
+    Lines are appended and synced, and buckets are merged when a day is read, then cached. A line torn by a crash is
+    ignored. A crash between appending a merge and replacing the watermarks makes the next start roll its readings up
+    again, counting them twice in sum and count; minimum, maximum and last are unaffected. A day is compacted to one
+    line per bucket once a merge no longer reaches it.
+    '''
+
+    def __init__(self, directory: str = DEFAULT_ROLLUP_DIR, cached_days: int = DEFAULT_CACHED_DAYS):
+        '''
+        Args:
+            directory (str, optional): Directory of the rollup files, created if missing.
+            cached_days (int, optional): Days kept in memory, merged and indexed, after they were read.
+        '''
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.watermarks_path = os.path.join(directory, WATERMARKS_FILE)
+        self.watermarks: dict[str, int] = {}
+        self.appended_days: set[int] = set() # Days appended to since they were last compacted
+        self.cached_days = cached_days
+        self.cache: OrderedDict[int, DayIndex] = OrderedDict() # Least recently read first
+        self.lock = threading.Lock()
+
+    def get_day_path(self, day: int) -> str:
+        '''
+        Path of the file of a day, given as days since the epoch.
+        '''
+        name = datetime.fromtimestamp(day * DAY, timezone.utc).strftime("%Y-%m-%d")
+        return os.path.join(self.directory, name + ".jsonl")
+
+    def load_watermarks(self) -> dict[str, int]:
+        try:
+            with open(self.watermarks_path, 'r') as file:
+                watermarks = {device_id: int(at) for device_id, at in json.load(file).items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            watermarks = {}
+        with self.lock:
+            self.watermarks = watermarks
+        return dict(watermarks)
+
+    def merge(self, aggregates: dict[AggregateKey, Aggregate], watermarks: dict[str, int]) -> None:
+        by_day: dict[int, list[list]] = {}
+        for (resolution, device_id, field, start), aggregate in aggregates.items():
+            by_day.setdefault(start // DAY, []).append([
+                resolution, device_id, field, start, aggregate.minimum, aggregate.maximum,
+                aggregate.total, aggregate.count, aggregate.last, aggregate.last_at
+            ])
+
+        with self.lock:
+            for day, records in by_day.items():
+                with open(self.get_day_path(day), 'a') as file:
+                    file.write(json.dumps(records, separators=(',', ':')) + '\n')
+                    file.flush()
+                    os.fsync(file.fileno())
+                self.appended_days.add(day)
+                self.cache.pop(day, None)
+
+            for device_id, at in watermarks.items():
+                self.watermarks[device_id] = max(self.watermarks.get(device_id, at), at)
+            write_atomically(self.watermarks_path, json.dumps(self.watermarks).encode())
+
+            # Readings arrive in time order, so a day this merge did not reach has stopped receiving them
+            for day in [day for day in self.appended_days if day not in by_day]:
+                self.compact(day)
+
+    def read_day(self, day: int) -> DayIndex:
+        '''
+        Returns every bucket in the file of a day, merged and indexed by resolution, device and field.
+        Called with the lock held. The index is cached and must not be modified.
+        '''
+        cached = self.cache.get(day)
+        if cached is not None:
+            self.cache.move_to_end(day)
+            return cached
+
+        index: DayIndex = {}
+        try:
+            with open(self.get_day_path(day), 'r') as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            try:
+                records = json.loads(line)
+            except ValueError:
+                continue
+            for resolution, device_id, field, start, *values in records:
+                buckets = index.setdefault((resolution, device_id, field), {})
+                aggregate = Aggregate(*values)
+                existing = buckets.get(start)
+                if existing is None:
+                    buckets[start] = aggregate
+                else:
+                    existing.merge(aggregate)
+
+        self.cache[day] = index
+        if len(self.cache) > self.cached_days:
+            self.cache.popitem(last=False)
+        return index
+
+    def read(self, device_id: str, field: str, resolution: int, start: int, end: int) -> dict[int, Aggregate]:
+        buckets: dict[int, Aggregate] = {}
+        with self.lock:
+            for day in range(start // DAY, (end - 1) // DAY + 1):
+                for bucket_start, aggregate in self.read_day(day).get((resolution, device_id, field), {}).items():
+                    if start <= bucket_start < end:
+                        buckets[bucket_start] = replace(aggregate)
+        return dict(sorted(buckets.items()))
+
+    def compact(self, day: int) -> None:
+        '''
+        Rewrite the file of a day with one line holding every bucket, merged. Called with the lock held.
+        '''
+        records = [
+            [resolution, device_id, field, start, aggregate.minimum, aggregate.maximum,
+                aggregate.total, aggregate.count, aggregate.last, aggregate.last_at]
+            for (resolution, device_id, field), buckets in self.read_day(day).items()
+            for start, aggregate in buckets.items()
+        ]
+        if records:
+            write_atomically(self.get_day_path(day), (json.dumps(records, separators=(',', ':')) + '\n').encode())
+        self.appended_days.discard(day)
+
+def choose_resolution(start: int, end: int, min_points: int = DEFAULT_MIN_POINTS) -> int:
+    '''
+    Returns the coarsest resolution that still splits [start, end) into at least min_points buckets,
+    or the finest resolution if none does.
+    '''
+    step = (end - start) / max(min_points, 1)
+    fitting = [resolution for resolution in RESOLUTIONS if resolution <= step]
+    return fitting[-1] if fitting else RESOLUTIONS[0]
+
+def split_range(start: int, end: int, level: int = len(RESOLUTIONS) - 1) -> list[tuple[int, int, int]]:
+    '''
+    Split [start, end) into the fewest whole buckets: whole days in the middle, whole hours around them and minutes
+    at the edges. Edges within a minute are widened to the whole minute.
+
+    Returns:
+        list[tuple[int, int, int]]: (resolution, start, end) of every run of whole buckets, in time order.
+    '''
+    if level == 0:
+        start = start // MINUTE * MINUTE
+        end = -(-end // MINUTE) * MINUTE
+        return [(MINUTE, start, end)] if start < end else []
+    resolution = RESOLUTIONS[level]
+    first = -(-start // resolution) * resolution
+    last = end // resolution * resolution
+    if first >= last:
+        return split_range(start, end, level - 1)
+    return split_range(start, first, level - 1) + [(resolution, first, last)] + split_range(last, end, level - 1)
+
+def query_rollups(store: RollupStore, device_id: str, field: str, start: int, end: int,
+        min_points: int = DEFAULT_MIN_POINTS,
+        resolution: int | None = None
+    ) -> RollupSeries:
+    '''
+    Returns the buckets of a field of a device over a time range, at the coarsest resolution that gives min_points.
+
+    Args:
+        store (RollupStore): The rollups to read.
+        device_id (str): The YoLink device ID.
+        field (str): The field, such as "temperature".
+        start (int): Start of the range, in epoch seconds. The bucket containing it is included.
+        end (int): End of the range, in epoch seconds, excluded.
+        min_points (int, optional): Points wanted over the range.
+        resolution (int, optional): Use this resolution instead of choosing one.
+    '''
+    if resolution is None:
+        resolution = choose_resolution(start, end, min_points)
+    aggregates = store.read(device_id, field, resolution, start // resolution * resolution, end)
+    return RollupSeries(resolution, [
+        RollupBucket(bucket_start, aggregate.minimum, aggregate.maximum, aggregate.mean, aggregate.last, aggregate.count)
+        for bucket_start, aggregate in aggregates.items()
+    ])
+
+def summarize_rollups(store: RollupStore, device_id: str, field: str, start: int, end: int) -> Aggregate | None:
+    '''
+    Returns the aggregate of a field of a device over a time range, read from the fewest buckets, or None if it has
+    no readings in the range. See split_range.
+    '''
+    summary: Aggregate | None = None
+    for resolution, run_start, run_end in split_range(start, end):
+        for aggregate in store.read(device_id, field, resolution, run_start, run_end).values():
+            if summary is None:
+                summary = aggregate
+            else:
+                summary.merge(aggregate)
+    return summary
+
+class RollupDatabase(Database):
+    '''
+    A stage in front of a Database that maintains minute, hour and day rollups of the readings it passes on.
+
+    Readings are aggregated in memory as they are saved, and merged into the store after the backend's flush confirmed
+    them, together with the watermark of their devices. Aggregates that fail to merge are kept and merged by the next
+    flush. Placed between a SpooledDatabase and its backend, rollups follow the readings that were actually stored.
+
+    Methods:
+        save: Passes a reading on to the backend and adds it to the aggregates.
+        save_events: Passes a batch on to the backend and adds its events to the aggregates.
+        flush: Flushes the backend, then merges the aggregates into the store.
+        query: Reads the readings the backend stored, see Database.query.
+        query_series: Returns a series of a field of a device, see query_rollups.
+        summarize: Returns the aggregate of a field of a device over a range, see summarize_rollups.
+        get_stats: Returns the readings rolled up and skipped, and the merges made.
+        close: Closes the backend, then merges the remaining aggregates and closes the store.
+    '''
+
+    def __init__(self, backend: Database, store: RollupStore, fields: set[str] | None = None):
+        '''
+        Args:
+            backend (Database): Receives every reading.
+            store (RollupStore): Keeps the rollups.
+            fields (set[str], optional): Fields rolled up. Defaults to every numeric field.
+        '''
+        self.backend = backend
+        self.store = store
+        self.fields = fields
+
+        self.lock = threading.Lock()
+        self.merge_lock = threading.Lock()
+        # Watermarks include the readings still pending, which are merged or kept for the next flush
+        self.watermarks: dict[str, int] = store.load_watermarks()
+        self.pending: dict[AggregateKey, Aggregate] = {}
+        self.pending_watermarks: dict[str, int] = {}
+        self.stats = RollupStats()
+
+    def save(self, device_type: str, header: OrderedDict[str, str|int|float]) -> None:
+        '''
+        Pass a reading on to the backend and add it to the aggregates.
+
+        Args:
+            device_type (str): The type of device.
+            header (OrderedDict[str, str|int|float]): The reading. A reading without "reportAt" is rolled up at the current time.
+        '''
+        self.backend.save(device_type, header)
+        device_id = header.get(DEVICE_ID_FIELD)
+        if device_id is not None:
+            self.add(str(device_id), header.get(TIMESTAMP_FIELD),
+                {name: value for name, value in header.items() if name not in EVENT_FIELDS})
+
+    def save_events(self, batch: list[Event]) -> None:
+        '''
+        Pass a batch on to the backend and add its events to the aggregates.
+        '''
+        self.backend.save_events(batch)
+        for event in batch:
+            self.add(event.device_id, event.timestamp, {entry.name: entry.value for entry in event.data_entries})
+
+    def add(self, device_id: str, report_at: Any, values: dict) -> None:
+        '''
+        Add the numeric values of a reading to the aggregates of its buckets, unless the reading is at or before
+        the device's watermark.
+        '''
+        try:
+            at = to_timestamp(report_at) if report_at else int(time.time() * 1000)
+        except (ValueError, TypeError):
+            at = None
+
+        with self.lock:
+            self.stats.readings += 1
+            if at is None or at <= self.watermarks.get(device_id, -1):
+                self.stats.skipped += 1
+                return
+            self.watermarks[device_id] = at
+            self.pending_watermarks[device_id] = at
+            for name, value in values.items():
+                if not is_rollup_value(value) or (self.fields is not None and name not in self.fields):
+                    continue
+                self.stats.values += 1
+                for resolution in RESOLUTIONS:
+                    key = (resolution, device_id, name, get_bucket_start(at, resolution))
+                    aggregate = self.pending.get(key)
+                    if aggregate is None:
+                        self.pending[key] = Aggregate.of(value, at)
+                    else:
+                        aggregate.add(value, at)
+
+    def add_device(self, device_id, device_name, device_type, timestamp) -> None:
+        self.backend.add_device(device_id, device_name, device_type, timestamp)
+
+    def flush(self) -> None:
+        '''
+        Flush the backend, then merge the aggregates into the store.
+        '''
+        self.backend.flush()
+        self.merge()
+
+    def merge(self) -> None:
+        '''
+        Merge the pending aggregates into the store. If that fails they are kept for the next merge, and the
+        exception is raised.
+        '''
+        with self.merge_lock:
+            with self.lock:
+                pending, self.pending = self.pending, {}
+                watermarks, self.pending_watermarks = self.pending_watermarks, {}
+            if not pending and not watermarks:
+                return
+            try:
+                self.store.merge(pending, watermarks)
+            except Exception:
+                with self.lock:
+                    for key, aggregate in self.pending.items():
+                        existing = pending.get(key)
+                        if existing is None:
+                            pending[key] = aggregate
+                        else:
+                            existing.merge(aggregate)
+                    self.pending = pending
+                    for device_id, at in self.pending_watermarks.items():
+                        watermarks[device_id] = max(watermarks.get(device_id, at), at)
+                    self.pending_watermarks = watermarks
+                raise
+            with self.lock:
+                self.stats.merges += 1
+                self.stats.buckets += len(pending)
+
+    def query(self, device_ids: list[str] | None, fields: list[str] | None, start: float, end: float,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[QueryChunk]:
+        '''
+        Read the readings the backend stored within a time range. See Database.query.
+        '''
+        return self.backend.query(device_ids, fields, start, end, chunk_size)
+
+    def query_series(self, device_id: str, field: str, start: int, end: int,
+            min_points: int = DEFAULT_MIN_POINTS,
+            resolution: int | None = None
+        ) -> RollupSeries:
+        '''
+        Returns the stored buckets of a field of a device over a time range. Aggregates not merged yet are not included.
+        See query_rollups.
+        '''
+        return query_rollups(self.store, device_id, field, start, end, min_points, resolution)
+
+    def summarize(self, device_id: str, field: str, start: int, end: int) -> Aggregate | None:
+        '''
+        Returns the stored aggregate of a field of a device over a time range. See summarize_rollups.
+        '''
+        return summarize_rollups(self.store, device_id, field, start, end)
+
+    def get_stats(self) -> RollupStats:
+        with self.lock:
+            return RollupStats(**vars(self.stats))
+
+    def close(self) -> None:
+        '''
+        Close the backend, which stores every reading it holds, then merge the remaining aggregates and close the store.
+        '''
+        try:
+            self.backend.close()
+            self.merge()
+        finally:
+            self.store.close()
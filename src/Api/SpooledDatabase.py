@@ -0,0 +1,617 @@
+'''
+Local write-ahead spool between the collectors and a Database backend.
+
+Readings are appended to segment files in the spool directory and synced to disk before save returns, then drained
+to the backend by a background thread. The spool directory holds:
+
+    segment-<first sequence>.log    Records: length, CRC-32, sequence and spool time, then the event as JSON
+    committed                       Sequence of the last record the backend confirmed, replaced atomically
+    dead_letter.jsonl               Events the backend rejected, one JSON line each, as encoded in the segments
+
+On start, the segments are scanned, a record torn by a crash is truncated, and every record after the committed marker
+is drained again. A record is marked committed only after the backend's flush confirmed it, so readings survive
+backend outages and restarts. Backends skip records they already hold (the MySQL schemas are keyed on device and
+reportAt), so a record replayed after a crash between the backend's commit and the marker is written once.
+Records the backend rejects, rather than fails to reach, are moved to the dead-letter file so the drain moves past them.
+'''
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator
+
+from Interfaces.Database import Database, WriteRejected
+from Interfaces.Data.DataEntry import DataEntry
+from Interfaces.Data.Event import Event
+from Interfaces.Data.QueryChunk import QueryChunk, DEFAULT_CHUNK_SIZE
+
+DEFAULT_SPOOL_DIR = 'spool'
+DEFAULT_SYNC_INTERVAL = 0.05 # Seconds records appended without waiting may stay unsynced
+DEFAULT_SEGMENT_SIZE = 16 << 20 # Bytes per segment file before a new one is started
+DEFAULT_DRAIN_BATCH_SIZE = 500 # Records per backend write; at most the backend's batch size, so a drain is one transaction
+DEFAULT_RETRY_DELAY = 1.0 # Seconds before the first retry of an unavailable backend
+DEFAULT_MAX_RETRY_DELAY = 60.0 # Longest delay between backend retries
+DEFAULT_CLOSE_TIMEOUT = 10.0 # Seconds close waits for the spool to drain; the rest is drained on the next start
+DRAIN_RATE_WINDOW = 60.0 # Seconds over which the drain rate is measured
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_EXT = '.log'
+COMMITTED_FILE = 'committed'
+DEAD_LETTER_FILE = 'dead_letter.jsonl'
+RECORD_HEADER = struct.Struct('<IIQd') # payload length, payload CRC-32, sequence, spool time
+
+def encode_event(event: Event) -> bytes:
+    return json.dumps({
+        "id": event.device_id,
+        "name": event.device_name,
+        "type": event.device_type,
+        "time": event.timestamp,
+        "data": [[entry.name, entry.value] for entry in event.data_entries],
+    }, separators=(',', ':')).encode()
+
+def decode_event(payload: bytes) -> Event:
+    fields = json.loads(payload)
+    return Event(
+        device_id = fields["id"],
+        device_name = fields["name"],
+        device_type = fields["type"],
+        timestamp = fields["time"],
+        data_entries = [DataEntry(name, value) for name, value in fields["data"]]
+    )
+
+def write_atomically(path: str, data: bytes) -> None:
+    '''
+    Replace a file with data, so that a crash leaves either the old or the new contents on disk.
+    '''
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+    directory = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+@dataclass
+class SpoolRecord:
+    '''
+    Attributes:
+        sequence (int): Position of the record in the spool, starting at 1.
+        spooled_at (float): Epoch time the record was appended.
+        event (Event): The reading.
+    '''
+    sequence: int
+    spooled_at: float
+    event: Event
+
+@dataclass
+class SpoolStats:
+    '''
+    Attributes:
+        appended (int): Records appended since the spool was opened.
+        drained (int): Records confirmed by the backend since the spool was opened.
+        pending (int): Records waiting for the backend, including ones replayed from a previous run.
+        size (int): Bytes of segment files on disk.
+        segments (int): Segment files on disk.
+        syncs (int): Times the spool was synced to disk.
+        records_per_sync (float): Mean records made durable per sync.
+        drain_rate (float): Records confirmed by the backend per second, over the last DRAIN_RATE_WINDOW seconds.
+        backlog_age (float): Seconds the oldest pending record has waited.
+        drain_failures (int): Backend writes or connection attempts that failed.
+        dead_lettered (int): Records the backend rejected, moved to the dead-letter file since the spool was opened.
+        backend_available (bool): Whether the backend has been created.
+    '''
+    appended: int
+    drained: int
+    pending: int
+    size: int
+    segments: int
+    syncs: int
+    records_per_sync: float
+    drain_rate: float
+    backlog_age: float
+    drain_failures: int
+    dead_lettered: int
+    backend_available: bool
+
+class WriteAheadSpool:
+    '''
+    Append-only log of events in segment files. Appends are synced to disk in groups by a background thread:
+    every append that waits for durability wakes it, and appends arriving during a sync share the next one.
+    Records are read back in order by one consumer and marked committed once it has stored them.
+    '''
+
+    def __init__(self,
+            path: str = DEFAULT_SPOOL_DIR,
+            sync_interval: float = DEFAULT_SYNC_INTERVAL,
+            segment_size: int = DEFAULT_SEGMENT_SIZE
+        ):
+        '''
+        Args:
+            path (str, optional): Directory of the spool.
+            sync_interval (float, optional): Seconds records appended without waiting may stay unsynced.
+            segment_size (int, optional): Bytes per segment file before a new one is started.
+        '''
+        self.path = path
+        self.sync_interval = sync_interval
+        self.segment_size = segment_size
+        os.makedirs(path, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock) # Notified when records are synced or committed
+        self.sync_requested = threading.Event()
+        self.stopped = threading.Event()
+
+        self.committed = self.load_committed()
+        self.segments: OrderedDict[int, str] = OrderedDict() # Segment paths by first sequence, oldest first
+        self.oldest_pending_at: float | None = None
+        last_sequence = self.recover()
+        self.pending = max(last_sequence - self.committed, 0)
+
+        self.written_sequence = last_sequence
+        self.synced_sequence = last_sequence
+        self.read_sequence = self.committed # Last sequence handed to the consumer
+        self.appended = 0
+        self.drained = 0
+        self.syncs = 0
+        self.synced_records = 0
+
+        if not self.segments or os.path.getsize(next(reversed(self.segments.values()))) >= segment_size:
+            self.segments[last_sequence + 1] = self.get_segment_path(last_sequence + 1)
+        self.current_path = next(reversed(self.segments.values()))
+        self.file: BinaryIO = open(self.current_path, 'ab')
+        self.retired_files: list[BinaryIO] = [] # Full segments waiting for their final sync
+        self.reader: BinaryIO | None = None
+        self.reader_first_sequence = 0
+
+        self.syncer = threading.Thread(target=self.sync_loop, name="spool-sync", daemon=True)
+        self.syncer.start()
+
+    def get_segment_path(self, first_sequence: int) -> str:
+        return os.path.join(self.path, f'{SEGMENT_PREFIX}{first_sequence:020d}{SEGMENT_EXT}')
+
+    def load_committed(self) -> int:
+        try:
+            with open(os.path.join(self.path, COMMITTED_FILE), 'rb') as file:
+                return int(file.read())
+        except FileNotFoundError:
+            return 0
+
+    def recover(self) -> int:
+        '''
+        Scan the segments left by a previous run, truncating a torn record at the end, and delete the segments
+        that only hold committed records.
+
+        Returns:
+            int: The last sequence in the spool, or the committed sequence if the spool is empty.
+        '''
+        filenames = sorted(
+            filename for filename in os.listdir(self.path)
+            if filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_EXT)
+        )
+        last_sequence = self.committed
+        for filename in filenames:
+            segment_path = os.path.join(self.path, filename)
+            first_sequence = int(filename[len(SEGMENT_PREFIX):-len(SEGMENT_EXT)])
+            with open(segment_path, 'r+b') as file:
+                valid_size = 0
+                while True:
+                    record = self.read_record(file)
+                    if record is None:
+                        break
+                    valid_size = file.tell()
+                    last_sequence = max(last_sequence, record.sequence)
+                    if record.sequence > self.committed and self.oldest_pending_at is None:
+                        self.oldest_pending_at = record.spooled_at
+                if file.seek(0, os.SEEK_END) != valid_size:
+                    file.truncate(valid_size)
+            self.segments[first_sequence] = segment_path
+
+        # A segment is fully committed once the next one starts at or before the first uncommitted record
+        first_sequences = list(self.segments)
+        for first_sequence, next_first_sequence in zip(first_sequences, first_sequences[1:]):
+            if next_first_sequence <= self.committed + 1:
+                os.remove(self.segments.pop(first_sequence))
+        return last_sequence
+
+    def read_record(self, file: BinaryIO, max_sequence: int | None = None) -> SpoolRecord | None:
+        '''
+        Read the record at the file's position. Returns None, leaving the position unchanged, at the end of the file,
+        at a torn or corrupt record, or at a record after max_sequence.
+        '''
+        start = file.tell()
+        header = file.read(RECORD_HEADER.size)
+        if len(header) == RECORD_HEADER.size:
+            length, checksum, sequence, spooled_at = RECORD_HEADER.unpack(header)
+            if max_sequence is None or sequence <= max_sequence:
+                payload = file.read(length)
+                if len(payload) == length and zlib.crc32(payload) == checksum:
+                    return SpoolRecord(sequence, spooled_at, decode_event(payload))
+        file.seek(start)
+        return None
+
+    def append(self, event: Event, wait: bool = True) -> int:
+        '''
+        Append an event to the spool.
+
+        Args:
+            event (Event): The reading.
+            wait (bool, optional): Whether to block until the record is synced to disk.
+
+        Returns:
+            int: The record's sequence.
+        '''
+        payload = encode_event(event)
+        now = time.time()
+        with self.lock:
+            if self.stopped.is_set():
+                raise RuntimeError("spool is closed")
+            sequence = self.written_sequence + 1
+            self.file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload), sequence, now))
+            self.file.write(payload)
+            self.written_sequence = sequence
+            self.appended += 1
+            self.pending += 1
+            if self.oldest_pending_at is None:
+                self.oldest_pending_at = now
+            if self.file.tell() >= self.segment_size:
+                self.start_segment(sequence + 1)
+        if wait:
+            self.wait_synced(sequence)
+        return sequence
+
+    def start_segment(self, first_sequence: int) -> None:
+        '''
+        Continue in a new segment. The full one is synced and closed by the sync thread. Called with the lock held.
+        '''
+        self.file.flush()
+        self.retired_files.append(self.file)
+        self.current_path = self.get_segment_path(first_sequence)
+        self.segments[first_sequence] = self.current_path
+        self.file = open(self.current_path, 'ab')
+
+    def wait_synced(self, sequence: int) -> None:
+        self.sync_requested.set()
+        with self.changed:
+            self.changed.wait_for(lambda: self.synced_sequence >= sequence or self.stopped.is_set())
+
+    def sync_loop(self) -> None:
+        while not self.stopped.is_set():
+            self.sync_requested.wait(self.sync_interval)
+            self.sync_requested.clear()
+            self.sync()
+
+    def sync(self) -> None:
+        '''
+        Sync every written record to disk.
+        '''
+        with self.lock:
+            if self.written_sequence == self.synced_sequence:
+                return
+            self.file.flush()
+            retired_files, self.retired_files = self.retired_files, []
+            sequence = self.written_sequence
+            file = self.file
+
+        # Appends continue while the disk syncs
+        for retired in retired_files:
+            os.fsync(retired.fileno())
+            retired.close()
+        os.fsync(file.fileno())
+
+        with self.changed:
+            if sequence > self.synced_sequence:
+                self.synced_records += sequence - self.synced_sequence
+                self.synced_sequence = sequence
+            self.syncs += 1
+            self.changed.notify_all()
+
+    def read(self, max_records: int, timeout: float | None = None) -> list[SpoolRecord]:
+        '''
+        Read the next synced records after the ones already read. Only one consumer may read.
+
+        Args:
+            max_records (int): Most records returned.
+            timeout (float, optional): Seconds to wait for a synced record. Defaults to waiting indefinitely.
+
+        Returns:
+            list[SpoolRecord]: The records, empty if none was synced in time or the spool was closed.
+        '''
+        with self.changed:
+            self.changed.wait_for(lambda: self.synced_sequence > self.read_sequence or self.stopped.is_set(), timeout)
+            max_sequence = self.synced_sequence
+            segments = list(self.segments.items())
+        if max_sequence <= self.read_sequence:
+            return []
+
+        records: list[SpoolRecord] = []
+        while len(records) < max_records and self.read_sequence < max_sequence:
+            if self.reader is None:
+                # Open the segment holding the next record
+                first_sequence, segment_path = [
+                    (first, path) for first, path in segments if first <= self.read_sequence + 1
+                ][-1]
+                self.reader = open(segment_path, 'rb')
+                self.reader_first_sequence = first_sequence
+            record = self.read_record(self.reader, max_sequence)
+            if record is None:
+                # The rest of the segment is unsynced, or the records continue in the next segment
+                if any(first > self.reader_first_sequence and first <= self.read_sequence + 1 for first, _ in segments):
+                    self.reader.close()
+                    self.reader = None
+                    continue
+                break
+            if record.sequence > self.read_sequence:
+                records.append(record)
+                self.read_sequence = record.sequence
+
+        if records:
+            with self.lock:
+                self.oldest_pending_at = records[0].spooled_at
+        return records
+
+    def commit(self, sequence: int) -> None:
+        '''
+        Mark every record up to sequence as stored by the consumer, and delete the segments that only hold
+        committed records.
+        '''
+        write_atomically(os.path.join(self.path, COMMITTED_FILE), str(sequence).encode())
+        with self.changed:
+            self.drained += sequence - self.committed
+            self.pending -= sequence - self.committed
+            self.committed = sequence
+            if self.pending == 0:
+                self.oldest_pending_at = None
+            first_sequences = list(self.segments)
+            obsolete = [
+                first for first, next_first in zip(first_sequences, first_sequences[1:])
+                if next_first <= sequence + 1 and first < self.reader_first_sequence
+            ]
+            for first_sequence in obsolete:
+                os.remove(self.segments.pop(first_sequence))
+            self.changed.notify_all()
+
+    def wait_committed(self, sequence: int, timeout: float | None = None) -> bool:
+        '''
+        Wait until every record up to sequence is committed. Returns whether it was in time.
+        '''
+        with self.changed:
+            return self.changed.wait_for(lambda: self.committed >= sequence, timeout)
+
+    def get_size(self) -> tuple[int, int]:
+        '''
+        Returns the bytes and number of segment files on disk.
+        '''
+        with self.lock:
+            segment_paths = list(self.segments.values())
+        size = 0
+        for segment_path in segment_paths:
+            try:
+                size += os.path.getsize(segment_path)
+            except FileNotFoundError:
+                pass # Deleted after a commit
+        return size, len(segment_paths)
+
+    def close(self) -> None:
+        '''
+        Sync every record and close the spool. Uncommitted records are read again when the spool is reopened.
+        '''
+        with self.changed:
+            self.stopped.set()
+            self.changed.notify_all()
+        self.sync_requested.set()
+        self.syncer.join()
+        self.sync()
+        self.file.close()
+        if self.reader is not None:
+            self.reader.close()
+
+class SpooledDatabase(Database):
+    '''
+    A Database that queues readings durably in a WriteAheadSpool and drains them to a backend in the background.
+    Saving only waits for the local disk, so collection continues while the backend is unavailable: a backend that
+    fails to connect is created again with exponential backoff, and a failed write is retried until it succeeds.
+    A batch the backend rejects is written again one record at a time, and the records it still rejects are appended
+    to the dead-letter file in the spool directory.
+
+    Methods:
+        save: Appends a reading to the spool.
+        save_events: Appends a batch of events to the spool.
+        flush: Waits until the backend has stored every reading saved so far.
+        get_stats: Returns the spool size, drain rate and backlog age.
+        close: Drains what it can within close_timeout and closes the spool and backend.
+    '''
+
+    def __init__(self, create_backend: Callable[[], Database],
+            spool_dir: str = DEFAULT_SPOOL_DIR,
+            drain_batch_size: int = DEFAULT_DRAIN_BATCH_SIZE,
+            sync_interval: float = DEFAULT_SYNC_INTERVAL,
+            segment_size: int = DEFAULT_SEGMENT_SIZE,
+            retry_delay: float = DEFAULT_RETRY_DELAY,
+            max_retry_delay: float = DEFAULT_MAX_RETRY_DELAY,
+            close_timeout: float = DEFAULT_CLOSE_TIMEOUT
+        ):
+        '''
+        Args:
+            create_backend (Callable[[], Database]): Creates the backend. Called by the drain thread until it succeeds.
+            spool_dir (str, optional): Directory of the spool.
+            drain_batch_size (int, optional): Records written to the backend per flush.
+            sync_interval (float, optional): Seconds records may stay unsynced when nobody waits for them.
+            segment_size (int, optional): Bytes per spool segment file.
+            retry_delay (float, optional): Seconds before the first retry after a backend failure, doubled per failure.
+            max_retry_delay (float, optional): Longest delay between backend retries.
+            close_timeout (float, optional): Seconds close waits for the spool to drain.
+        '''
+        self.create_backend = create_backend
+        self.drain_batch_size = drain_batch_size
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.close_timeout = close_timeout
+
+        self.spool = WriteAheadSpool(spool_dir, sync_interval, segment_size)
+        self.dead_letter_path = os.path.join(spool_dir, DEAD_LETTER_FILE)
+        self.dead_lettered = 0
+        self.backend: Database | None = None
+        self.drain_failures = 0
+        self.drain_history: deque[tuple[float, int]] = deque() # (time, records) of recent commits
+        self.closed = False
+
+        self.stopped = threading.Event()
+        self.drainer = threading.Thread(target=self.drain_loop, name="spool-drain", daemon=True)
+        self.drainer.start()
+
+    def save(self, device_type: str, header: OrderedDict[str, str|int|float]) -> None:
+        '''
+        Append a reading to the spool, returning once it is on disk.
+
+        Args:
+            device_type (str): The type of device.
+            header (OrderedDict[str, str|int|float]): The reading. A reading without "reportAt" is timestamped now.
+        '''
+        self.save_events([Event.from_row(device_type, header)])
+
+    def save_events(self, batch: list[Event]) -> None:
+        '''
+        Append events to the spool, returning once they are on disk.
+        '''
+        if self.closed:
+            raise RuntimeError("database is closed")
+        if not batch:
+            return
+        for event in batch:
+            sequence = self.spool.append(event, wait=False)
+        self.spool.wait_synced(sequence)
+
+    def add_device(self, device_id, device_name, device_type, timestamp) -> None:
+        '''
+        Register a device with the backend if it is available. Backends also register devices with their first event.
+        '''
+        if self.backend is not None:
+            self.backend.add_device(device_id, device_name, device_type, timestamp)
+
+    def query(self, device_ids: list[str] | None, fields: list[str] | None, start: float, end: float,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[QueryChunk]:
+        '''
+        Read the readings the backend stored within a time range. Readings still in the spool are not included.
+        See Database.query.
+
+        Raises:
+            RuntimeError: The backend is not available yet.
+        '''
+        backend = self.backend
+        if backend is None:
+            raise RuntimeError("backend is not available")
+        return backend.query(device_ids, fields, start, end, chunk_size)
+
+    def flush(self, timeout: float | None = None) -> None:
+        '''
+        Wait until the backend has stored every reading saved so far.
+
+        Raises:
+            TimeoutError: The backend did not catch up within timeout seconds.
+        '''
+        if not self.spool.wait_committed(self.spool.written_sequence, timeout):
+            raise TimeoutError("timed out waiting for the spool to drain")
+
+    def get_stats(self) -> SpoolStats:
+        size, segments = self.spool.get_size()
+        now = time.time()
+        with self.spool.lock:
+            while self.drain_history and self.drain_history[0][0] < now - DRAIN_RATE_WINDOW:
+                self.drain_history.popleft()
+            oldest_pending_at = self.spool.oldest_pending_at
+            return SpoolStats(
+                appended = self.spool.appended,
+                drained = self.spool.drained,
+                pending = self.spool.pending,
+                size = size,
+                segments = segments,
+                syncs = self.spool.syncs,
+                records_per_sync = self.spool.synced_records / self.spool.syncs if self.spool.syncs else 0.0,
+                drain_rate = sum(records for _, records in self.drain_history) / DRAIN_RATE_WINDOW,
+                backlog_age = now - oldest_pending_at if oldest_pending_at is not None else 0.0,
+                drain_failures = self.drain_failures,
+                dead_lettered = self.dead_lettered,
+                backend_available = self.backend is not None
+            )
+
+    def close(self) -> None:
+        '''
+        Wait up to close_timeout seconds for the spool to drain, then stop draining and close the spool and backend.
+        Readings still in the spool are drained on the next start.
+        '''
+        if self.closed:
+            return
+        self.closed = True
+        if not self.spool.wait_committed(self.spool.written_sequence, self.close_timeout):
+            print(f'{self.spool.pending} readings left in the spool')
+        self.stopped.set()
+        self.spool.close()
+        self.drainer.join()
+        if self.backend is not None:
+            self.backend.close()
+
+    def drain_loop(self) -> None:
+        '''
+        Create the backend, then write spooled records to it in batches, committing each batch once the backend
+        confirmed it. A failed batch is kept and retried after a backoff delay, while a rejected one is written again
+        record by record, committing past the records moved to the dead-letter file.
+        '''
+        failures = 0
+        batch: list[SpoolRecord] = []
+        while not self.stopped.is_set():
+            try:
+                if self.backend is None:
+                    self.backend = self.create_backend()
+                if not batch:
+                    batch = self.spool.read(self.drain_batch_size)
+                    if not batch:
+                        continue
+                try:
+                    self.backend.save_events([record.event for record in batch])
+                    self.backend.flush()
+                except WriteRejected as e:
+                    print(f'Backend rejected a batch of {len(batch)} readings, writing them one at a time: {e}')
+                    self.drain_separately(self.backend, batch)
+            except Exception as e:
+                failures += 1
+                self.drain_failures += 1
+                delay = min(self.retry_delay * 2 ** (failures - 1), self.max_retry_delay)
+                print(f'Backend unavailable, retrying in {delay:.0f}s ({self.spool.pending} readings spooled): {e}')
+                self.stopped.wait(delay)
+                continue
+
+            self.spool.commit(batch[-1].sequence)
+            with self.spool.lock:
+                self.drain_history.append((time.time(), len(batch)))
+            batch = []
+            failures = 0
+
+    def drain_separately(self, backend: Database, batch: list[SpoolRecord]) -> None:
+        '''
+        Write the records of a rejected batch one at a time, and append the ones the backend rejects again to the
+        dead-letter file. Other failures are raised, so the batch is retried whole; records already written are skipped.
+        '''
+        rejected: list[SpoolRecord] = []
+        for record in batch:
+            backend.save_events([record.event])
+            try:
+                backend.flush()
+            except WriteRejected:
+                rejected.append(record)
+        if not rejected:
+            return
+
+        with open(self.dead_letter_path, 'ab') as file:
+            file.write(b''.join(encode_event(record.event) + b'\n' for record in rejected))
+            file.flush()
+            os.fsync(file.fileno())
+        self.dead_lettered += len(rejected)
+        print(f'Moved {len(rejected)} rejected readings to {self.dead_letter_path}')
@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+@dataclass(frozen=True)
+class TimeSeriesTable:
+    '''
+    A typed readings table of the time-series schema, keyed on (device_id, reported_at).
+    Mirrors my_sql/sql/setup_timeseries.sql.
+
+    Attributes:
+        name (str): The table name.
+        columns (dict[str, str]): Column name by row field, for the typed value columns.
+        has_device_type (bool): Whether the table holds several device types and stores each row's type.
+    '''
+    name: str
+    columns: dict[str, str]
+    has_device_type: bool = False
+
+THSENSOR_TABLE = TimeSeriesTable("thsensor_readings", {
+    "temperature": "temperature",
+    "humidity": "humidity",
+    "dew point": "dew_point",
+})
+WATERMETERCONTROLLER_TABLE = TimeSeriesTable("watermetercontroller_readings", {
+    "meter": "meter",
+    "dailyUsage": "daily_usage",
+    "waterFlowing": "water_flowing",
+    "valve": "valve",
+    "leak": "leak",
+    "freezeError": "freeze_error",
+    "temperature": "temperature",
+    "battery": "battery",
+})
+SENSOR_TABLE = TimeSeriesTable("sensor_readings", {
+    "state": "state",
+    "online": "online",
+    "battery": "battery",
+}, has_device_type=True)
+
+# Device types with their own table. Every other device type goes to SENSOR_TABLE.
+TIMESERIES_TABLES: dict[str, TimeSeriesTable] = {
+    "THSensor": THSENSOR_TABLE,
+    "WaterMeterController": WATERMETERCONTROLLER_TABLE,
+}
+ALL_TABLES = [THSENSOR_TABLE, WATERMETERCONTROLLER_TABLE, SENSOR_TABLE]
+
+def get_table(device_type: str) -> TimeSeriesTable:
+    return TIMESERIES_TABLES.get(device_type, SENSOR_TABLE)
+
+def get_insert_statement(table: TimeSeriesTable) -> str:
+    '''
+    Create the insert statement for a table. Readings repeated at the same time overwrite the earlier one.
+    '''
+    columns = ["device_id", "reported_at"] + (["device_type"] if table.has_device_type else []) + list(table.columns.values())
+    updates = ", ".join(f"{column} = VALUES({column})" for column in table.columns.values())
+    return (
+        f"INSERT INTO {table.name} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON DUPLICATE KEY UPDATE {updates}"
+    )
+
+def parse_timestamp(timestamp: str | None) -> datetime:
+    '''
+    Convert a reportAt timestamp, such as "2024-01-01T00:00:00.000Z", to a naive UTC datetime. Defaults to now.
+    '''
+    if not timestamp:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def get_partition_name(month: datetime) -> str:
+    return month.strftime("p%Y%m")
@@ -0,0 +1,262 @@
+'''
+Derived metrics computed from columns of readings with NumPy, for live sweeps and for backfilling stored readings.
+
+Every function takes whole columns, so a sweep of a few sensors and a day of archived readings go through the same
+code. DerivedMetrics picks the metrics the given columns allow:
+
+    temperature                  Converted from the input unit to the output unit
+    temperature, humidity        dew point (approximate or Magnus formula) and heat index
+    deviceId, meter, time        flow rate from the meter deltas of each device, in meter units per minute
+'''
+import threading
+from array import array
+from typing import Mapping, Sequence
+
+import numpy as np
+
+from Api.persistence_archive import ArchiveReader, FLOAT, INT, TIMESTAMP, BOOL, MISSING_INT
+from Interfaces.Data.Event import DEVICE_ID_FIELD, TIMESTAMP_FIELD
+
+CELSIUS = "C"
+FAHRENHEIT = "F"
+
+# Magnus formula coefficients of Alduchov and Eskridge (1996), within 0.1 °C of the true dew point from -40 to 50 °C
+MAGNUS_B = 17.625
+MAGNUS_C = 243.04
+
+# Rothfusz regression used by the US National Weather Service, in °F and percent relative humidity
+HEAT_INDEX_COEFFICIENTS = (-42.379, 2.04901523, 10.14333127, -0.22475541, -0.00683783, -0.05481717, 0.00122874, 0.00085282, -0.00000199)
+HEAT_INDEX_THRESHOLD = 80.0 # °F below which the simple formula is used
+
+TEMPERATURE_FIELD = "temperature"
+HUMIDITY_FIELD = "humidity"
+METER_FIELD = "meter"
+METER_STEP_FACTOR_FIELD = "meterStepFactor"
+DEW_POINT_FIELD = "dew point"
+HEAT_INDEX_FIELD = "heat index"
+FLOW_RATE_FIELD = "flow rate"
+
+def to_fahrenheit(celsius: np.ndarray) -> np.ndarray:
+    return celsius * 1.8 + 32
+
+def to_celsius(fahrenheit: np.ndarray) -> np.ndarray:
+    return (fahrenheit - 32) / 1.8
+
+def convert_temperature(temperature: np.ndarray, from_unit: str, to_unit: str) -> np.ndarray:
+    if from_unit == to_unit:
+        return temperature
+    return to_fahrenheit(temperature) if to_unit == FAHRENHEIT else to_celsius(temperature)
+
+def get_dew_point_approximate(temperature: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    '''
+    Dew point in °C from the approximation at https://iridl.ldeo.columbia.edu/dochelp/QA/Basic/dewpoint.html,
+    "fairly accurate for relative humidity values above 50%".
+
+    Args:
+        temperature (np.ndarray): Temperature in °C.
+        humidity (np.ndarray): Relative humidity in percent.
+    '''
+    return temperature - (100 - humidity) / 5
+
+def get_dew_point_magnus(temperature: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    '''
+    Dew point in °C from the Magnus formula, accurate at any humidity. Readings with no humidity have no dew point, NaN.
+
+    Args:
+        temperature (np.ndarray): Temperature in °C.
+        humidity (np.ndarray): Relative humidity in percent.
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gamma = np.log(humidity / 100) + MAGNUS_B * temperature / (MAGNUS_C + temperature)
+        dew_point = MAGNUS_C * gamma / (MAGNUS_B - gamma)
+    return np.where(humidity > 0, dew_point, np.nan)
+
+def get_heat_index(temperature: np.ndarray, humidity: np.ndarray) -> np.ndarray:
+    '''
+    Heat index in °C, following https://www.wpc.ncep.noaa.gov/html/heatindex_equation.shtml.
+
+    Args:
+        temperature (np.ndarray): Temperature in °C.
+        humidity (np.ndarray): Relative humidity in percent.
+    '''
+    t = to_fahrenheit(temperature)
+    rh = humidity
+    simple = 0.5 * (t + 61 + (t - 68) * 1.2 + rh * 0.094)
+
+    c = HEAT_INDEX_COEFFICIENTS
+    full = (c[0] + c[1] * t + c[2] * rh + c[3] * t * rh + c[4] * t * t + c[5] * rh * rh
+        + c[6] * t * t * rh + c[7] * t * rh * rh + c[8] * t * t * rh * rh)
+    with np.errstate(invalid='ignore'):
+        dry = (rh < 13) & (t >= 80) & (t <= 112)
+        full -= np.where(dry, (13 - rh) / 4 * np.sqrt(np.maximum(17 - np.abs(t - 95), 0) / 17), 0)
+        humid = (rh > 85) & (t >= 80) & (t <= 87)
+        full += np.where(humid, (rh - 85) / 10 * ((87 - t) / 5), 0)
+
+    heat_index = np.where((simple + t) / 2 < HEAT_INDEX_THRESHOLD, simple, full)
+    return to_celsius(heat_index)
+
+def get_epoch_seconds(times: Sequence | np.ndarray) -> np.ndarray:
+    '''
+    Converts reportAt values to seconds since the epoch: ISO 8601 strings, or milliseconds as stored by the archive.
+    '''
+    values = np.asarray(times)
+    if values.dtype.kind in 'iuf':
+        return values.astype(np.float64) / 1000
+    # NumPy parses ISO 8601 without the UTC designator, which every reportAt has
+    parsed = np.array([str(value).rstrip('Z') for value in values], dtype='datetime64[ms]')
+    return parsed.astype(np.int64) / 1000
+
+def get_flow_rate(device_ids: np.ndarray, times: np.ndarray, volumes: np.ndarray,
+        previous: dict[str, tuple[float, float]] | None = None
+    ) -> np.ndarray:
+    '''
+    Flow rate of every reading, in volume units per minute, from the meter delta since the device's previous reading.
+    Rows may be in any order. The first reading of a device, readings whose time did not move forward and readings
+    after a meter reset have no rate, NaN.
+
+    Args:
+        device_ids (np.ndarray): Device of every reading.
+        times (np.ndarray): Seconds since the epoch of every reading.
+        volumes (np.ndarray): Meter volume of every reading.
+        previous (dict[str, tuple[float, float]], optional): Latest (time, volume) of each device before these readings.
+            Updated with the latest reading of each device, so consecutive sweeps continue where the last ended.
+    '''
+    count = len(volumes)
+    if count == 0:
+        return np.empty(0)
+    # Sorting integer codes is several times faster than sorting the ID strings
+    codes_by_id: dict[str, int] = {}
+    codes = np.fromiter((codes_by_id.setdefault(device_id, len(codes_by_id)) for device_id in device_ids.tolist()),
+        dtype=np.int64, count=count)
+    ids_by_code = list(codes_by_id)
+    order = np.lexsort((times, codes))
+    sorted_codes = codes[order]
+    sorted_times = times[order]
+    sorted_volumes = volumes[order]
+
+    first = np.ones(count, dtype=bool)
+    first[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    previous_times = np.empty(count)
+    previous_volumes = np.empty(count)
+    previous_times[1:] = sorted_times[:-1]
+    previous_volumes[1:] = sorted_volumes[:-1]
+    previous_times[first] = np.nan
+    previous_volumes[first] = np.nan
+
+    if previous is not None:
+        # One lookup per device, not per reading
+        for index in np.flatnonzero(first):
+            last = previous.get(ids_by_code[sorted_codes[index]])
+            if last is not None:
+                previous_times[index], previous_volumes[index] = last
+        last_of_device = np.ones(count, dtype=bool)
+        last_of_device[:-1] = first[1:]
+        for index in np.flatnonzero(last_of_device):
+            previous[ids_by_code[sorted_codes[index]]] = (float(sorted_times[index]), float(sorted_volumes[index]))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        elapsed = sorted_times - previous_times
+        used = sorted_volumes - previous_volumes
+        rates = np.where((elapsed > 0) & (used >= 0), used / elapsed * 60, np.nan)
+    result = np.empty(count)
+    result[order] = rates
+    return result
+
+class DerivedMetrics:
+    '''
+    Computes derived metrics from columns of readings. Keeps the latest meter reading of every device,
+    so the flow rate of a sweep is measured from the previous sweep, and a backfill carries on across days.
+
+    Methods:
+        derive: Computes every derived metric the given columns allow.
+    '''
+
+    def __init__(self,
+            input_unit: str = CELSIUS,
+            output_unit: str = CELSIUS,
+            accurate_dew_point: bool = False
+        ):
+        '''
+        Args:
+            input_unit (str, optional): Unit of the temperature columns, CELSIUS or FAHRENHEIT.
+            output_unit (str, optional): Unit of the converted temperature, dew point and heat index.
+            accurate_dew_point (bool, optional): Use the Magnus formula instead of the approximation.
+        '''
+        self.input_unit = input_unit
+        self.output_unit = output_unit
+        self.accurate_dew_point = accurate_dew_point
+        self.meters: dict[str, tuple[float, float]] = {} # Latest (time, volume) by device ID
+        self.lock = threading.Lock()
+
+    def derive(self, columns: Mapping[str, Sequence | np.ndarray], times: Sequence[float] | np.ndarray | None = None) -> dict[str, np.ndarray]:
+        '''
+        Compute every derived metric the columns allow.
+
+        Args:
+            columns (Mapping[str, Sequence | np.ndarray]): Columns of readings by field name, all the same length.
+            times (np.ndarray, optional): Seconds since the epoch of every reading, for readings without reportAt.
+
+        Returns:
+            dict[str, np.ndarray]: The temperature in the output unit and the derived metrics, by field name.
+        '''
+        derived: dict[str, np.ndarray] = {}
+        if TEMPERATURE_FIELD in columns:
+            temperature = convert_temperature(np.asarray(columns[TEMPERATURE_FIELD], dtype=np.float64), self.input_unit, CELSIUS)
+            derived[TEMPERATURE_FIELD] = convert_temperature(temperature, CELSIUS, self.output_unit)
+            if HUMIDITY_FIELD in columns:
+                humidity = np.asarray(columns[HUMIDITY_FIELD], dtype=np.float64)
+                get_dew_point = get_dew_point_magnus if self.accurate_dew_point else get_dew_point_approximate
+                derived[DEW_POINT_FIELD] = convert_temperature(get_dew_point(temperature, humidity), CELSIUS, self.output_unit)
+                derived[HEAT_INDEX_FIELD] = convert_temperature(get_heat_index(temperature, humidity), CELSIUS, self.output_unit)
+
+        if METER_FIELD in columns and DEVICE_ID_FIELD in columns and (times is not None or TIMESTAMP_FIELD in columns):
+            volumes = np.asarray(columns[METER_FIELD], dtype=np.float64)
+            if METER_STEP_FACTOR_FIELD in columns:
+                step_factors = np.asarray(columns[METER_STEP_FACTOR_FIELD], dtype=np.float64)
+                volumes = volumes / np.where(step_factors > 0, step_factors, 1)
+            with self.lock:
+                derived[FLOW_RATE_FIELD] = get_flow_rate(
+                    np.asarray(columns[DEVICE_ID_FIELD]),
+                    np.asarray(times, dtype=np.float64) if times is not None else get_epoch_seconds(columns[TIMESTAMP_FIELD]),
+                    volumes,
+                    self.meters
+                )
+        return derived
+
+def to_numpy(values: array | list, column_type: str) -> np.ndarray:
+    '''
+    Convert a column read from the archive, viewing fixed-width columns without copying them.
+    Missing integers and timestamps are returned as NaN.
+    '''
+    if isinstance(values, list):
+        # String columns are read as lists
+        return np.asarray(values)
+    return view_array(values, column_type)
+
+def view_array(values: array, column_type: str) -> np.ndarray:
+    '''
+    View a fixed-width column as a NumPy array, converting only integer columns with missing values.
+    '''
+    if column_type == FLOAT:
+        return np.frombuffer(values, dtype=np.float64)
+    if column_type in (INT, TIMESTAMP):
+        integers = np.frombuffer(values, dtype=np.int64)
+        if (integers == MISSING_INT).any():
+            return np.where(integers == MISSING_INT, np.nan, integers)
+        return integers
+    if column_type == BOOL:
+        return np.frombuffer(values, dtype=np.int8)
+    return np.asarray(values)
+
+def derive_archived_day(reader: ArchiveReader, device_type: str, day: str, metrics: DerivedMetrics) -> dict[str, np.ndarray]:
+    '''
+    Compute the derived metrics of one archived day of a device type, for backfilling.
+    Days should be derived in order, so that flow rates carry on from the previous day.
+    '''
+    column_types = reader.get_columns(device_type, day)
+    needed = {TEMPERATURE_FIELD, HUMIDITY_FIELD, METER_FIELD, METER_STEP_FACTOR_FIELD, DEVICE_ID_FIELD, TIMESTAMP_FIELD}
+    columns = {
+        name: to_numpy(reader.read_column(device_type, day, name), column_type)
+        for name, column_type in column_types.items() if name in needed
+    }
+    return metrics.derive(columns)
@@ -0,0 +1,137 @@
+'''
+Converts readings stored in the EAV schema (events and data tables) into the time-series schema.
+
+Usage, from the src directory:
+    python -m Api.migrate_eav <user> [--chunk-size N]
+
+The conversion runs on the server as INSERT ... SELECT statements that pivot the data rows of a range of events
+into typed columns, one transaction per range. It is idempotent, so an interrupted migration can be run again.
+'''
+import argparse
+import time
+
+from Api.DatabaseMySQL import DatabaseMySQL, SCHEMA_TIMESERIES, DEVICE_TYPE_IDS
+from Api.TimeSeriesSchema import TimeSeriesTable, TIMESERIES_TABLES, SENSOR_TABLE
+
+DEFAULT_CHUNK_SIZE = 50000 # Events converted per transaction
+
+# How each time-series column is converted from its VARCHAR data_value
+NUMERIC_COLUMNS = {"temperature", "humidity", "dew_point", "meter", "daily_usage", "battery"}
+BOOLEAN_COLUMNS = {"water_flowing", "leak", "freeze_error", "online"}
+
+def get_value_expression(field: str, column: str) -> str:
+    value = f"MAX(CASE WHEN d.data_name = '{field}' THEN d.data_value END)"
+    if column in NUMERIC_COLUMNS:
+        return f"CAST({value} AS DECIMAL(20, 6))"
+    if column in BOOLEAN_COLUMNS:
+        return f"({value} IN ('True', '1', 'true'))"
+    return value
+
+def get_migration_statement(table: TimeSeriesTable, device_type_ids: list[int]) -> str:
+    '''
+    Create the statement that pivots a range of events of the given device types into a time-series table.
+    It takes the first and last event_id of the range as parameters.
+    '''
+    columns = ["device_id", "reported_at"]
+    values = [
+        "dev.device_uid",
+        # Timestamps are ISO 8601 strings, with milliseconds when they have a fraction;
+        # the driver's parameter style needs % doubled
+        "CASE WHEN SUBSTRING(e.event_timestamp, 20, 1) = '.' "
+        "THEN STR_TO_DATE(LEFT(e.event_timestamp, 23), '%%Y-%%m-%%dT%%H:%%i:%%s.%%f') "
+        "ELSE STR_TO_DATE(LEFT(e.event_timestamp, 19), '%%Y-%%m-%%dT%%H:%%i:%%s') END",
+    ]
+    if table.has_device_type:
+        columns.append("device_type")
+        cases = " ".join(f"WHEN {type_id} THEN '{device_type}'" for device_type, type_id in DEVICE_TYPE_IDS.items())
+        values.append(f"CASE dev.device_type_id {cases} ELSE 'Unknown' END")
+    for field, column in table.columns.items():
+        columns.append(column)
+        values.append(get_value_expression(field, column))
+
+    type_ids = ", ".join(str(type_id) for type_id in device_type_ids)
+    updates = ", ".join(f"{column} = VALUES({column})" for column in table.columns.values())
+    return (
+        f"INSERT INTO {table.name} ({', '.join(columns)}) "
+        f"SELECT {', '.join(values)} "
+        f"FROM events e "
+        f"JOIN devices dev ON dev.device_id = e.event_source_device_id "
+        f"JOIN data d ON d.event_id = e.event_id "
+        f"WHERE dev.device_type_id IN ({type_ids}) AND e.event_id BETWEEN %s AND %s "
+        f"GROUP BY e.event_id, dev.device_uid, dev.device_type_id, e.event_timestamp "
+        f"ON DUPLICATE KEY UPDATE {updates}"
+    )
+
+def get_migration_statements() -> list[str]:
+    '''
+    Create a migration statement for every time-series table.
+    '''
+    statements = []
+    for device_type, table in TIMESERIES_TABLES.items():
+        statements.append(get_migration_statement(table, [DEVICE_TYPE_IDS[device_type]]))
+    other_type_ids = [type_id for device_type, type_id in DEVICE_TYPE_IDS.items() if device_type not in TIMESERIES_TABLES]
+    statements.append(get_migration_statement(SENSOR_TABLE, other_type_ids + [len(DEVICE_TYPE_IDS)]))
+    return statements
+
+def migrate(database: DatabaseMySQL, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    '''
+    Convert every EAV event into the time-series tables, chunk_size events per transaction.
+
+    Args:
+        database (DatabaseMySQL): A database in the time-series schema, in the same MySQL schema as the EAV tables.
+        chunk_size (int, optional): Events converted per transaction.
+
+    Returns:
+        int: Number of time-series rows inserted or updated.
+    '''
+    statements = get_migration_statements()
+
+    def get_event_range(connection) -> tuple[int | None, int | None]:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT MIN(event_id), MAX(event_id) FROM events")
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    first_event, last_event = database.pool.run(get_event_range)
+    if first_event is None or last_event is None:
+        return 0
+
+    migrated = 0
+    start = time.monotonic()
+    for chunk_start in range(first_event, last_event + 1, chunk_size):
+        chunk_end = min(chunk_start + chunk_size - 1, last_event)
+
+        def migrate_chunk(connection) -> int:
+            cursor = connection.cursor()
+            try:
+                rows = 0
+                for statement in statements:
+                    cursor.execute(statement, (chunk_start, chunk_end))
+                    rows += cursor.rowcount
+                connection.commit()
+                return rows
+            except BaseException:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        migrated += database.pool.run(migrate_chunk)
+        print(f'Migrated events {chunk_start} to {chunk_end} of {last_event} ({time.monotonic() - start:.1f}s)')
+
+    return migrated
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert EAV readings into the time-series schema.")
+    parser.add_argument("user", help="The user whose MySQL credentials are used")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Events converted per transaction")
+    arguments = parser.parse_args()
+
+    # Creates the time-series tables if needed, without dropping anything
+    database = DatabaseMySQL(arguments.user, schema=SCHEMA_TIMESERIES, reset_on_start=False)
+    try:
+        print(f'Migrated {migrate(database, arguments.chunk_size)} rows')
+    finally:
+        database.close()
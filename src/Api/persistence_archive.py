@@ -0,0 +1,638 @@
+'''
+Compressed columnar archive of readings, for long-term retention.
+
+Readings are partitioned by device type and UTC day of their reportAt:
+
+    <archive_dir>/<device type>/<YYYY-MM-DD>/_schema.json
+    <archive_dir>/<device type>/<YYYY-MM-DD>/<column>.col
+
+Every column file is a sequence of blocks, one per flush, holding the same rows in every column of the partition.
+A block is a header (codec, rows, raw size, stored size) followed by its payload, compressed on its own so that files
+can be appended to while open and read one block at a time. Payloads of fixed-width columns are native arrays;
+string payloads are the encoded lengths followed by the UTF-8 bytes. _schema.json records the committed rows and the
+committed size of every column file, so readers never see a block that is still being written.
+'''
+import json
+import lzma
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, Literal, Sequence
+
+from Interfaces.Database import Database
+from Interfaces.Data.Event import EVENT_FIELDS, DEVICE_NAME_FIELD, DEVICE_ID_FIELD, TIMESTAMP_FIELD
+from Interfaces.Data.QueryChunk import QueryChunk, ChunkBuilder, DEFAULT_CHUNK_SIZE
+from Interfaces.Responses.Response import ResponseData, get_response_type, get_state_method
+
+ARCHIVE_DIR = 'archive'
+SCHEMA_FILE = '_schema.json'
+COLUMN_EXT = '.col'
+
+DEFAULT_BLOCK_ROWS = 4096 # Rows buffered per partition before they are written as a block
+DEFAULT_FLUSH_INTERVAL = 30.0 # Seconds between timed flushes of every partition
+DEFAULT_MAX_OPEN_PARTITIONS = 8 # Partitions kept open, least recently used closed first
+DAY_MILLISECONDS = 86_400_000
+
+# Column types and the array type codes of their values. Strings have their own encoding.
+FLOAT = "float"
+INT = "int"
+BOOL = "bool"
+STR = "str"
+TIMESTAMP = "timestamp" # Milliseconds since the epoch, UTC
+TYPE_CODES: dict[str, Literal['d', 'q', 'b']] = {FLOAT: 'd', INT: 'q', BOOL: 'b', TIMESTAMP: 'q'}
+
+# Values stored for missing or unconvertible readings
+MISSING_INT = -2**63
+MISSING_BOOL = -1
+MISSING_STR_LENGTH = 0xFFFFFFFF
+
+# Block codecs
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+CODECS = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "lzma": CODEC_LZMA}
+BLOCK_HEADER = struct.Struct('<BIII') # codec, rows, raw size, stored size
+
+FIELD_TYPES = {float: FLOAT, int: INT, bool: BOOL, str: STR}
+EVENT_COLUMN_TYPES = {DEVICE_NAME_FIELD: STR, DEVICE_ID_FIELD: STR, TIMESTAMP_FIELD: TIMESTAMP}
+
+def get_field_types(response_type: type[ResponseData]) -> dict[str, str]:
+    '''
+    Returns the column type of every scalar field of a ResponseData subclass.
+    '''
+    return {
+        name: FIELD_TYPES[field.value_type]
+        for name, field in response_type.FIELDS.items() if field.value_type in FIELD_TYPES
+    }
+
+def get_column_types(device_type: str) -> dict[str, str]:
+    '''
+    Returns the column types of a device type: the scalar attributes of its getState data, and the event columns,
+    which take precedence so that reportAt is always a timestamp. Device types without getState data only have
+    the event columns.
+    '''
+    try:
+        response_type = get_response_type(device_type, get_state_method(device_type))
+    except KeyError:
+        return dict(EVENT_COLUMN_TYPES)
+    return get_field_types(response_type) | EVENT_COLUMN_TYPES
+
+def infer_column_type(value: Any) -> str:
+    '''
+    Returns the column type of a value in a column that the device type's data does not declare.
+    '''
+    if isinstance(value, bool):
+        return BOOL
+    if isinstance(value, int):
+        return INT
+    if isinstance(value, float):
+        return FLOAT
+    return STR
+
+def to_timestamp(value: Any) -> int:
+    '''
+    Convert a reportAt timestamp, such as "2024-01-01T00:00:00.000Z", to milliseconds since the epoch.
+    Naive timestamps are taken as UTC.
+    '''
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+def to_int(value: Any) -> int:
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{value} is not an integer")
+    return int(value)
+
+def to_bool(value: Any) -> int:
+    if isinstance(value, str):
+        return int(value.lower() in ("true", "1"))
+    return int(bool(value))
+
+# Convert a value to its column type, raising ValueError or TypeError if it cannot be converted
+CONVERTERS: dict[str, Callable[[Any], Any]] = {FLOAT: float, INT: to_int, BOOL: to_bool, STR: str, TIMESTAMP: to_timestamp}
+
+def get_missing_value(column_type: str) -> Any:
+    if column_type == FLOAT:
+        return math.nan
+    if column_type == BOOL:
+        return MISSING_BOOL
+    if column_type == STR:
+        return None
+    return MISSING_INT
+
+def to_query_value(value: Any, column_type: str) -> Any:
+    '''
+    Convert a stored value to the value returned by queries, None if it is missing.
+    '''
+    if column_type == FLOAT:
+        return None if math.isnan(value) else value
+    if column_type == BOOL:
+        return None if value == MISSING_BOOL else bool(value)
+    if column_type in (INT, TIMESTAMP):
+        return None if value == MISSING_INT else value
+    return value
+
+def encode_values(values: Sequence[Any], column_type: str) -> bytes:
+    if column_type == STR:
+        encoded = [None if value is None else value.encode() for value in values]
+        lengths = array('I', [MISSING_STR_LENGTH if value is None else len(value) for value in encoded])
+        return lengths.tobytes() + b''.join([value for value in encoded if value is not None])
+    return array(TYPE_CODES[column_type], values).tobytes()
+
+def decode_values(payload: memoryview, column_type: str, rows: int) -> Sequence[Any]:
+    '''
+    Decode a block payload. Fixed-width columns are returned as a typed view of the payload, without copying it.
+    '''
+    if column_type != STR:
+        return payload.cast(TYPE_CODES[column_type])
+    lengths = array('I')
+    lengths.frombytes(payload[:4 * rows])
+    values: list[str | None] = []
+    offset = 4 * rows
+    for length in lengths:
+        if length == MISSING_STR_LENGTH:
+            values.append(None)
+        else:
+            values.append(str(payload[offset:offset + length], 'utf-8'))
+            offset += length
+    return values
+
+def compress(raw: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.compress(raw)
+    if codec == CODEC_LZMA:
+        return lzma.compress(raw)
+    return raw
+
+def decompress(stored: memoryview, codec: int) -> memoryview:
+    if codec == CODEC_ZLIB:
+        return memoryview(zlib.decompress(stored))
+    if codec == CODEC_LZMA:
+        return memoryview(lzma.decompress(stored))
+    return stored
+
+def get_column_filename(name: str, taken: set[str]) -> str:
+    '''
+    Returns a file name for a column, made of safe characters and unique within its partition.
+    '''
+    base = re.sub(r'[^A-Za-z0-9_-]', '_', name)
+    filename = base + COLUMN_EXT
+    suffix = 1
+    while filename in taken:
+        suffix += 1
+        filename = f'{base}_{suffix}{COLUMN_EXT}'
+    return filename
+
+def load_partition_schema(path: str) -> dict:
+    try:
+        with open(os.path.join(path, SCHEMA_FILE), 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"rows": 0, "byteorder": sys.byteorder, "columns": []}
+
+@dataclass
+class ArchiveWriterStats:
+    '''
+    Attributes:
+        rows (int): Rows accepted by save.
+        blocks (int): Column blocks written.
+        raw_bytes (int): Size of the written blocks before compression.
+        stored_bytes (int): Size of the written blocks after compression, including their headers.
+        conversion_errors (int): Values that could not be converted to their column type and were stored as missing.
+    '''
+    rows: int = 0
+    blocks: int = 0
+    raw_bytes: int = 0
+    stored_bytes: int = 0
+    conversion_errors: int = 0
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.raw_bytes / self.stored_bytes if self.stored_bytes else 0.0
+
+class ColumnWriter:
+    '''
+    Appends blocks to one column file of a partition.
+    '''
+
+    def __init__(self, path: str, name: str, column_type: str, filename: str, rows: int, size: int):
+        self.name = name
+        self.column_type = column_type
+        self.convert = CONVERTERS[column_type]
+        self.missing = get_missing_value(column_type)
+        self.filename = filename
+        self.rows = rows
+        self.size = size
+        self.file = open(os.path.join(path, filename), 'ab')
+        # Drop a block left half-written by a crash after the last committed flush
+        if self.file.tell() != size:
+            self.file.truncate(size)
+            self.file.seek(size)
+
+    def write_block(self, values: Sequence[Any], codec: int, stats: ArchiveWriterStats) -> None:
+        raw = encode_values(values, self.column_type)
+        stored = compress(raw, codec)
+        self.file.write(BLOCK_HEADER.pack(codec, len(values), len(raw), len(stored)))
+        self.file.write(stored)
+        self.rows += len(values)
+        self.size += BLOCK_HEADER.size + len(stored)
+        stats.blocks += 1
+        stats.raw_bytes += len(raw)
+        stats.stored_bytes += BLOCK_HEADER.size + len(stored)
+
+    def close(self) -> None:
+        self.file.close()
+
+class PartitionWriter:
+    '''
+    Buffers the rows of one device type and day, and writes them to the partition's column files as aligned blocks.
+    '''
+
+    def __init__(self, path: str, column_types: dict[str, str], codec: int):
+        self.path = path
+        self.column_types = column_types
+        self.codec = codec
+        os.makedirs(path, exist_ok=True)
+
+        schema = load_partition_schema(path)
+        self.rows: int = schema["rows"]
+        self.columns: dict[str, ColumnWriter] = {}
+        for column in schema["columns"]:
+            self.columns[column["name"]] = ColumnWriter(
+                path, column["name"], column["type"], column["file"], self.rows, column["size"]
+            )
+        self.pending: dict[str, list[Any]] = {name: [] for name in self.columns}
+        self.pending_rows = 0
+
+    def append(self, row: OrderedDict[str, str|int|float], reported_at: int, stats: ArchiveWriterStats) -> None:
+        '''
+        Buffer a row. reported_at is its already converted timestamp.
+        '''
+        for name, value in row.items():
+            if name not in self.columns:
+                column_type = self.column_types.get(name) or infer_column_type(value)
+                filename = get_column_filename(name, {column.filename for column in self.columns.values()})
+                self.columns[name] = ColumnWriter(self.path, name, column_type, filename, 0, 0)
+                self.pending[name] = [get_missing_value(column_type)] * self.pending_rows
+
+        for name, column in self.columns.items():
+            raw = row.get(name)
+            if name == TIMESTAMP_FIELD:
+                converted = reported_at
+            elif raw is None:
+                converted = column.missing
+            else:
+                try:
+                    converted = column.convert(raw)
+                except (TypeError, ValueError):
+                    converted = column.missing
+                    stats.conversion_errors += 1
+            self.pending[name].append(converted)
+        self.pending_rows += 1
+
+    def flush(self, stats: ArchiveWriterStats) -> None:
+        '''
+        Write the pending rows as one block per column, then commit them in the partition schema.
+        '''
+        if not self.pending_rows:
+            return
+        for name, column in self.columns.items():
+            # A column that first appeared after rows were committed starts with a block of missing values
+            if column.rows < self.rows:
+                missing = [get_missing_value(column.column_type)] * (self.rows - column.rows)
+                column.write_block(missing, self.codec, stats)
+            column.write_block(self.pending[name], self.codec, stats)
+            column.file.flush()
+        self.rows += self.pending_rows
+        self.pending = {name: [] for name in self.columns}
+        self.pending_rows = 0
+        self.save_schema()
+
+    def save_schema(self) -> None:
+        schema = {
+            "rows": self.rows,
+            "byteorder": sys.byteorder,
+            "columns": [
+                {"name": column.name, "type": column.column_type, "file": column.filename, "size": column.size}
+                for column in self.columns.values()
+            ],
+        }
+        schema_path = os.path.join(self.path, SCHEMA_FILE)
+        temp_path = schema_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(schema, file)
+        os.replace(temp_path, schema_path)
+
+    def sync(self) -> None:
+        for column in self.columns.values():
+            os.fsync(column.file.fileno())
+
+    def close(self, stats: ArchiveWriterStats) -> None:
+        self.flush(stats)
+        self.sync()
+        for column in self.columns.values():
+            column.close()
+
+class DatabaseArchive(Database):
+    '''
+    Saves readings to a compressed columnar archive, one partition per device type and UTC day.
+    Column types are derived from the device type's getState data, so numbers and flags are stored as such.
+    Rows are buffered per partition and written as a block once block_rows are pending, every flush_interval seconds
+    and on close. Partitions stay open in a bounded LRU cache; a closed partition is reopened and appended to.
+    '''
+
+    def __init__(self,
+            archive_dir: str = ARCHIVE_DIR,
+            block_rows: int = DEFAULT_BLOCK_ROWS,
+            flush_interval: float | None = DEFAULT_FLUSH_INTERVAL,
+            compression: str = "zlib",
+            max_open_partitions: int = DEFAULT_MAX_OPEN_PARTITIONS
+        ):
+        '''
+        Args:
+            archive_dir (str, optional): Root directory of the archive.
+            block_rows (int, optional): Rows buffered per partition before they are written.
+            flush_interval (float, optional): Seconds between timed flushes. None flushes only on size and close.
+            compression (str, optional): Block codec, one of "zlib", "lzma" or "none". Uncompressed blocks can be read
+                straight from a memory map.
+            max_open_partitions (int, optional): Partitions kept open at once.
+        '''
+        self.archive_dir = archive_dir
+        self.block_rows = block_rows
+        self.flush_interval = flush_interval
+        self.codec = CODECS[compression]
+        self.max_open_partitions = max_open_partitions
+        os.makedirs(archive_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.partitions: OrderedDict[tuple[str, str], PartitionWriter] = OrderedDict()
+        self.column_types: dict[str, dict[str, str]] = {}
+        self.days: dict[int, str] = {} # Partition day by days since the epoch
+        self.stats = ArchiveWriterStats()
+        self.closed = False
+
+        self.stopped = threading.Event()
+        self.flusher = None
+        if flush_interval is not None:
+            self.flusher = threading.Thread(target=self.flush_loop, name="archive-flusher", daemon=True)
+            self.flusher.start()
+
+    def save(self, device_type: str, header: OrderedDict[str, str|int|float]) -> None:
+        '''
+        Buffer a row in the partition of its device type and day.
+
+        Args:
+            device_type (str): The type of device.
+            header (OrderedDict[str, str|int|float]): The row to save. Its "reportAt", if present, decides the partition.
+        '''
+        timestamp = header.get(TIMESTAMP_FIELD)
+        reported_at = to_timestamp(timestamp) if timestamp else int(time.time() * 1000)
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("database is closed")
+            partition = self.get_partition(device_type, self.get_day(reported_at))
+            partition.append(header, reported_at, self.stats)
+            self.stats.rows += 1
+            if partition.pending_rows >= self.block_rows:
+                partition.flush(self.stats)
+
+    def add_device(self, device_id, device_name, device_type, timestamp) -> None:
+        pass
+
+    def flush(self) -> None:
+        '''
+        Write the pending rows of every open partition and sync them to disk.
+        '''
+        with self.lock:
+            for partition in self.partitions.values():
+                partition.flush(self.stats)
+                partition.sync()
+
+    def close(self) -> None:
+        '''
+        Flush and close every partition and stop the flusher.
+        '''
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            for partition in self.partitions.values():
+                partition.close(self.stats)
+            self.partitions.clear()
+        self.stopped.set()
+        if self.flusher is not None:
+            self.flusher.join()
+
+    def get_stats(self) -> ArchiveWriterStats:
+        with self.lock:
+            return ArchiveWriterStats(**vars(self.stats))
+
+    def query(self, device_ids: list[str] | None, fields: list[str] | None, start: float, end: float,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[QueryChunk]:
+        '''
+        Read the rows reported within a time range, in chunks of columns, after writing the pending rows.
+        Only the partitions of the days in the range are opened, and only the columns asked for are read.
+
+        Args:
+            device_ids (list[str] | None): Devices to read. None reads every device.
+            fields (list[str] | None): Fields to read, in column order. None reads every field.
+            start (float): Start of the range in epoch seconds, included.
+            end (float): End of the range in epoch seconds, excluded.
+            chunk_size (int, optional): Most rows per chunk.
+        '''
+        with self.lock:
+            for partition in self.partitions.values():
+                partition.flush(self.stats)
+        start_time, end_time = int(start * 1000), int(end * 1000)
+        first_day = time.strftime("%Y-%m-%d", time.gmtime(start_time // 1000))
+        last_day = time.strftime("%Y-%m-%d", time.gmtime((end_time - 1) // 1000))
+        wanted = set(device_ids) if device_ids is not None else None
+
+        reader = ArchiveReader(self.archive_dir)
+        builder = ChunkBuilder(fields)
+        for device_type in reader.get_device_types():
+            for day in reader.get_days(device_type):
+                if not first_day <= day <= last_day:
+                    continue
+                column_types = reader.get_columns(device_type, day)
+                ids = reader.read_column(device_type, day, DEVICE_ID_FIELD)
+                times = reader.read_column(device_type, day, TIMESTAMP_FIELD)
+                rows = [
+                    row for row in range(len(times))
+                    if start_time <= times[row] < end_time and (wanted is None or ids[row] in wanted)
+                ]
+                if not rows:
+                    continue
+                rows.sort(key=times.__getitem__)
+                names = [name for name in (fields if fields is not None else column_types)
+                    if name in column_types and name not in EVENT_FIELDS]
+                columns = {name: reader.read_column(device_type, day, name) for name in names}
+                for row in rows:
+                    builder.add(ids[row], times[row],
+                        {name: to_query_value(values[row], column_types[name]) for name, values in columns.items()})
+                    if len(builder) >= chunk_size:
+                        yield builder.build()
+        if len(builder):
+            yield builder.build()
+
+    def flush_loop(self) -> None:
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
+
+    def get_day(self, reported_at: int) -> str:
+        '''
+        Returns the UTC day of a timestamp in milliseconds, caching the name of every day seen.
+        '''
+        day_number = reported_at // DAY_MILLISECONDS
+        day = self.days.get(day_number)
+        if day is None:
+            day = self.days[day_number] = time.strftime("%Y-%m-%d", time.gmtime(day_number * DAY_MILLISECONDS // 1000))
+        return day
+
+    def get_partition(self, device_type: str, day: str) -> PartitionWriter:
+        '''
+        Return the open partition of a device type and day, opening it and closing the least recently used
+        partition if needed. Called with the lock held.
+        '''
+        key = (device_type, day)
+        partition = self.partitions.get(key)
+        if partition is not None:
+            self.partitions.move_to_end(key)
+            return partition
+
+        if len(self.partitions) >= self.max_open_partitions:
+            _, evicted = self.partitions.popitem(last=False)
+            evicted.close(self.stats)
+        column_types = self.column_types.get(device_type)
+        if column_types is None:
+            column_types = self.column_types[device_type] = get_column_types(device_type)
+        partition = PartitionWriter(os.path.join(self.archive_dir, device_type, day), column_types, self.codec)
+        self.partitions[key] = partition
+        return partition
+
+class ColumnReader:
+    '''
+    Reads one column of a partition block by block, up to the rows committed when it was opened.
+    With use_mmap, the file is memory-mapped and uncompressed blocks of fixed-width columns are returned
+    as views of the map; otherwise blocks are read from the file as they are iterated.
+    '''
+
+    def __init__(self, path: str, column: dict, rows: int, byteorder: str, use_mmap: bool = False):
+        self.name: str = column["name"]
+        self.column_type: str = column["type"]
+        self.rows = rows
+        self.size: int = column["size"]
+        self.swap = byteorder != sys.byteorder
+        self.file = open(os.path.join(path, column["file"]), 'rb')
+        self.map: mmap.mmap | None = None
+        if use_mmap and self.size:
+            self.map = mmap.mmap(self.file.fileno(), self.size, access=mmap.ACCESS_READ)
+
+    def blocks(self) -> Iterator[Sequence[Any]]:
+        '''
+        Yields the values of every committed block in order.
+        '''
+        if self.map is not None:
+            buffer = memoryview(self.map)
+            offset = 0
+            while offset < self.size:
+                codec, rows, _, stored_size = BLOCK_HEADER.unpack_from(buffer, offset)
+                offset += BLOCK_HEADER.size
+                yield self.decode(decompress(buffer[offset:offset + stored_size], codec), rows)
+                offset += stored_size
+            return
+
+        self.file.seek(0)
+        offset = 0
+        while offset < self.size:
+            codec, rows, _, stored_size = BLOCK_HEADER.unpack(self.file.read(BLOCK_HEADER.size))
+            yield self.decode(decompress(memoryview(self.file.read(stored_size)), codec), rows)
+            offset += BLOCK_HEADER.size + stored_size
+
+    def decode(self, payload: memoryview, rows: int) -> Sequence[Any]:
+        if not self.swap:
+            return decode_values(payload, self.column_type, rows)
+        if self.column_type == STR:
+            lengths = array('I')
+            lengths.frombytes(payload[:4 * rows])
+            lengths.byteswap()
+            return decode_values(memoryview(lengths.tobytes() + bytes(payload[4 * rows:])), STR, rows)
+        values = array(TYPE_CODES[self.column_type])
+        values.frombytes(payload)
+        values.byteswap()
+        return values
+
+    def read(self) -> array | list:
+        '''
+        Read the whole column into one array, or a list for string columns.
+        '''
+        values: array | list = [] if self.column_type == STR else array(TYPE_CODES[self.column_type])
+        for block in self.blocks():
+            values.extend(block)
+        return values
+
+    def close(self) -> None:
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                pass # Views of the map are still in use; it is closed once they are released
+        self.file.close()
+
+    def __enter__(self) -> 'ColumnReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class ArchiveReader:
+    '''
+    Reads an archive written by DatabaseArchive, one column at a time. Partitions may be read while they are written.
+    '''
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+
+    def get_device_types(self) -> list[str]:
+        return sorted(os.listdir(self.archive_dir))
+
+    def get_days(self, device_type: str) -> list[str]:
+        return sorted(os.listdir(os.path.join(self.archive_dir, device_type)))
+
+    def get_columns(self, device_type: str, day: str) -> dict[str, str]:
+        '''
+        Returns the type of every column of a partition, by column name.
+        '''
+        schema = load_partition_schema(os.path.join(self.archive_dir, device_type, day))
+        return {column["name"]: column["type"] for column in schema["columns"]}
+
+    def open_column(self, device_type: str, day: str, name: str, use_mmap: bool = False) -> ColumnReader:
+        '''
+        Open one column of a partition.
+
+        Raises:
+            KeyError: The partition has no such column.
+        '''
+        path = os.path.join(self.archive_dir, device_type, day)
+        schema = load_partition_schema(path)
+        for column in schema["columns"]:
+            if column["name"] == name:
+                return ColumnReader(path, column, schema["rows"], schema["byteorder"], use_mmap)
+        raise KeyError(name)
+
+    def read_column(self, device_type: str, day: str, name: str) -> array | list:
+        with self.open_column(device_type, day, name) as column:
+            return column.read()
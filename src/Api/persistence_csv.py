@@ -1,29 +1,461 @@
 import os
-from datetime import date
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
 from collections import OrderedDict
+from typing import IO, Any, Iterator
 
 from Interfaces.Database import Database
+from Interfaces.Data.Event import EVENT_FIELDS, DEVICE_ID_FIELD, TIMESTAMP_FIELD
+from Interfaces.Data.QueryChunk import QueryChunk, ChunkBuilder, DEFAULT_CHUNK_SIZE, parse_value
 
 SAVE_DIR = 'data'
 SAVE_EXT = '.csv'
+INDEX_EXT = '.idx' # Sparse time index next to each CSV file
+DAY_FORMAT = "%m-%d-%y" # Local date in the file names
+
+DEFAULT_MAX_OPEN_FILES = 16 # File handles kept open, least recently used closed first
+DEFAULT_BUFFER_SIZE = 1 << 20 # Characters buffered across all files before they are flushed
+DEFAULT_FLUSH_INTERVAL = 5.0 # Seconds a row may wait in the buffer before it is flushed
+DEFAULT_INDEX_BLOCK_ROWS = 256 # Rows covered by each entry of a file's sparse time index
+
+def get_next_midnight() -> float:
+    '''
+    Returns the epoch time of the next local midnight, when rows roll over to the next day's files.
+    '''
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    return tomorrow.timestamp()
+
+@dataclass
+class CSVWriterStats:
+    '''
+    Attributes:
+        rows (int): Rows accepted by save.
+        flushes (int): Times the buffers were written to their files.
+        opens (int): Files opened.
+        evictions (int): Files closed to stay within max_open_files.
+        rollovers (int): Day changes.
+        index_entries (int): Entries added to the sparse time indexes.
+    '''
+    rows: int = 0
+    flushes: int = 0
+    opens: int = 0
+    evictions: int = 0
+    rollovers: int = 0
+    index_entries: int = 0
+
+@dataclass
+class IndexBlock:
+    '''
+    An entry of a file's sparse time index: a run of consecutive rows and the range of their reportAt.
+
+    Attributes:
+        offset (int): Byte offset of the first row.
+        end (int): Byte offset after the last row.
+        min_time (int | None): Earliest reportAt of the rows, in milliseconds since the epoch. None if no row has one.
+        max_time (int | None): Latest reportAt of the rows, in milliseconds since the epoch.
+        rows (int): Number of rows.
+    '''
+    offset: int
+    end: int
+    min_time: int | None = None
+    max_time: int | None = None
+    rows: int = 0
+
+    def add_rows(self, rows: int, size: int, min_time: int | None, max_time: int | None) -> None:
+        self.rows += rows
+        self.end += size
+        if min_time is None or max_time is None:
+            return
+        if self.min_time is None or self.max_time is None:
+            self.min_time, self.max_time = min_time, max_time
+        else:
+            self.min_time, self.max_time = min(self.min_time, min_time), max(self.max_time, max_time)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        return self.min_time is not None and self.max_time is not None and self.min_time < end and self.max_time >= start
+
+    def to_line(self) -> str:
+        times = f'{self.min_time},{self.max_time}' if self.min_time is not None else ','
+        return f'{self.offset},{self.end},{times},{self.rows}\n'
+
+    @classmethod
+    def from_line(cls, line: str) -> 'IndexBlock':
+        offset, end, min_time, max_time, rows = line.split(',')
+        return cls(int(offset), int(end), int(min_time) if min_time else None, int(max_time) if max_time else None, int(rows))
+
+def parse_report_time(value: Any) -> int | None:
+    '''
+    Convert a reportAt timestamp, such as "2024-01-01T00:00:00.000Z", to milliseconds since the epoch.
+    Naive timestamps are taken as UTC. Returns None if there is none or it cannot be parsed.
+    '''
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+def get_time_range(report_ats: list[Any]) -> tuple[int | None, int | None]:
+    '''
+    Returns the earliest and latest of reportAt values in milliseconds, (None, None) if none can be parsed.
+    UTC timestamps of one length, as YoLink reports them, sort in time order as text, so only two are parsed.
+    '''
+    values = [value for value in report_ats if value]
+    if not values:
+        return None, None
+    if all(isinstance(value, str) and value[-1] == 'Z' for value in values) and len(set(map(len, values))) == 1:
+        return parse_report_time(min(values)), parse_report_time(max(values))
+    times = [time for time in map(parse_report_time, values) if time is not None]
+    return (min(times), max(times)) if times else (None, None)
+
+def load_index(filepath: str) -> list[IndexBlock]:
+    '''
+    Returns the entries of the sparse time index of a CSV file, by offset. Unreadable lines, such as one torn
+    by a crash, are skipped, leaving their rows to be scanned.
+    '''
+    blocks = []
+    try:
+        with open(filepath + INDEX_EXT, 'r') as index:
+            for line in index:
+                try:
+                    blocks.append(IndexBlock.from_line(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return sorted(blocks, key=lambda block: block.offset)
+
+def get_scan_ranges(blocks: list[IndexBlock], data_start: int, size: int, start: int, end: int) -> list[tuple[int, int]]:
+    '''
+    Returns the byte ranges of a CSV file that may hold rows reported within [start, end), in milliseconds:
+    the indexed blocks overlapping it and every part of the file the index does not cover.
+    '''
+    ranges: list[tuple[int, int]] = []
+
+    def add(range_start: int, range_end: int) -> None:
+        if ranges and ranges[-1][1] == range_start:
+            ranges[-1] = (ranges[-1][0], range_end)
+        else:
+            ranges.append((range_start, range_end))
+
+    cursor = data_start
+    for block in blocks:
+        if block.offset < cursor or block.end > size:
+            continue # Not consistent with the file; its rows are scanned
+        if block.offset > cursor:
+            add(cursor, block.offset)
+        if block.overlaps(start, end):
+            add(block.offset, block.end)
+        cursor = block.end
+    if cursor < size:
+        add(cursor, size)
+    return ranges
+
+def read_rows(filepath: str, device_ids: set[str] | None, fields: list[str] | None, start: int, end: int
+    ) -> list[tuple[str, int, dict[str, Any]]]:
+    '''
+    Read the rows of a CSV file reported within [start, end), in milliseconds, using its sparse time index
+    to skip the blocks outside the range. Rows without a reportAt are not read.
+
+    Returns:
+        list[tuple[str, int, dict[str, Any]]]: (device ID, reportAt in milliseconds, values) of every row, in time order.
+    '''
+    rows: list[tuple[str, int, dict[str, Any]]] = []
+    with open(filepath, 'rb') as file:
+        header = file.readline()
+        if not header.endswith(b'\n'):
+            return rows # No rows yet
+        data_start = len(header) - 1 # Rows start with their newline
+        columns = header.decode().rstrip('\n').split(',')[:-1]
+        if DEVICE_ID_FIELD not in columns or TIMESTAMP_FIELD not in columns:
+            return rows
+        device_index = columns.index(DEVICE_ID_FIELD)
+        time_index = columns.index(TIMESTAMP_FIELD)
+        wanted = [(name, index) for index, name in enumerate(columns)
+            if (name in fields if fields is not None else name not in EVENT_FIELDS)]
+
+        size = os.fstat(file.fileno()).st_size
+        for range_start, range_end in get_scan_ranges(load_index(filepath), data_start, size, start, end):
+            file.seek(range_start)
+            text = file.read(range_end - range_start).decode()
+            for line in text.split('\n'):
+                values = line.split(',')
+                if len(values) <= max(device_index, time_index):
+                    continue
+                device_id = values[device_index]
+                if device_ids is not None and device_id not in device_ids:
+                    continue
+                at = parse_report_time(values[time_index])
+                if at is None or not start <= at < end:
+                    continue
+                rows.append((device_id, at, {name: parse_value(values[index]) for name, index in wanted if index < len(values)}))
+    rows.sort(key=lambda row: row[1])
+    return rows
 
 class DatabaseCSV(Database):
-    def save(self, device_type: str, header: OrderedDict[str, str|int]) -> None:
-        
-        # Create filepath
-        filename = f'/{device_type}-{date.today().strftime("%m-%d-%y")}'
-        filepath = SAVE_DIR + filename + SAVE_EXT
+    '''
+    Saves readings to one CSV file per device type and day. Rows are buffered in memory and written to files
+    kept open in a bounded LRU cache. The buffers are flushed once they hold buffer_size characters,
+    when a row has waited flush_interval seconds, at midnight and on close.
+
+    Every file has a sparse time index next to it, <file>.idx, with one line per block of index_block_rows rows:
+    the block's byte range and the range of its rows' reportAt. Queries read the index and only scan the blocks
+    overlapping the requested range, and the rows written after the last indexed block.
+    '''
+
+    def __init__(self,
+            save_dir: str = SAVE_DIR,
+            max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+            buffer_size: int = DEFAULT_BUFFER_SIZE,
+            flush_interval: float | None = DEFAULT_FLUSH_INTERVAL,
+            index_block_rows: int = DEFAULT_INDEX_BLOCK_ROWS
+        ):
+        '''
+        Args:
+            save_dir (str, optional): Directory of the CSV files.
+            max_open_files (int, optional): File handles kept open at once.
+            buffer_size (int, optional): Characters buffered before the buffers are flushed.
+            flush_interval (float, optional): Seconds between timed flushes. None flushes only on size, day change and close.
+            index_block_rows (int, optional): Rows covered by each entry of the sparse time indexes.
+        '''
+        self.save_dir = save_dir
+        self.max_open_files = max_open_files
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.index_block_rows = index_block_rows
+        os.makedirs(save_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.files: OrderedDict[str, IO[str]] = OrderedDict() # Open files by path, least recently used first
+        self.buffers: dict[str, list[str]] = {} # Pending rows by path
+        self.headers: dict[str, list[str]] = {} # Columns of each path's first row, written if its file is empty
+        self.paths: dict[str, str] = {} # Today's path by device type
+        self.buffer_times: dict[str, list[Any]] = {} # reportAt of each path's pending rows
+        self.blocks: dict[str, IndexBlock] = {} # Block of each path not indexed yet
+        self.buffered = 0
+        self.stats = CSVWriterStats()
+        self.closed = False
+
+        self.day = ''
+        self.next_rollover = 0.0
+        self.roll_over()
 
+        self.stopped = threading.Event()
+        self.flusher = None
+        if flush_interval is not None:
+            self.flusher = threading.Thread(target=self.flush_loop, name="csv-flusher", daemon=True)
+            self.flusher.start()
+
+    def save(self, device_type: str, header: OrderedDict[str, str|int|float]) -> None:
+        '''
+        Buffer a row for the file of the given device type and day.
+
+        Args:
+            device_type (str): The type of device.
+            header (OrderedDict[str, str|int|float]): The row to save.
+        '''
+        row = '\n' + ','.join([str(value) for value in header.values()]) + ','
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("database is closed")
+            if time.time() >= self.next_rollover:
+                self.flush_buffers()
+                self.close_files()
+                self.roll_over()
+                self.stats.rollovers += 1
+
+            filepath = self.paths.get(device_type)
+            if filepath is None:
+                filepath = os.path.join(self.save_dir, f'{device_type}-{self.day}{SAVE_EXT}')
+                self.paths[device_type] = filepath
+            buffer = self.buffers.get(filepath)
+            if buffer is None:
+                buffer = self.buffers[filepath] = []
+                self.buffer_times[filepath] = []
+                self.headers.setdefault(filepath, list(header))
+            buffer.append(row)
+            self.buffer_times[filepath].append(header.get(TIMESTAMP_FIELD))
+            self.buffered += len(row)
+            self.stats.rows += 1
+
+            if self.buffered >= self.buffer_size:
+                self.flush_buffers()
+
+    def add_device(self, device_id, device_name, device_type, timestamp) -> None:
+        pass
+
+    def flush(self) -> None:
+        '''
+        Write every buffered row to its file and sync the open files to disk.
+        '''
+        with self.lock:
+            self.flush_buffers()
+            for file in self.files.values():
+                os.fsync(file.fileno())
+
+    def close(self) -> None:
+        '''
+        Flush the buffers, stop the flusher and close every file.
+        '''
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.flush_buffers()
+            self.close_files()
+        self.stopped.set()
+        if self.flusher is not None:
+            self.flusher.join()
+
+    def get_stats(self) -> CSVWriterStats:
+        with self.lock:
+            return CSVWriterStats(**vars(self.stats))
+
+    def flush_loop(self) -> None:
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
+
+    def roll_over(self) -> None:
+        '''
+        Switch to today's files. Called with the lock held, after the previous day was flushed.
+        '''
+        self.day = date.today().strftime(DAY_FORMAT)
+        self.next_rollover = get_next_midnight()
+        self.paths.clear()
+        self.headers.clear()
+
+    def flush_buffers(self) -> None:
+        '''
+        Write the buffered rows, one write per file. Called with the lock held.
+        '''
+        if not self.buffered:
+            return
+        for filepath, rows in self.buffers.items():
+            file = self.get_file(filepath)
+            if file.tell() == 0:
+                file.write(''.join([f'{column},' for column in self.headers[filepath]]))
+            block = self.blocks.get(filepath)
+            if block is None:
+                offset = file.tell()
+                block = self.blocks[filepath] = IndexBlock(offset, offset)
+
+            # Split the rows into blocks of index_block_rows, measured in bytes
+            report_ats = self.buffer_times[filepath]
+            texts = []
+            indexed = []
+            position = 0
+            while position < len(rows):
+                count = min(self.index_block_rows - block.rows, len(rows) - position)
+                text = ''.join(rows[position:position + count])
+                texts.append(text)
+                block.add_rows(count, len(text) if text.isascii() else len(text.encode()),
+                    *get_time_range(report_ats[position:position + count]))
+                position += count
+                if block.rows >= self.index_block_rows:
+                    indexed.append(block)
+                    block = self.blocks[filepath] = IndexBlock(block.end, block.end)
+
+            file.write(''.join(texts))
+            file.flush()
+            self.write_index(filepath, indexed)
+        self.buffers.clear()
+        self.buffer_times.clear()
+        self.buffered = 0
+        self.stats.flushes += 1
+
+    def get_file(self, filepath: str) -> IO[str]:
+        '''
+        Return the open file of a path, opening it and closing the least recently used file if needed.
+        '''
+        file = self.files.get(filepath)
+        if file is not None:
+            self.files.move_to_end(filepath)
+            return file
+
+        if len(self.files) >= self.max_open_files:
+            evicted_path, evicted = self.files.popitem(last=False)
+            self.index_block(evicted_path)
+            os.fsync(evicted.fileno())
+            evicted.close()
+            self.stats.evictions += 1
         # Regardless of whether the file exists, it will be appended to
-        with open(filepath, 'a+') as file:
-                    
-            # If the file is empty, add headers
-            if os.path.getsize(filepath) == 0:
-                for header_item in header:
-                    file.write(f'{header_item},')
-
-            # Newline and enter data
-            file.write('\n')
-            values = header.values()
-            for value in values:
-                file.write(f'{value},')
\ No newline at end of file
+        file = open(filepath, 'a')
+        self.files[filepath] = file
+        self.stats.opens += 1
+        return file
+
+    def close_files(self) -> None:
+        for filepath, file in self.files.items():
+            self.index_block(filepath)
+            file.close()
+        self.files.clear()
+
+    def index_block(self, filepath: str) -> None:
+        '''
+        Add the pending block of a file to its sparse time index, however few rows it has. Called with the lock held.
+        '''
+        block = self.blocks.pop(filepath, None)
+        if block is not None and block.rows:
+            self.write_index(filepath, [block])
+
+    def write_index(self, filepath: str, blocks: list[IndexBlock]) -> None:
+        '''
+        Append blocks to the sparse time index of a file. Called with the lock held.
+        '''
+        if not blocks:
+            return
+        with open(filepath + INDEX_EXT, 'a') as index:
+            index.write(''.join([block.to_line() for block in blocks]))
+        self.stats.index_entries += len(blocks)
+
+    def query(self, device_ids: list[str] | None, fields: list[str] | None, start: float, end: float,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[QueryChunk]:
+        '''
+        Read the rows reported within a time range, in chunks of columns, after writing the buffered rows.
+        Files written before the range are skipped, and only the blocks their sparse time index places within it
+        are scanned. Rows without a reportAt are not read.
+
+        Args:
+            device_ids (list[str] | None): Devices to read. None reads every device.
+            fields (list[str] | None): Fields to read, in column order. None reads every field.
+            start (float): Start of the range in epoch seconds, included.
+            end (float): End of the range in epoch seconds, excluded.
+            chunk_size (int, optional): Most rows per chunk.
+        '''
+        with self.lock:
+            self.flush_buffers()
+        wanted = set(device_ids) if device_ids is not None else None
+        builder = ChunkBuilder(fields)
+        for filepath in self.get_query_paths(start, end):
+            for device_id, at, values in read_rows(filepath, wanted, fields, int(start * 1000), int(end * 1000)):
+                builder.add(device_id, at, values)
+                if len(builder) >= chunk_size:
+                    yield builder.build()
+        if len(builder):
+            yield builder.build()
+
+    def get_query_paths(self, start: float, end: float) -> list[str]:
+        '''
+        Returns the files that may hold rows reported within a time range, in day order. Files are named after the
+        local day their rows were written, which is never before their reportAt, so only files written before the range
+        are skipped. Later files may hold readings written late, such as ones drained from a spool; their sparse time
+        index keeps them from being scanned.
+        '''
+        first_day = date.fromtimestamp(start) - timedelta(days=1) # Allows for the clocks of the devices
+        paths = []
+        for name in os.listdir(self.save_dir):
+            stem, ext = os.path.splitext(name)
+            if ext != SAVE_EXT:
+                continue
+            try:
+                day = datetime.strptime(stem[-8:], DAY_FORMAT).date()
+            except ValueError:
+                continue
+            if day >= first_day:
+                paths.append((day, os.path.join(self.save_dir, name)))
+        return [path for _, path in sorted(paths)]
@@ -0,0 +1,309 @@
+import multiprocessing
+import signal
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Protocol, cast
+
+from Api.QueuedDatabase import QueuedDatabase, QueueWriter, DEFAULT_BATCH_SIZE
+from Controller.Device_Inventory import DeviceInventory, get_device_list
+from Controller.Device_Poller import DevicePoller, is_pollable
+from Controller.Rate_Limiter import RateLimiter
+from Controller.YoLink_Controller import YoLinkController
+from Interfaces.Database import Database
+from Interfaces.Device import Device
+from Interfaces.Responses.Response import ResponseData
+
+if TYPE_CHECKING:
+	from multiprocessing.context import ForkContext, ForkServerContext, SpawnContext
+
+DEFAULT_SWEEP_INTERVAL = 300 # Seconds between the sweeps of a collector
+DEFAULT_POLL_CONCURRENCY = 8 # Device requests in flight per account
+DEFAULT_INVENTORY_TTL = 3600 # Seconds a collector uses an account's device list before requesting it again
+DEFAULT_QUEUE_SIZE = 1000 # Batches queued for the writer before workers wait for it
+DEFAULT_CHECK_INTERVAL = 1.0 # Seconds between checks for crashed workers
+DEFAULT_RESTART_DELAY = 1.0 # Seconds before a crashed worker is restarted, doubled per consecutive crash
+DEFAULT_MAX_RESTART_DELAY = 60.0
+DEFAULT_STABLE_TIME = 300.0 # Seconds a worker has to run for its next crash to count as the first again
+DEFAULT_STOP_TIMEOUT = 30.0 # Seconds workers get to finish their sweep when stopping, before they are terminated
+
+class StopSignal(Protocol):
+	def is_set(self) -> bool: ...
+	def wait(self, timeout: float | None = None) -> bool: ...
+
+# Runs in a worker process: collects the readings of its accounts into the database until the signal is set
+WorkerTarget = Callable[[list[str], Database, StopSignal], None]
+
+def group_accounts(accounts: list[str], accounts_per_worker: int) -> list[list[str]]:
+	"""
+	Splits accounts into the groups polled by each worker, in order.
+	"""
+	return [accounts[start:start + accounts_per_worker] for start in range(0, len(accounts), accounts_per_worker)]
+
+def run_worker(target: WorkerTarget, accounts: list[str], queue: Any, stopped: StopSignal, batch_size: int) -> None:
+	"""
+	Entry point of a worker process. Interrupts are left to the supervisor, which stops the workers in order.
+	"""
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	database = QueuedDatabase(queue, batch_size)
+	try:
+		target(accounts, database, stopped)
+	finally:
+		database.close()
+		# Wait for the queue's feeder thread, so the last batches are not lost when the process exits
+		queue.close()
+		queue.join_thread()
+
+@dataclass(frozen=True)
+class AccountCollector:
+	"""
+	A WorkerTarget polling every pollable device of its accounts once per sweep_interval, as a sweep of
+	DevicePoller per account. Instances are sent to worker processes, so create_row has to be a module-level function.
+
+	Attributes:
+		create_row           (Callable):       Creates the row saved for a reading.
+		sweep_interval       (float):          Seconds between the starts of sweeps.
+		poll_concurrency     (int):            Device requests in flight per account.
+		inventory_cache_path (str | None):     Device list cache, formatted with the account. None disables it.
+		inventory_ttl        (float):          Seconds a device list is used before it is requested again.
+		max_sweeps           (int | None):     Sweeps after which the worker finishes. None sweeps until stopped.
+		controller_options   (dict[str, Any]): Keyword arguments of every YoLinkController, such as api_url.
+		rate_limits          (dict[str, float]): Keyword arguments of every account's RateLimiter, such as account_rate.
+	"""
+	create_row: Callable[[Device, ResponseData], OrderedDict[str, str|int|float]]
+	sweep_interval: float = DEFAULT_SWEEP_INTERVAL
+	poll_concurrency: int = DEFAULT_POLL_CONCURRENCY
+	inventory_cache_path: str | None = None
+	inventory_ttl: float = DEFAULT_INVENTORY_TTL
+	max_sweeps: int | None = None
+	controller_options: dict[str, Any] = field(default_factory=dict)
+	rate_limits: dict[str, float] = field(default_factory=dict)
+
+	def __call__(self, accounts: list[str], database: Database, stopped: StopSignal) -> None:
+		controllers: list[YoLinkController] = []
+		inventories: list[DeviceInventory] = []
+		pollers: list[DevicePoller] = []
+		try:
+			for account in accounts:
+				controller = YoLinkController(account,
+					pool_maxsize = self.poll_concurrency,
+					rate_limiter = RateLimiter(**self.rate_limits),
+					**self.controller_options
+				)
+				controllers.append(controller)
+				inventory = DeviceInventory(
+					partial(get_device_list, controller),
+					controller.user_id,
+					self.inventory_cache_path.format(account) if self.inventory_cache_path else None,
+					self.inventory_ttl
+				)
+				inventory.establish()
+				inventory.start()
+				inventories.append(inventory)
+				pollers.append(DevicePoller(controller, max_workers=self.poll_concurrency))
+
+			sweeps = 0
+			while not stopped.is_set() and (self.max_sweeps is None or sweeps < self.max_sweeps):
+				started = time.monotonic()
+				for inventory, poller in zip(inventories, pollers):
+					results = poller.poll([device for device in inventory.get_devices() if is_pollable(device)])
+					for result in results:
+						if result.ok and result.data is not None:
+							database.save(result.device.type, self.create_row(result.device, result.data))
+				database.flush()
+				sweeps += 1
+				if self.max_sweeps is None or sweeps < self.max_sweeps:
+					stopped.wait(max(0.0, self.sweep_interval - (time.monotonic() - started)))
+		finally:
+			for poller in pollers:
+				poller.close()
+			for inventory in inventories:
+				inventory.stop()
+			for controller in controllers:
+				controller.close()
+
+@dataclass
+class WorkerState:
+	"""
+	One worker process and its crash history.
+
+	Attributes:
+		accounts   (list[str]):                      The accounts it collects.
+		process    (multiprocessing.Process | None): The running process, if any.
+		started_at (float):                          Monotonic time the process was started.
+		crashes    (int):                            Consecutive crashes, which set the restart delay.
+		restarts   (int):                            Times the worker was restarted.
+		restart_at (float | None):                   Monotonic time a crashed worker is restarted at.
+		finished   (bool):                           Whether the worker returned, and is not restarted.
+	"""
+	accounts: list[str]
+	process: Any = None
+	started_at: float = 0.0
+	crashes: int = 0
+	restarts: int = 0
+	restart_at: float | None = None
+	finished: bool = False
+
+@dataclass
+class SupervisorStats:
+	"""
+	Attributes:
+		workers  (int): Worker processes supervised.
+		alive    (int): Worker processes running.
+		finished (int): Workers that returned.
+		restarts (int): Restarts of crashed workers.
+		batches  (int): Batches saved by the writer.
+		events   (int): Readings saved by the writer.
+		failures (int): Batches the backend failed to save.
+	"""
+	workers: int
+	alive: int
+	finished: int
+	restarts: int
+	batches: int
+	events: int
+	failures: int
+
+class AccountSupervisor:
+	"""
+	Collects many accounts at once with a pool of worker processes, one per group of accounts, so that polling and
+	parsing use every core. Workers send their readings through one queue to a writer thread of the supervising
+	process, which saves them to its database. A worker that crashes is restarted after a delay that doubles with
+	every consecutive crash; a worker that returns is done.
+
+	A worker killed while it is putting a batch on the queue can leave the queue unusable, as multiprocessing queues
+	are not safe against that; crashes from exceptions in the worker are.
+
+	Methods:
+		start: Starts the writer and every worker.
+		run: Restarts crashed workers until every worker finished, or stop is called from another thread.
+		check_workers: Restarts the crashed workers that are due.
+		get_stats: Returns the workers running and restarted, and the readings written.
+		stop: Stops every worker, waits for the writer to save what they sent, then stops it.
+	"""
+	def __init__(self,
+			groups          : list[list[str]],
+			target          : WorkerTarget,
+			database        : Database,
+			batch_size      : int = DEFAULT_BATCH_SIZE,
+			queue_size      : int = DEFAULT_QUEUE_SIZE,
+			check_interval  : float = DEFAULT_CHECK_INTERVAL,
+			restart_delay   : float = DEFAULT_RESTART_DELAY,
+			max_restart_delay: float = DEFAULT_MAX_RESTART_DELAY,
+			stable_time     : float = DEFAULT_STABLE_TIME,
+			stop_timeout    : float = DEFAULT_STOP_TIMEOUT,
+			start_method    : str = "spawn"
+		):
+		"""
+		Args:
+			groups            (list[list[str]]): The accounts of each worker process.
+			target            (WorkerTarget):    Collects a group's readings in a worker. Has to be picklable.
+			database          (Database):        Saves the readings of every worker. Only used by the writer thread.
+			batch_size        (int, optional):   Readings per batch sent through the queue.
+			queue_size        (int, optional):   Batches queued before workers wait for the writer.
+			check_interval    (float, optional): Seconds between checks for crashed workers.
+			restart_delay     (float, optional): Seconds before a crashed worker is restarted, doubled per consecutive crash.
+			max_restart_delay (float, optional): Longest restart delay.
+			stable_time       (float, optional): Seconds a worker has to run for its crashes to be forgotten.
+			stop_timeout      (float, optional): Seconds workers get to stop before they are terminated.
+			start_method      (str, optional):   multiprocessing start method. spawn keeps the writer thread out of workers.
+		"""
+		self.target = target
+		self.batch_size = batch_size
+		self.check_interval = check_interval
+		self.restart_delay = restart_delay
+		self.max_restart_delay = max_restart_delay
+		self.stable_time = stable_time
+		self.stop_timeout = stop_timeout
+
+		# Every start method's context creates processes, which get_context's return type does not promise
+		self.context = cast("SpawnContext | ForkContext | ForkServerContext", multiprocessing.get_context(start_method))
+		self.queue = self.context.Queue(queue_size)
+		self.stop_signal = self.context.Event()
+		self.writer = QueueWriter(self.queue, database)
+		self.workers = [WorkerState(accounts) for accounts in groups]
+		self.stopped = threading.Event()
+
+	def start(self) -> None:
+		self.writer.start()
+		for worker in self.workers:
+			self.start_worker(worker)
+
+	def start_worker(self, worker: WorkerState) -> None:
+		worker.process = self.context.Process(
+			target = run_worker,
+			args = (self.target, worker.accounts, self.queue, self.stop_signal, self.batch_size),
+			name = "collector-" + "-".join(worker.accounts),
+			daemon = True
+		)
+		worker.process.start()
+		worker.started_at = time.monotonic()
+		worker.restart_at = None
+
+	def run(self) -> None:
+		"""
+		Restarts crashed workers until every worker finished or stop is called.
+		"""
+		while not self.stopped.wait(self.check_interval):
+			self.check_workers()
+			if all(worker.finished for worker in self.workers):
+				return
+
+	def check_workers(self) -> None:
+		"""
+		Schedules the restart of workers that exited with an error, and restarts those that are due.
+		"""
+		now = time.monotonic()
+		for worker in self.workers:
+			if worker.finished or self.stop_signal.is_set():
+				continue
+			if worker.restart_at is not None:
+				if now >= worker.restart_at:
+					worker.restarts += 1
+					self.start_worker(worker)
+				continue
+			if worker.process.is_alive():
+				continue
+
+			exitcode = worker.process.exitcode
+			worker.process.close()
+			worker.process = None
+			if exitcode == 0:
+				worker.finished = True
+				continue
+			worker.crashes = 1 if now - worker.started_at >= self.stable_time else worker.crashes + 1
+			delay = min(self.restart_delay * 2 ** (worker.crashes - 1), self.max_restart_delay)
+			worker.restart_at = now + delay
+			print(f'Worker for {", ".join(worker.accounts)} exited with code {exitcode}, restarting in {delay:.1f}s')
+
+	def get_stats(self) -> SupervisorStats:
+		writer = self.writer.get_stats()
+		return SupervisorStats(
+			workers = len(self.workers),
+			alive = sum(1 for worker in self.workers if worker.process is not None and worker.process.is_alive()),
+			finished = sum(1 for worker in self.workers if worker.finished),
+			restarts = sum(worker.restarts for worker in self.workers),
+			batches = writer.batches,
+			events = writer.events,
+			failures = writer.failures
+		)
+
+	def stop(self) -> None:
+		"""
+		Signals every worker to stop after its current sweep, terminating those that do not within stop_timeout.
+		Then waits for the writer to save what was queued, and stops it. The database is left open.
+		"""
+		self.stopped.set()
+		self.stop_signal.set()
+		deadline = time.monotonic() + self.stop_timeout
+		for worker in self.workers:
+			if worker.process is None:
+				continue
+			worker.process.join(max(0.0, deadline - time.monotonic()))
+			if worker.process.is_alive():
+				print(f'Worker for {", ".join(worker.accounts)} did not stop, terminating it')
+				worker.process.terminate()
+				worker.process.join()
+		self.writer.stop()
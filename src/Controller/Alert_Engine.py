@@ -0,0 +1,589 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Generic, TypeGuard, TypeVar
+
+from Interfaces.Device import Device
+from Interfaces.Responses.Response import ResponseData
+
+TRIGGERED = "triggered"
+RESOLVED = "resolved"
+DEFAULT_CHECK_INTERVAL = 60 # Seconds between checks for devices that stopped reporting
+
+def get_report_time(report_at: Any) -> float:
+	"""
+	Converts a reportAt timestamp, such as "2024-01-01T00:00:00.000Z", to epoch seconds. Defaults to now.
+	"""
+	if not report_at:
+		return time.time()
+	try:
+		parsed = datetime.fromisoformat(str(report_at).replace("Z", "+00:00"))
+	except ValueError:
+		return time.time()
+	if parsed.tzinfo is None:
+		parsed = parsed.replace(tzinfo=timezone.utc)
+	return parsed.timestamp()
+
+def is_number(value: Any) -> TypeGuard[int | float]:
+	return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+# Declarative rules. device_types limits a rule to some device types; empty applies it to every device.
+
+@dataclass(frozen=True)
+class ThresholdRule:
+	"""
+	Alerts while a field is above or below a limit. The limits can come from another field of the reading holding
+	{"min": ..., "max": ...}, such as THSensor's tempLimit, so the limits set in the YoLink app are followed.
+	The alert resolves once the value is back within the limits by hysteresis.
+
+	Attributes:
+		name         (str):             Name of the rule, carried by its alerts.
+		field        (str):             Field compared, such as "temperature".
+		above        (float | None):    Alert above this value.
+		below        (float | None):    Alert below this value.
+		limits_field (str | None):      Field holding the limits, overriding above and below when present.
+		hysteresis   (float):           How far back within the limits the value must be to resolve.
+		device_types (tuple[str, ...]): Device types the rule applies to.
+	"""
+	name: str
+	field: str
+	above: float | None = None
+	below: float | None = None
+	limits_field: str | None = None
+	hysteresis: float = 0.0
+	device_types: tuple[str, ...] = ()
+
+@dataclass(frozen=True)
+class StateRule:
+	"""
+	Alerts while a field has one of the alert values, such as a leak alarm being True or a door being "open".
+
+	Attributes:
+		name         (str):             Name of the rule, carried by its alerts.
+		field        (str):             Field compared, such as "state".
+		values       (tuple):           Values that raise the alert.
+		device_types (tuple[str, ...]): Device types the rule applies to.
+	"""
+	name: str
+	field: str
+	values: tuple
+	device_types: tuple[str, ...] = ()
+
+@dataclass(frozen=True)
+class RateOfChangeRule:
+	"""
+	Alerts while a field changes faster than max_rate per minute between consecutive readings of a device.
+
+	Attributes:
+		name         (str):             Name of the rule, carried by its alerts.
+		field        (str):             Field measured, such as "temperature".
+		max_rate     (float):           Largest change per minute, either way, that does not raise the alert.
+		device_types (tuple[str, ...]): Device types the rule applies to.
+	"""
+	name: str
+	field: str
+	max_rate: float
+	device_types: tuple[str, ...] = ()
+
+@dataclass(frozen=True)
+class NoReportRule:
+	"""
+	Alerts when a device's reportAt has not moved for the given minutes. Resolves with its next report.
+	Devices are tracked from their first reading, or from when they were added to the engine. Readings without
+	a reportAt are ignored, as a poll of such a device answers whether it reported or not, so limit the rule
+	to device types that have one.
+
+	Attributes:
+		name         (str):             Name of the rule, carried by its alerts.
+		minutes      (float):           Minutes without a report before the alert.
+		device_types (tuple[str, ...]): Device types the rule applies to.
+	"""
+	name: str
+	minutes: float
+	device_types: tuple[str, ...] = ()
+
+Rule = ThresholdRule | StateRule | RateOfChangeRule | NoReportRule
+R = TypeVar('R', bound=Rule)
+
+@dataclass
+class Alert:
+	"""
+	A rule starting or stopping to hold for a device.
+
+	Attributes:
+		rule        (str):   Name of the rule.
+		status      (str):   TRIGGERED or RESOLVED.
+		device_id   (str):   The YoLink device ID.
+		device_name (str):   The device's name.
+		device_type (str):   The device's type.
+		value       (Any):   The value that changed the rule's state, if the rule has a field.
+		at          (float): Epoch time of the reading, or of the check for NoReportRule.
+		message     (str):   Description of the alert.
+	"""
+	rule: str
+	status: str
+	device_id: str
+	device_name: str
+	device_type: str
+	value: Any
+	at: float
+	message: str
+
+	def to_dict(self) -> dict:
+		return {
+			"rule": self.rule,
+			"status": self.status,
+			"deviceId": self.device_id,
+			"name": self.device_name,
+			"type": self.device_type,
+			"value": self.value,
+			"at": datetime.fromtimestamp(self.at, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+			"message": self.message,
+		}
+
+# A change of a rule's state for one device: status, value and message
+Transition = tuple[str, Any, str]
+
+class RuleMachine(ABC, Generic[R]):
+	"""
+	A compiled rule: the state machine of every device it applies to. Each device's state is a few values,
+	and a device is only kept while it needs state, so evaluating a reading costs O(1) per rule.
+	"""
+	def __init__(self, rule: R):
+		self.rule = rule
+
+	@abstractmethod
+	def evaluate(self, device_id: str, at: float, values: dict[str, Any]) -> Transition | None:
+		"""
+		Updates the device's state with a reading, returning the transition it caused, if any.
+		"""
+		pass
+
+	@abstractmethod
+	def remove(self, device_id: str) -> None:
+		pass
+
+	@abstractmethod
+	def is_firing(self, device_id: str) -> bool:
+		pass
+
+class ThresholdMachine(RuleMachine[ThresholdRule]):
+	"""
+	Keeps the devices whose value is outside the limits.
+	"""
+	def __init__(self, rule: ThresholdRule):
+		super().__init__(rule)
+		self.firing: set[str] = set()
+
+	def evaluate(self, device_id: str, at: float, values: dict[str, Any]) -> Transition | None:
+		rule = self.rule
+		value = values.get(rule.field)
+		if not is_number(value):
+			return None
+		low, high = rule.below, rule.above
+		if rule.limits_field is not None:
+			limits = values.get(rule.limits_field)
+			if isinstance(limits, dict):
+				low = limits.get("min", low)
+				high = limits.get("max", high)
+
+		if device_id not in self.firing:
+			if high is not None and value > high:
+				self.firing.add(device_id)
+				return TRIGGERED, value, f"{rule.field} {value} above {high}"
+			if low is not None and value < low:
+				self.firing.add(device_id)
+				return TRIGGERED, value, f"{rule.field} {value} below {low}"
+			return None
+		if (high is None or value <= high - rule.hysteresis) and (low is None or value >= low + rule.hysteresis):
+			self.firing.discard(device_id)
+			return RESOLVED, value, f"{rule.field} {value} back within limits"
+		return None
+
+	def remove(self, device_id: str) -> None:
+		self.firing.discard(device_id)
+
+	def is_firing(self, device_id: str) -> bool:
+		return device_id in self.firing
+
+class StateMachine(RuleMachine[StateRule]):
+	"""
+	Keeps the devices whose field has an alert value.
+	"""
+	def __init__(self, rule: StateRule):
+		super().__init__(rule)
+		self.alert_values = frozenset(rule.values)
+		self.firing: set[str] = set()
+
+	def evaluate(self, device_id: str, at: float, values: dict[str, Any]) -> Transition | None:
+		rule = self.rule
+		if rule.field not in values:
+			return None
+		value = values[rule.field]
+		alerting = value in self.alert_values
+		if alerting and device_id not in self.firing:
+			self.firing.add(device_id)
+			return TRIGGERED, value, f"{rule.field} is {value}"
+		if not alerting and device_id in self.firing:
+			self.firing.discard(device_id)
+			return RESOLVED, value, f"{rule.field} is {value}"
+		return None
+
+	def remove(self, device_id: str) -> None:
+		self.firing.discard(device_id)
+
+	def is_firing(self, device_id: str) -> bool:
+		return device_id in self.firing
+
+class RateOfChangeMachine(RuleMachine[RateOfChangeRule]):
+	"""
+	Keeps the previous reading of every device and the devices changing too fast.
+	"""
+	def __init__(self, rule: RateOfChangeRule):
+		super().__init__(rule)
+		self.previous: dict[str, tuple[float, float]] = {} # (time, value) by device ID
+		self.firing: set[str] = set()
+
+	def evaluate(self, device_id: str, at: float, values: dict[str, Any]) -> Transition | None:
+		rule = self.rule
+		value = values.get(rule.field)
+		if not is_number(value):
+			return None
+		previous = self.previous.get(device_id)
+		if previous is not None and at <= previous[0]:
+			return None # A reading already seen, or out of order
+		self.previous[device_id] = (at, value)
+		if previous is None:
+			return None
+
+		rate = (value - previous[1]) / (at - previous[0]) * 60
+		if abs(rate) > rule.max_rate and device_id not in self.firing:
+			self.firing.add(device_id)
+			return TRIGGERED, value, f"{rule.field} changing {rate:+.2f}/min, limit {rule.max_rate}"
+		if abs(rate) <= rule.max_rate and device_id in self.firing:
+			self.firing.discard(device_id)
+			return RESOLVED, value, f"{rule.field} changing {rate:+.2f}/min"
+		return None
+
+	def remove(self, device_id: str) -> None:
+		self.previous.pop(device_id, None)
+		self.firing.discard(device_id)
+
+	def is_firing(self, device_id: str) -> bool:
+		return device_id in self.firing
+
+class NoReportMachine(RuleMachine[NoReportRule]):
+	"""
+	Keeps the latest reportAt of every device. Readings resolve the alert; check raises it.
+	"""
+	def __init__(self, rule: NoReportRule):
+		super().__init__(rule)
+		self.timeout = rule.minutes * 60
+		self.last_reports: dict[str, float] = {}
+		self.firing: set[str] = set()
+
+	def evaluate(self, device_id: str, at: float, values: dict[str, Any]) -> Transition | None:
+		if not values.get("reportAt"):
+			return None # The reading's time is the poll's, not the device's last report
+		last = self.last_reports.get(device_id)
+		if last is not None and at <= last:
+			return None # The device has not reported since
+		self.last_reports[device_id] = at
+		if device_id in self.firing:
+			self.firing.discard(device_id)
+			return RESOLVED, None, "reporting again"
+		return None
+
+	def track(self, device_id: str, now: float) -> None:
+		"""
+		Starts the device's timer if it has none.
+		"""
+		self.last_reports.setdefault(device_id, now)
+
+	def check(self, now: float) -> list[tuple[str, Transition]]:
+		"""
+		Returns the devices that went silent since the last check, with their transitions.
+		"""
+		silent = []
+		for device_id, last in self.last_reports.items():
+			if now - last > self.timeout and device_id not in self.firing:
+				self.firing.add(device_id)
+				silent.append((device_id, (TRIGGERED, None, f"no report for {(now - last) / 60:.0f} minutes")))
+		return silent
+
+	def remove(self, device_id: str) -> None:
+		self.last_reports.pop(device_id, None)
+		self.firing.discard(device_id)
+
+	def is_firing(self, device_id: str) -> bool:
+		return device_id in self.firing
+
+MACHINES: dict[type, Callable[[Any], RuleMachine]] = {
+	ThresholdRule: ThresholdMachine,
+	StateRule: StateMachine,
+	RateOfChangeRule: RateOfChangeMachine,
+	NoReportRule: NoReportMachine,
+}
+
+def compile_rules(rules: list[Rule]) -> list[RuleMachine]:
+	"""
+	Compiles declarative rules into their state machines.
+
+	Raises:
+		TypeError: A rule is not one of the rule types.
+	"""
+	machines = []
+	for rule in rules:
+		create_machine = MACHINES.get(type(rule))
+		if create_machine is None:
+			raise TypeError(f"unknown rule type {type(rule).__name__}")
+		machines.append(create_machine(rule))
+	return machines
+
+class AlertSink(ABC):
+	"""
+	Receives the alerts of an AlertEngine.
+	"""
+	@abstractmethod
+	def emit(self, alert: Alert) -> None:
+		pass
+
+	def close(self) -> None:
+		pass
+
+class PrintAlertSink(AlertSink):
+	"""
+	Prints alerts.
+	"""
+	def emit(self, alert: Alert) -> None:
+		print("ALERT {: <9} {: <25} {: <30} {}".format(alert.status, alert.rule, alert.device_name, alert.message))
+
+class JSONLinesAlertSink(AlertSink):
+	"""
+	Appends alerts to a file, one JSON object per line.
+	"""
+	def __init__(self, path: str):
+		self.file = open(path, "a")
+		self.lock = threading.Lock()
+
+	def emit(self, alert: Alert) -> None:
+		line = json.dumps(alert.to_dict()) + "\n"
+		with self.lock:
+			self.file.write(line)
+			self.file.flush()
+
+	def close(self) -> None:
+		with self.lock:
+			self.file.close()
+
+class CallbackAlertSink(AlertSink):
+	"""
+	Passes alerts to a function, such as one sending notifications.
+	"""
+	def __init__(self, callback: Callable[[Alert], None]):
+		self.callback = callback
+
+	def emit(self, alert: Alert) -> None:
+		self.callback(alert)
+
+@dataclass
+class AlertStats:
+	"""
+	Attributes:
+		readings      (int): Readings evaluated.
+		evaluations   (int): Rule evaluations made.
+		triggered     (int): Alerts raised.
+		resolved      (int): Alerts resolved.
+		firing        (int): Alerts currently raised.
+		sink_failures (int): Alerts a sink failed to receive.
+	"""
+	readings: int = 0
+	evaluations: int = 0
+	triggered: int = 0
+	resolved: int = 0
+	firing: int = 0
+	sink_failures: int = 0
+
+class AlertEngine:
+	"""
+	Evaluates alert rules on live readings and sends the alerts they raise and resolve to sinks.
+
+	Rules are compiled into state machines once, and indexed by device type, so a reading is only evaluated by the
+	rules of its type, each in O(1). State is kept per rule and device, a few values each, and dropped with
+	remove_device, so memory is bounded by the devices followed. A background thread checks for devices that stopped
+	reporting. Thresholds are compared with the values as the devices report them, e.g. temperatures in °C.
+
+	Methods:
+		evaluate: Evaluates a reading, returning and emitting the alerts it caused.
+		check_silence: Raises the alerts of devices that stopped reporting.
+		add_device: Starts the no-report timers of a device before its first reading.
+		remove_device: Drops the state of a device.
+		get_firing: Returns the rules currently raised for a device.
+		start: Starts the background silence checks.
+		stop: Stops the background silence checks and closes the sinks.
+	"""
+	def __init__(self,
+			rules         : list[Rule],
+			sinks         : list[AlertSink],
+			check_interval: float = DEFAULT_CHECK_INTERVAL
+		):
+		"""
+		Args:
+			rules          (list[Rule]):      The rules to evaluate.
+			sinks          (list[AlertSink]): Receive every alert, in order.
+			check_interval (float, optional): Seconds between background checks for devices that stopped reporting.
+		"""
+		self.machines = compile_rules(rules)
+		self.sinks = sinks
+		self.check_interval = check_interval
+
+		self.machines_by_type: dict[str, list[RuleMachine]] = {} # Built on first use of each type
+		self.silence_machines = [machine for machine in self.machines if isinstance(machine, NoReportMachine)]
+		self.devices: dict[str, Device] = {}
+		self.stats = AlertStats()
+		self.lock = threading.Lock()
+		self.stopped = threading.Event()
+		self.thread: threading.Thread | None = None
+
+	def get_machines(self, device_type: str) -> list[RuleMachine]:
+		"""
+		Returns the machines of the rules applying to a device type. Called with the lock held.
+		"""
+		machines = self.machines_by_type.get(device_type)
+		if machines is None:
+			machines = self.machines_by_type[device_type] = [
+				machine for machine in self.machines
+				if not machine.rule.device_types or device_type in machine.rule.device_types
+			]
+		return machines
+
+	def evaluate(self, device: Device, data: ResponseData | dict[str, Any]) -> list[Alert]:
+		"""
+		Evaluates a reading with every rule of the device's type.
+
+		Args:
+			device (Device):                      The device the reading came from.
+			data   (ResponseData | dict[str, Any]): The reading, or its values by field.
+
+		Returns:
+			list[Alert]: The alerts raised or resolved by the reading, also sent to the sinks.
+		"""
+		values = data.get_values() if isinstance(data, ResponseData) else data
+		at = get_report_time(values.get("reportAt"))
+		alerts = []
+		with self.lock:
+			self.devices[device.device_id] = device
+			machines = self.get_machines(device.type)
+			self.stats.readings += 1
+			self.stats.evaluations += len(machines)
+			for machine in machines:
+				transition = machine.evaluate(device.device_id, at, values)
+				if transition is not None:
+					alerts.append(self.create_alert(machine, device, at, transition))
+		self.emit(alerts)
+		return alerts
+
+	def check_silence(self, now: float | None = None) -> list[Alert]:
+		"""
+		Raises the alerts of devices that stopped reporting.
+
+		Returns:
+			list[Alert]: The alerts raised, also sent to the sinks.
+		"""
+		now = time.time() if now is None else now
+		alerts = []
+		with self.lock:
+			for machine in self.silence_machines:
+				for device_id, transition in machine.check(now):
+					device = self.devices.get(device_id)
+					if device is not None:
+						alerts.append(self.create_alert(machine, device, now, transition))
+		self.emit(alerts)
+		return alerts
+
+	def create_alert(self, machine: RuleMachine, device: Device, at: float, transition: Transition) -> Alert:
+		"""
+		Creates the alert of a transition and counts it. Called with the lock held.
+		"""
+		status, value, message = transition
+		if status == TRIGGERED:
+			self.stats.triggered += 1
+			self.stats.firing += 1
+		else:
+			self.stats.resolved += 1
+			self.stats.firing -= 1
+		return Alert(machine.rule.name, status, device.device_id, device.name, device.type, value, at, message)
+
+	def emit(self, alerts: list[Alert]) -> None:
+		"""
+		Sends alerts to every sink. A failing sink is reported and does not keep the others from receiving them.
+		"""
+		for alert in alerts:
+			for sink in self.sinks:
+				try:
+					sink.emit(alert)
+				except Exception as e:
+					with self.lock:
+						self.stats.sink_failures += 1
+					print(f"Alert sink {type(sink).__name__} failed: {e}")
+
+	def add_device(self, device: Device, now: float | None = None) -> None:
+		"""
+		Starts the no-report timers of a device, so a device that never reports raises an alert too.
+		"""
+		now = time.time() if now is None else now
+		with self.lock:
+			self.devices[device.device_id] = device
+			for machine in self.get_machines(device.type):
+				if isinstance(machine, NoReportMachine):
+					machine.track(device.device_id, now)
+
+	def remove_device(self, device_id: str) -> None:
+		"""
+		Drops the state of a device, such as one removed from the account. Its raised alerts are dropped unresolved.
+		"""
+		with self.lock:
+			for machine in self.machines:
+				if machine.is_firing(device_id):
+					self.stats.firing -= 1
+				machine.remove(device_id)
+			self.devices.pop(device_id, None)
+
+	def get_firing(self, device_id: str) -> list[str]:
+		"""
+		Returns the names of the rules currently raised for a device.
+		"""
+		with self.lock:
+			return [machine.rule.name for machine in self.machines if machine.is_firing(device_id)]
+
+	def get_stats(self) -> AlertStats:
+		with self.lock:
+			return AlertStats(**vars(self.stats))
+
+	def start(self) -> None:
+		"""
+		Starts a daemon thread checking for devices that stopped reporting every check_interval seconds.
+		"""
+		if self.thread is not None or not self.silence_machines:
+			return
+		self.stopped.clear()
+		self.thread = threading.Thread(target=self.check_loop, name="alert-checks", daemon=True)
+		self.thread.start()
+
+	def stop(self) -> None:
+		"""
+		Stops the background checks and closes the sinks.
+		"""
+		self.stopped.set()
+		if self.thread is not None:
+			self.thread.join()
+			self.thread = None
+		for sink in self.sinks:
+			sink.close()
+
+	def check_loop(self) -> None:
+		while not self.stopped.wait(self.check_interval):
+			self.check_silence()
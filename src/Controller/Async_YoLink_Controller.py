@@ -0,0 +1,284 @@
+import asyncio
+from datetime import datetime
+from typing import Type, TypeVar
+
+import aiohttp
+
+from Controller.YoLink_Controller import TOKEN_URL, API_URL, CREDENTIALS_PATH, TOKEN_CACHE_PATH, DEFAULT_POOL_MAXSIZE, DEFAULT_MAX_RETRIES, TOKEN_ERROR_CODES, load_credentials, create_request_body
+from Controller.Token_Manager import AccessToken, TokenManager, DEFAULT_REFRESH_MARGIN
+from Controller.Rate_Limiter import RateLimiter, RequestDropped, RequestRejected, RATE_LIMIT_CODES, TRANSIENT_ERROR_CODES, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_CAP, get_backoff_delay
+from Interfaces.Device import Device
+from Interfaces.Responses.Response import MethodNames, Response, ResponseData
+
+DEFAULT_TIMEOUT = 15.0 # Total seconds per request
+DEFAULT_KEEPALIVE_TIMEOUT = 30.0 # Seconds an idle connection is kept open
+
+class AsyncYoLinkController:
+	"""
+	An asyncio controller for the YoLink API. Has the same request contract as YoLinkController,
+	but never blocks the event loop, so it can share one loop with webhook servers and other coroutines.
+
+	Create it inside a running event loop, and close it when done, preferably with `async with`.
+	The access token is established on the first request. Its lifecycle is owned by the same TokenManager as
+	YoLinkController's, so the token cache and the background refresh work alike. The manager is blocking, so it
+	runs in the loop's executor, and the token requests it makes are sent back to the loop on the shared session.
+
+	Methods:
+		establish_access_token: Establishes an access token for the YoLink API, from the token cache if it is still valid.
+		create_tokens: Creates access and refresh tokens from the YoLink API.
+		make_request: Makes a request to the YoLink API with the given parameters. Returns the data from the response.
+		get_timestamp: Returns the current timestamp
+		close: Closes the HTTP session.
+
+	Attributes:
+		user_id (str): The user ID for the YoLink API.
+		user_key (str): The user key for the YoLink API.
+		access_token (str): The access token for the YoLink API.
+		refresh_token (str): The refresh token for the YoLink API.
+		token_expiration_time (int): The time at which the access token will expire.
+		token_refreshes (int): Number of token requests made, useful to confirm refreshes are not duplicated.
+		token_manager (TokenManager): Refreshes the token ahead of expiry and persists it to the token cache.
+		rate_limiter (RateLimiter): Limits requests per account and per device, and counts throttled, retried and dropped requests.
+		max_retries (int): Retries for rate limit and transient errors, with exponential backoff and jitter.
+		lazy (bool): Whether response data fields are only extracted when accessed.
+		token_url (str): The token endpoint.
+		api_url (str): The API endpoint.
+	"""
+	def __init__(self, current_user,
+			max_connections  : int = DEFAULT_POOL_MAXSIZE,
+			timeout          : float = DEFAULT_TIMEOUT,
+			keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+			token_cache_path : str | None = TOKEN_CACHE_PATH,
+			refresh_margin   : int = DEFAULT_REFRESH_MARGIN,
+			background_refresh: bool = True,
+			rate_limiter     : RateLimiter | None = None,
+			max_retries      : int = DEFAULT_MAX_RETRIES,
+			backoff_base     : float = DEFAULT_BACKOFF_BASE,
+			backoff_cap      : float = DEFAULT_BACKOFF_CAP,
+			lazy             : bool = False,
+			token_url        : str = TOKEN_URL,
+			api_url          : str = API_URL,
+			credentials_path : str = CREDENTIALS_PATH
+		):
+		"""
+		Initialize an asyncio YoLink API Controller. The access token is established on first use.
+
+		Args:
+			current_user      (str):             The user whose credentials are used.
+			max_connections   (int, optional):   Maximum number of simultaneous connections.
+			timeout           (float, optional): Total timeout per request in seconds.
+			keepalive_timeout (float, optional): Seconds an idle connection is kept open for reuse.
+			token_cache_path  (str, optional):   Token cache file, formatted with the current user. None disables the cache.
+			refresh_margin    (int, optional):   Seconds before expiry at which the token is refreshed.
+			background_refresh (bool, optional): Refresh the token from a background thread instead of only on demand.
+			rate_limiter      (RateLimiter, optional): Client-side rate limiter. Defaults to one with conservative limits.
+			max_retries       (int, optional):   Retries for rate limit and transient errors.
+			backoff_base      (float, optional): Backoff ceiling of the first retry in seconds.
+			backoff_cap       (float, optional): Largest backoff ceiling in seconds.
+			lazy              (bool, optional):  Only extract the fields of response data when they are accessed.
+			token_url         (str, optional):   The token endpoint, overridden to test against a local server.
+			api_url           (str, optional):   The API endpoint, overridden to test against a local server.
+			credentials_path  (str, optional):   The credentials file the user's keys are loaded from.
+		"""
+		# Load credentials
+		self.user_id, self.user_key = load_credentials(current_user, credentials_path)
+		self.token_url = token_url
+		self.api_url = api_url
+
+		# Initialize request limits
+		self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+		self.max_retries = max_retries
+		self.backoff_base = backoff_base
+		self.backoff_cap = backoff_cap
+		self.lazy = lazy
+
+		# Initialize token information
+		self.loop = asyncio.get_running_loop()
+		self.token_manager = TokenManager(
+			request_tokens = self.request_tokens,
+			user_id        = self.user_id,
+			user_key       = self.user_key,
+			cache_path     = token_cache_path.format(current_user) if token_cache_path else None,
+			refresh_margin = refresh_margin
+		)
+		self.background_refresh = background_refresh
+
+		# Create the pooled session used by every request
+		self.session = aiohttp.ClientSession(
+			connector = aiohttp.TCPConnector(limit=max_connections, keepalive_timeout=keepalive_timeout),
+			timeout = aiohttp.ClientTimeout(total=timeout)
+		)
+
+	@property
+	def access_token(self) -> str | None:
+		token = self.token_manager.token
+		return token.access_token if token else None
+
+	@property
+	def refresh_token(self) -> str | None:
+		token = self.token_manager.token
+		return token.refresh_token if token else None
+
+	@property
+	def token_expiration_time(self) -> int | None:
+		token = self.token_manager.token
+		return token.expiration_time if token else None
+
+	@property
+	def token_refreshes(self) -> int:
+		return self.token_manager.refresh_count
+
+	async def establish_access_token(self) -> None:
+		"""
+		Establishes an access token for the YoLink API. A valid cached token is reused, otherwise a new one is created.
+		Starts the background refresh once there is a token to refresh.
+		"""
+		await self.loop.run_in_executor(None, self.token_manager.establish)
+		if self.background_refresh:
+			self.token_manager.start()
+
+	async def get_token(self) -> AccessToken:
+		"""
+		Returns a valid token. Only waits on the executor when the token is missing or about to expire.
+		"""
+		if self.token_manager.token is None:
+			await self.establish_access_token()
+		token = self.token_manager.token
+		if token is not None and not token.expires_within(self.token_manager.refresh_margin, self.get_timestamp()):
+			return token
+		return await self.loop.run_in_executor(None, self.token_manager.get_token)
+
+	async def refresh_access_token(self, stale_token: AccessToken) -> None:
+		"""
+		Refreshes a token the API rejected, unless another request already replaced it.
+		"""
+		await self.loop.run_in_executor(None, lambda: self.token_manager.refresh(stale_token=stale_token, force=True))
+
+	def request_tokens(self, data: dict) -> AccessToken:
+		"""
+		Sends a token request on the event loop and waits for it. Called by the TokenManager from executor threads.
+
+		Raises:
+			KeyError: The API did not return a token, for example because the refresh token was rejected.
+			ConnectionError: The token endpoint could not be reached.
+		"""
+		try:
+			return asyncio.run_coroutine_threadsafe(self.create_tokens(data), self.loop).result()
+		except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+			raise ConnectionError(str(e)) from e
+
+	async def create_tokens(self, data: dict) -> AccessToken:
+		"""
+		Creates access and refresh tokens from the YoLink API.
+
+		Args:
+			data (dict): The data to be sent in the request to the YoLink API.
+
+		Raises:
+			KeyError: The API did not return a token, for example because the refresh token was rejected.
+
+		Returns:
+			AccessToken: The new token.
+		"""
+		async with self.session.post(self.token_url, data=data) as http_response:
+			response = await http_response.json(content_type=None)
+
+		return AccessToken(
+			access_token    = response["access_token"],
+			refresh_token   = response["refresh_token"],
+			expiration_time = response["expires_in"] + self.get_timestamp()
+		)
+
+	T = TypeVar('T', bound=ResponseData)
+
+	async def make_request(self,
+			method_name  : MethodNames,
+			response_type: Type[T],
+			msgid        : str | None = None,
+			device       : Device | None = None,
+			params = None
+		) -> Response[T]:
+		"""
+		Makes a request to the YoLink API with the given parameters. Returns the data from the response.
+
+		Args:
+			method_name     (str):                Target function (Defined in YoLink API Documentation).
+			msgid           (str, optional):   	  Message ID. Defaults to None and the API will generate one.
+			target_device   (Device, optional):   The Device. Used for deviceID and Token
+			params 			(_type_, optional):   Parameters. Required when specified by the method.
+
+		Raises:
+			ConnectionError: There was an error connecting to the YoLink API. The error message will specify the error code.
+				Rate limit and transient errors are only raised once the retries are exhausted.
+			RequestDropped: The rate limiter dropped the request, as it would have waited longer than its max_wait.
+			RequestRejected: The API answered with an error code that is neither a rate limit nor transient.
+
+		Returns:
+			T: An object representing the data from the response.
+		"""
+		device_id = device.device_id if device else None
+		token_refreshed = False
+		attempt = 0
+
+		while True:
+			if not await self.rate_limiter.acquire_async(device_id):
+				raise RequestDropped(f'request dropped by the rate limiter after waiting {self.rate_limiter.max_wait:.0f}s for the quota')
+			# Stamped per attempt, as retries may be sent long after the first one
+			data = create_request_body(method_name, self.get_timestamp(), msgid, device, params)
+			token = await self.get_token()
+
+			# Make and return data from request unless there is an error
+			try:
+				response = await self.post_request(token.access_token, data, response_type)
+				error = f'code {response.code}'
+			except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+				response = None
+				error = str(e)
+
+			if response is not None:
+				if response.code == "000000":
+					return response
+
+				# The token was revoked or expired early; refresh it once and retry
+				if response.code in TOKEN_ERROR_CODES and not token_refreshed:
+					# Requests rejected with the same token share a single refresh
+					await self.refresh_access_token(token)
+					token_refreshed = True
+					continue
+
+				if response.code not in RATE_LIMIT_CODES and response.code not in TRANSIENT_ERROR_CODES:
+					raise RequestRejected(error)
+
+			# Throttled or transient error; back off and retry
+			if attempt >= self.max_retries:
+				self.rate_limiter.record_drop()
+				raise ConnectionError(error)
+			self.rate_limiter.record_retry()
+			await asyncio.sleep(get_backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+			attempt += 1
+
+	async def post_request(self, access_token: str | None, data: str, response_type: Type[T]) -> Response[T]:
+		headers = {
+			"Content-Type": "application/json",
+			"Authorization": f'Bearer {access_token}'
+		}
+		async with self.session.post(self.api_url, headers=headers, data=data) as http_response:
+			content = await http_response.read()
+		return Response.from_bytes(content, response_type, self.lazy)
+
+	def get_timestamp(self) -> int:
+		return int(datetime.now().timestamp())
+
+	async def close(self) -> None:
+		"""
+		Stops the background refresh, then closes the HTTP session and every connection it holds.
+		"""
+		# A refresh in flight needs the loop to finish, so the thread is joined from the executor
+		await self.loop.run_in_executor(None, self.token_manager.stop)
+		await self.session.close()
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *exc_info) -> None:
+		await self.close()
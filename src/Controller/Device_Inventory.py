@@ -0,0 +1,263 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable
+
+from Interfaces.Device import Device
+from Interfaces.Responses.Devices.Home import HomeGetDeviceListData
+from Interfaces.Responses.Response import MethodNames
+
+if TYPE_CHECKING:
+	from Controller.YoLink_Controller import YoLinkController
+
+DEFAULT_TTL = 3600 # Seconds a device list is used before it is requested again
+DEFAULT_RETRY_DELAY = 60 # Seconds to wait before retrying a failed background refresh
+
+@dataclass
+class InventoryDiff:
+	"""
+	Changes between two device lists.
+
+	Attributes:
+		added   (list[Device]): Devices that were not listed before.
+		removed (list[Device]): Devices that are no longer listed, as they were last listed.
+		renamed (list[Device]): Devices listed under a new name.
+		updated (list[Device]): Devices whose token or type changed. Their requests must use the new Device.
+	"""
+	added: list[Device] = field(default_factory=list)
+	removed: list[Device] = field(default_factory=list)
+	renamed: list[Device] = field(default_factory=list)
+	updated: list[Device] = field(default_factory=list)
+
+	def is_empty(self) -> bool:
+		return not (self.added or self.removed or self.renamed or self.updated)
+
+def diff_devices(old: dict[str, Device], new: dict[str, Device]) -> InventoryDiff:
+	"""
+	Compares two device lists, both by device ID.
+	"""
+	diff = InventoryDiff(removed=[device for device_id, device in old.items() if device_id not in new])
+	for device_id, device in new.items():
+		previous = old.get(device_id)
+		if previous is None:
+			diff.added.append(device)
+			continue
+		if previous.name != device.name:
+			diff.renamed.append(device)
+		if previous.token != device.token or previous.type != device.type:
+			diff.updated.append(device)
+	return diff
+
+def get_device_list(controller: "YoLinkController") -> list[Device]:
+	"""
+	Requests the devices of the controller's account.
+	"""
+	devices_data: HomeGetDeviceListData = controller.make_request(MethodNames.HOME_GET_DEVICE_LIST, HomeGetDeviceListData).data
+	return devices_data.devices
+
+def index_by_type(devices: dict[str, Device]) -> dict[str, list[Device]]:
+	"""
+	Returns the devices by type, in the order they were listed.
+	"""
+	by_type: dict[str, list[Device]] = {}
+	for device in devices.values():
+		by_type.setdefault(device.type, []).append(device)
+	return by_type
+
+def load_inventory_cache(path: str, user_id: str) -> tuple[list[Device], float] | None:
+	"""
+	Loads the cached device list and when it was requested. Returns None if there is no cache,
+	it is unreadable, or it belongs to another user.
+	"""
+	try:
+		with open(path, "r") as file:
+			cache = json.load(file)
+		if cache["user_id"] != user_id:
+			return None
+		return [Device(device) for device in cache["devices"]], float(cache["fetched_at"])
+	except (OSError, ValueError, KeyError, TypeError):
+		return None
+
+def save_inventory_cache(path: str, user_id: str, devices: list[Device], fetched_at: float) -> None:
+	"""
+	Atomically writes the device list to the cache file. The file is only readable by its owner, as device tokens
+	allow controlling the devices.
+	"""
+	temporary_path = path + ".tmp"
+	descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+	with os.fdopen(descriptor, "w") as file:
+		json.dump({
+			"user_id": user_id,
+			"fetched_at": fetched_at,
+			"devices": [device.to_data() for device in devices]
+		}, file)
+	os.replace(temporary_path, path)
+
+class DeviceInventory:
+	"""
+	The devices of one YoLink account, persisted to a cache file so restarts within the TTL skip the device list request.
+
+	A background thread requests the device list again once it is older than the TTL. Every refresh is compared with
+	the previous list, and listeners receive the differences, letting pollers follow added, removed and renamed devices
+	without a restart.
+
+	Methods:
+		establish: Loads the cached device list, or requests it if there is no fresh cache.
+		refresh: Requests the device list and notifies listeners of changes.
+		subscribe: Registers a listener for changes.
+		get_device: Returns a device by ID.
+		get_devices: Returns every device, or every device of a type.
+		get_types: Returns the device types present.
+		start: Starts the background refresh thread.
+		stop: Stops the background refresh thread.
+
+	Attributes:
+		devices       (dict[str, Device]):       Devices by ID, in the order they were listed.
+		by_type       (dict[str, list[Device]]): Devices by type.
+		fetched_at    (float | None):            Epoch time the device list was requested.
+		ttl           (float):                   Seconds the device list is used before it is requested again.
+		refresh_count (int):                     Number of device list requests made.
+	"""
+	def __init__(self,
+			request_devices: Callable[[], list[Device]],
+			user_id        : str,
+			cache_path     : str | None = None,
+			ttl            : float = DEFAULT_TTL,
+			retry_delay    : float = DEFAULT_RETRY_DELAY
+		):
+		"""
+		Args:
+			request_devices (Callable[[], list[Device]]): Requests the account's device list.
+			user_id         (str):                        The user the devices belong to, recorded in the cache.
+			cache_path      (str, optional):              Where to persist the device list. Defaults to no cache.
+			ttl             (float, optional):            Seconds the device list is used before it is requested again.
+			retry_delay     (float, optional):            Seconds to wait before retrying a failed background refresh.
+		"""
+		self.request_devices = request_devices
+		self.user_id = user_id
+		self.cache_path = cache_path
+		self.ttl = ttl
+		self.retry_delay = retry_delay
+
+		# The indexes are replaced as a whole on refresh, so readers never see a partial update
+		self.devices: dict[str, Device] = {}
+		self.by_type: dict[str, list[Device]] = {}
+		self.fetched_at: float | None = None
+		self.refresh_count = 0
+		self.listeners: list[Callable[[InventoryDiff], None]] = []
+		self.lock = threading.Lock()
+		self.stopped = threading.Event()
+		self.thread: threading.Thread | None = None
+
+	def establish(self) -> None:
+		"""
+		Loads the cached device list if it is younger than the TTL, otherwise requests it.
+		"""
+		if self.cache_path is not None:
+			cached = load_inventory_cache(self.cache_path, self.user_id)
+			if cached is not None:
+				devices, fetched_at = cached
+				if time.time() - fetched_at < self.ttl:
+					with self.lock:
+						self.set_devices(devices, fetched_at)
+					return
+		self.refresh()
+
+	def refresh(self) -> InventoryDiff:
+		"""
+		Requests the device list, replaces the indexes and persists it. Listeners are notified if it changed.
+		The first list loaded is not reported as a change. The lock is only held to swap the indexes,
+		so readers and subscribers never wait on the request.
+
+		Returns:
+			InventoryDiff: The changes since the previous list.
+		"""
+		with self.lock:
+			self.refresh_count += 1
+		devices = self.request_devices()
+		fetched_at = time.time()
+
+		with self.lock:
+			first = self.fetched_at is None
+			diff = diff_devices(self.devices, {device.device_id: device for device in devices})
+			self.set_devices(devices, fetched_at)
+			if self.cache_path is not None:
+				save_inventory_cache(self.cache_path, self.user_id, devices, fetched_at)
+			listeners = list(self.listeners)
+
+		if not first and not diff.is_empty():
+			for listener in listeners:
+				listener(diff)
+		return diff
+
+	def set_devices(self, devices: list[Device], fetched_at: float) -> None:
+		"""
+		Rebuilds the indexes. Called with the lock held.
+		"""
+		by_id = {device.device_id: device for device in devices}
+		self.by_type = index_by_type(by_id)
+		self.devices = by_id
+		self.fetched_at = fetched_at
+
+	def subscribe(self, listener: Callable[[InventoryDiff], None]) -> None:
+		"""
+		Registers a listener called with the changes of every refresh that changed the device list.
+		Listeners run on the refreshing thread.
+		"""
+		with self.lock:
+			self.listeners.append(listener)
+
+	def get_device(self, device_id: str) -> Device | None:
+		return self.devices.get(device_id)
+
+	def get_devices(self, device_type: str | None = None) -> list[Device]:
+		"""
+		Returns every device, or only the devices of a type.
+		"""
+		if device_type is not None:
+			return list(self.by_type.get(device_type, []))
+		return list(self.devices.values())
+
+	def get_types(self) -> list[str]:
+		return list(self.by_type)
+
+	def get_age(self) -> float | None:
+		"""
+		Returns the seconds since the device list was requested, or None if it has not been loaded.
+		"""
+		fetched_at = self.fetched_at
+		return time.time() - fetched_at if fetched_at is not None else None
+
+	def start(self) -> None:
+		"""
+		Starts a daemon thread that requests the device list again whenever it is older than the TTL.
+		"""
+		if self.thread is not None:
+			return
+		self.stopped.clear()
+		self.thread = threading.Thread(target=self.refresh_loop, name="inventory-refresh", daemon=True)
+		self.thread.start()
+
+	def stop(self) -> None:
+		"""
+		Stops the background refresh thread.
+		"""
+		self.stopped.set()
+		if self.thread is not None:
+			self.thread.join()
+			self.thread = None
+
+	def refresh_loop(self) -> None:
+		while not self.stopped.is_set():
+			age = self.get_age()
+			wait = self.ttl - age if age is not None else 0
+			if self.stopped.wait(max(wait, 0)):
+				return
+			try:
+				self.refresh()
+			except Exception:
+				# Keep using the current devices; try again later
+				if self.stopped.wait(self.retry_delay):
+					return
@@ -0,0 +1,241 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import requests
+
+from Controller.Rate_Limiter import RequestDropped, RequestRejected
+from Controller.YoLink_Controller import YoLinkController
+from Interfaces.Device import Device
+from Interfaces.Responses.Response import MethodNames, Response, ResponseData, get_response_type, get_state_method
+
+if TYPE_CHECKING: # aiohttp takes longer to import than the rest of the poller, and only the async poller uses it
+	from Controller.Async_YoLink_Controller import AsyncYoLinkController
+
+DEFAULT_MAX_WORKERS = 16
+# The controller already retries throttled and transient errors with backoff, so by default it holds the only retry
+# budget. Every extra attempt of the poller repeats the controller's retries.
+DEFAULT_RETRIES = 0
+DEFAULT_RETRY_DELAY = 0.5 # seconds, doubled after every failed attempt
+# Errors of the connection or the API worth another attempt. Anything else, such as a KeyError decoding the data, is a bug
+RETRYABLE_ERRORS: tuple[type[Exception], ...] = (ConnectionError, TimeoutError, requests.RequestException)
+
+def is_pollable(device: Device) -> bool:
+	"""
+	Whether the device's type has a getState method.
+	"""
+	return device.type.upper() + "_GET_STATE" in MethodNames.__members__
+
+@dataclass
+class PollResult:
+	"""
+	The outcome of polling a single device.
+
+	Attributes:
+		device   (Device):                    The device that was polled.
+		data     (ResponseData | None):       The device's state, or None if every attempt failed.
+		error    (Exception | None):          The last error raised, or None on success.
+		attempts (int):                       Number of requests made for this device.
+		elapsed  (float):                     Seconds spent on this device, including retries.
+	"""
+	device: Device
+	data: ResponseData | None
+	error: Exception | None
+	attempts: int
+	elapsed: float
+
+	@property
+	def ok(self) -> bool:
+		return self.error is None
+
+class DevicePoller:
+	"""
+	Polls the state of many devices concurrently with a bounded thread pool.
+	Requests share the controller's pooled session, so max_workers should not exceed the pool size by much.
+
+	Methods:
+		poll: Polls every device and returns the results in device order.
+		poll_device: Polls a single device, retrying failures.
+		close: Shuts down the thread pool.
+
+	Attributes:
+		controller  (YoLinkController): The controller used for requests.
+		max_workers (int):              Maximum number of requests in flight.
+		retries     (int):              Extra attempts made for a device after the controller gave up on it.
+		retry_delay (float):            Seconds to wait before the first retry.
+	"""
+	def __init__(self, controller: YoLinkController,
+			max_workers: int = DEFAULT_MAX_WORKERS,
+			retries    : int = DEFAULT_RETRIES,
+			retry_delay: float = DEFAULT_RETRY_DELAY
+		):
+		self.controller = controller
+		self.max_workers = max_workers
+		self.retries = retries
+		self.retry_delay = retry_delay
+		self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="poller")
+
+	def poll(self, devices: list[Device]) -> list[PollResult]:
+		"""
+		Polls every device with its getState method. A failing device does not abort the sweep.
+
+		Args:
+			devices (list[Device]): The devices to poll. May mix device types.
+
+		Returns:
+			list[PollResult]: One result per device, in the same order as the devices.
+		"""
+		return list(self.executor.map(self.poll_device, devices))
+
+	def poll_device(self, device: Device) -> PollResult:
+		"""
+		Polls a single device, retrying connection and API errors with a doubling delay until it succeeds or runs out
+		of attempts. Errors the API would repeat, dropped requests and other errors, such as a response that cannot
+		be decoded, fail the device at once.
+
+		Args:
+			device (Device): The device to poll.
+
+		Returns:
+			PollResult: The result of the poll.
+		"""
+		start = time.monotonic()
+		error: Exception | None = None
+		delay = self.retry_delay
+		attempts = 0
+
+		try:
+			method = get_state_method(device.type)
+			response_type = get_response_type(device.type, method)
+		except KeyError as e:
+			return PollResult(device, None, e, attempts, time.monotonic() - start)
+
+		while attempts <= self.retries:
+			attempts += 1
+			try:
+				data: ResponseData = self.controller.make_request(
+					method_name = method,
+					response_type = response_type,
+					device = device
+				).data
+				return PollResult(device, data, None, attempts, time.monotonic() - start)
+			except RequestDropped as e: # The quota is spent; reported as failed rather than waiting for it again
+				return PollResult(device, None, e, attempts, time.monotonic() - start)
+			except RequestRejected as e: # The API would answer another attempt the same way
+				return PollResult(device, None, e, attempts, time.monotonic() - start)
+			except RETRYABLE_ERRORS as e:
+				error = e
+				if attempts <= self.retries:
+					time.sleep(delay)
+					delay *= 2
+			except Exception as e: # Another attempt would fail the same way
+				return PollResult(device, None, e, attempts, time.monotonic() - start)
+
+		return PollResult(device, None, error, attempts, time.monotonic() - start)
+
+	def close(self) -> None:
+		self.executor.shutdown(wait=True)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.close()
+
+def get_async_retryable_errors() -> tuple[type[Exception], ...]:
+	"""
+	RETRYABLE_ERRORS, with those of aiohttp. Only imported once an async poller is created.
+	"""
+	import aiohttp
+	return RETRYABLE_ERRORS + (aiohttp.ClientError,)
+
+class AsyncDevicePoller:
+	"""
+	Polls the state of many devices concurrently on an event loop. Counterpart of DevicePoller for AsyncYoLinkController.
+
+	Methods:
+		poll: Polls every device and returns the results in device order.
+		poll_device: Polls a single device, retrying failures.
+
+	Attributes:
+		controller      (AsyncYoLinkController): The controller used for requests.
+		max_concurrency (int):                   Maximum number of requests in flight.
+		retries         (int):                   Extra attempts made for a device after the controller gave up on it.
+		retry_delay     (float):                 Seconds to wait before the first retry.
+	"""
+	def __init__(self, controller: "AsyncYoLinkController",
+			max_concurrency: int = DEFAULT_MAX_WORKERS,
+			retries        : int = DEFAULT_RETRIES,
+			retry_delay    : float = DEFAULT_RETRY_DELAY
+		):
+		self.controller = controller
+		self.max_concurrency = max_concurrency
+		self.retries = retries
+		self.retry_delay = retry_delay
+		self.retryable_errors = get_async_retryable_errors()
+
+	async def poll(self, devices: list[Device]) -> list[PollResult]:
+		"""
+		Polls every device with its getState method. A failing device does not abort the sweep.
+
+		Args:
+			devices (list[Device]): The devices to poll. May mix device types.
+
+		Returns:
+			list[PollResult]: One result per device, in the same order as the devices.
+		"""
+		semaphore = asyncio.Semaphore(self.max_concurrency)
+
+		async def bounded_poll(device: Device) -> PollResult:
+			async with semaphore:
+				return await self.poll_device(device)
+
+		return await asyncio.gather(*(bounded_poll(device) for device in devices))
+
+	async def poll_device(self, device: Device) -> PollResult:
+		"""
+		Polls a single device, retrying connection and API errors with a doubling delay until it succeeds or runs out
+		of attempts. Errors the API would repeat, dropped requests and other errors, such as a response that cannot
+		be decoded, fail the device at once.
+
+		Args:
+			device (Device): The device to poll.
+
+		Returns:
+			PollResult: The result of the poll.
+		"""
+		start = time.monotonic()
+		error: Exception | None = None
+		delay = self.retry_delay
+		attempts = 0
+
+		try:
+			method = get_state_method(device.type)
+			response_type = get_response_type(device.type, method)
+		except KeyError as e:
+			return PollResult(device, None, e, attempts, time.monotonic() - start)
+
+		while attempts <= self.retries:
+			attempts += 1
+			try:
+				response: Response[ResponseData] = await self.controller.make_request(
+					method_name = method,
+					response_type = response_type,
+					device = device
+				)
+				return PollResult(device, response.data, None, attempts, time.monotonic() - start)
+			except RequestDropped as e: # The quota is spent; reported as failed rather than waiting for it again
+				return PollResult(device, None, e, attempts, time.monotonic() - start)
+			except RequestRejected as e: # The API would answer another attempt the same way
+				return PollResult(device, None, e, attempts, time.monotonic() - start)
+			except self.retryable_errors as e:
+				error = e
+				if attempts <= self.retries:
+					await asyncio.sleep(delay)
+					delay *= 2
+			except Exception as e: # Another attempt would fail the same way
+				return PollResult(device, None, e, attempts, time.monotonic() - start)
+
+		return PollResult(device, None, error, attempts, time.monotonic() - start)
@@ -0,0 +1,265 @@
+import heapq
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from Controller.Device_Poller import DevicePoller, PollResult
+from Interfaces.Device import Device
+from Interfaces.Responses.Response import ResponseData
+
+# Base poll interval in seconds for each device type
+POLL_INTERVALS: dict[str, float] = {
+	"WaterMeterController": 60,
+	"LeakSensor": 60,
+	"DoorSensor": 120,
+	"MotionSensor": 120,
+	"VibrationSensor": 120,
+	"THSensor": 300,
+	"Lock": 300,
+	"Outlet": 300,
+	"MultiOutlet": 300,
+	"Switch": 300,
+	"Manipulator": 300,
+	"SmartRemoter": 600,
+	"InfraredRemoter": 1800,
+	"Hub": 3600,
+	"SpeakerHub": 3600,
+}
+DEFAULT_POLL_INTERVAL = 600
+MIN_INTERVAL_FACTOR = 0.25 # Shortest interval, relative to the device type's base interval
+MAX_INTERVAL_FACTOR = 4.0 # Longest interval, relative to the device type's base interval
+SPEEDUP = 0.5 # Interval multiplier after a reading changed
+SLOWDOWN = 1.5 # Interval multiplier after a reading stayed the same
+IGNORED_FIELDS = {"reportAt"} # Fields that change without the reading changing
+
+def get_fingerprint(data: ResponseData) -> tuple:
+	"""
+	Returns the scalar values of a reading, used to tell whether it changed since the last poll.
+	"""
+	return tuple(
+		(name, value) for name, value in data.get_values().items()
+		if name not in IGNORED_FIELDS and isinstance(value, (str, int, float, bool, type(None)))
+	)
+
+@dataclass
+class DeviceSchedule:
+	"""
+	Scheduling state of one device.
+
+	Attributes:
+		device        (Device): The device.
+		base_interval (float):  The device type's base interval in seconds.
+		interval      (float):  The current interval in seconds.
+		next_due      (float):  Monotonic time of the next poll.
+		fingerprint   (tuple | None): Values of the last successful reading.
+		polls         (int):    Number of polls made.
+		first_poll    (float | None): Monotonic time of the first poll.
+		last_poll     (float | None): Monotonic time of the latest poll.
+	"""
+	device: Device
+	base_interval: float
+	interval: float
+	next_due: float
+	fingerprint: tuple | None = None
+	polls: int = 0
+	first_poll: float | None = None
+	last_poll: float | None = None
+
+	def get_poll_rate(self) -> float:
+		"""
+		Returns the effective number of polls per hour.
+		"""
+		if self.polls < 2 or self.first_poll is None or self.last_poll is None or self.last_poll == self.first_poll:
+			return 0.0
+		return (self.polls - 1) * 3600 / (self.last_poll - self.first_poll)
+
+@dataclass
+class SchedulerStats:
+	"""
+	Attributes:
+		sweeps     (int):              Number of batches of due devices polled.
+		mean_lag   (float):            Mean seconds between a poll's due time and when it started.
+		max_lag    (float):            Largest lag seen in seconds.
+		callback_failures (int):       Readings on_reading raised an exception for.
+		poll_rates (dict[str, float]): Effective polls per hour, by device ID.
+		intervals  (dict[str, float]): Current interval in seconds, by device ID.
+	"""
+	sweeps: int
+	mean_lag: float
+	max_lag: float
+	callback_failures: int = 0
+	poll_rates: dict[str, float] = field(default_factory=dict)
+	intervals: dict[str, float] = field(default_factory=dict)
+
+class PollScheduler:
+	"""
+	Long-running poll scheduler. Devices wait in a priority queue ordered by their next due time,
+	and every device type has its own base interval. A device's interval shortens when its readings change
+	and lengthens while they stay the same, within MIN_INTERVAL_FACTOR and MAX_INTERVAL_FACTOR of the base.
+
+	Methods:
+		add_device: Schedules a device, polling it as soon as possible.
+		remove_device: Stops polling a device.
+		update_device: Replaces a scheduled device, such as after it was renamed or its token changed.
+		run_pending: Polls every device that is due and reschedules it.
+		run: Polls devices as they become due until stopped.
+		stop: Stops run.
+		get_stats: Returns scheduler lag and per-device poll rates.
+
+	Attributes:
+		poller     (DevicePoller):                            Polls due devices concurrently.
+		on_reading (Callable[[Device, ResponseData], None]):  Receives every successful reading. Exceptions it raises
+			are printed and counted.
+		intervals  (dict[str, float]):                        Base interval by device type.
+		schedules  (dict[str, DeviceSchedule]):               Scheduling state by device ID.
+	"""
+	def __init__(self,
+			poller          : DevicePoller,
+			on_reading      : Callable[[Device, ResponseData], None],
+			intervals       : dict[str, float] = POLL_INTERVALS,
+			default_interval: float = DEFAULT_POLL_INTERVAL
+		):
+		self.poller = poller
+		self.on_reading = on_reading
+		self.intervals = intervals
+		self.default_interval = default_interval
+
+		self.schedules: dict[str, DeviceSchedule] = {}
+		self.queue: list[tuple[float, int, str]] = []
+		self.counter = 0 # Breaks ties in the queue without comparing device IDs
+		self.lock = threading.Lock()
+		self.stopped = threading.Event()
+		self.woken = threading.Event()
+
+		self.sweeps = 0
+		self.lag_total = 0.0
+		self.lag_count = 0
+		self.max_lag = 0.0
+		self.callback_failures = 0
+
+	def add_device(self, device: Device) -> None:
+		"""
+		Schedules a device. It is polled as soon as possible, then at its device type's interval.
+		"""
+		base_interval = self.intervals.get(device.type, self.default_interval)
+		now = time.monotonic()
+		with self.lock:
+			schedule = DeviceSchedule(device, base_interval, base_interval, now)
+			self.schedules[device.device_id] = schedule
+			self.push(schedule)
+		self.woken.set()
+
+	def remove_device(self, device_id: str) -> None:
+		"""
+		Stops polling a device. Its queue entry is discarded when it comes up.
+		"""
+		with self.lock:
+			self.schedules.pop(device_id, None)
+
+	def update_device(self, device: Device) -> None:
+		"""
+		Replaces the Device of a scheduled device, keeping its schedule. Devices that are not scheduled are ignored.
+		"""
+		with self.lock:
+			schedule = self.schedules.get(device.device_id)
+			if schedule is not None:
+				schedule.device = device
+
+	def push(self, schedule: DeviceSchedule) -> None:
+		self.counter += 1
+		heapq.heappush(self.queue, (schedule.next_due, self.counter, schedule.device.device_id))
+
+	def pop_due(self, now: float) -> list[DeviceSchedule]:
+		"""
+		Removes every due device from the queue, skipping removed and rescheduled entries.
+		"""
+		due: list[DeviceSchedule] = []
+		with self.lock:
+			while self.queue and self.queue[0][0] <= now:
+				next_due, _, device_id = heapq.heappop(self.queue)
+				schedule = self.schedules.get(device_id)
+				if schedule is None or schedule.next_due != next_due:
+					continue
+				due.append(schedule)
+		return due
+
+	def run_pending(self) -> list[PollResult]:
+		"""
+		Polls every device that is due, adapts its interval and puts it back in the queue.
+
+		Returns:
+			list[PollResult]: The results of the polls, in due order.
+		"""
+		start = time.monotonic()
+		due = self.pop_due(start)
+		if not due:
+			return []
+
+		for schedule in due:
+			lag = start - schedule.next_due
+			self.lag_total += lag
+			self.lag_count += 1
+			self.max_lag = max(self.max_lag, lag)
+
+		results = self.poller.poll([schedule.device for schedule in due])
+		self.sweeps += 1
+
+		for schedule, result in zip(due, results):
+			try:
+				if result.ok and result.data is not None:
+					fingerprint = get_fingerprint(result.data)
+					if schedule.fingerprint is not None:
+						factor = SLOWDOWN if fingerprint == schedule.fingerprint else SPEEDUP
+						schedule.interval = min(
+							max(schedule.interval * factor, schedule.base_interval * MIN_INTERVAL_FACTOR),
+							schedule.base_interval * MAX_INTERVAL_FACTOR
+						)
+					schedule.fingerprint = fingerprint
+					self.on_reading(schedule.device, result.data)
+			except Exception as e:
+				# A failing callback loses this reading only; the device stays scheduled and the scheduler keeps running
+				print(f'Handling the reading of {schedule.device.name} failed: {e}')
+				self.callback_failures += 1
+			finally:
+				schedule.polls += 1
+				if schedule.first_poll is None:
+					schedule.first_poll = start
+				schedule.last_poll = start
+
+				with self.lock:
+					if schedule.device.device_id in self.schedules:
+						schedule.next_due = time.monotonic() + schedule.interval
+						self.push(schedule)
+
+		return results
+
+	def run(self) -> None:
+		"""
+		Polls devices as they become due until stop is called.
+		"""
+		self.stopped.clear()
+		while not self.stopped.is_set():
+			self.run_pending()
+			with self.lock:
+				wait = self.queue[0][0] - time.monotonic() if self.queue else None
+			if wait is None or wait > 0:
+				# Sleep until the next device is due, a device is added, or the scheduler is stopped
+				self.woken.wait(wait)
+				self.woken.clear()
+
+	def stop(self) -> None:
+		self.stopped.set()
+		self.woken.set()
+
+	def get_stats(self) -> SchedulerStats:
+		with self.lock:
+			schedules = list(self.schedules.values())
+		return SchedulerStats(
+			sweeps = self.sweeps,
+			mean_lag = self.lag_total / self.lag_count if self.lag_count else 0.0,
+			max_lag = self.max_lag,
+			callback_failures = self.callback_failures,
+			poll_rates = {schedule.device.device_id: schedule.get_poll_rate() for schedule in schedules},
+			intervals = {schedule.device.device_id: schedule.interval for schedule in schedules}
+		)
@@ -0,0 +1,234 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+# Conservative defaults, tune them to the account's API quota
+DEFAULT_ACCOUNT_CAPACITY = 100 # Burst size for the whole account
+DEFAULT_ACCOUNT_RATE = 100 / 300 # Requests per second for the whole account
+DEFAULT_DEVICE_CAPACITY = 6 # Burst size for a single device
+DEFAULT_DEVICE_RATE = 6 / 60 # Requests per second for a single device
+DEFAULT_MAX_WAIT = None # Seconds a request may wait for the limiter before it is dropped. None waits up to a full
+                        # refill of the account bucket, so a sweep larger than the burst is spread over the quota window
+
+DEFAULT_BACKOFF_BASE = 0.5 # Seconds
+DEFAULT_BACKOFF_CAP = 30.0 # Seconds
+
+RATE_LIMIT_CODES = {"010301"} # Access denied due to reaching limit
+TRANSIENT_ERROR_CODES = {
+	"000101", "000102", # Hub cannot connect or respond
+	"000201", "000202", "000203", # Device cannot connect or respond
+	"010000", "010001", # Service or internal connection not available
+	"020100", "020104", # Device is busy
+}
+
+def get_backoff_delay(attempt: int, base: float = DEFAULT_BACKOFF_BASE, cap: float = DEFAULT_BACKOFF_CAP) -> float:
+	"""
+	Exponential backoff with full jitter.
+
+	Args:
+		attempt (int):             Number of the retry, starting at 0.
+		base    (float, optional): Delay ceiling of the first retry in seconds.
+		cap     (float, optional): Largest delay ceiling in seconds.
+
+	Returns:
+		float: Seconds to wait, uniformly distributed between 0 and min(cap, base * 2^attempt).
+	"""
+	return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class RequestDropped(ConnectionError):
+	"""
+	A request the rate limiter dropped, as it would have waited longer than max_wait for the quota.
+	Retrying it only waits for the same quota again.
+	"""
+
+class RequestRejected(ConnectionError):
+	"""
+	A request the API answered with an error code that is neither a rate limit nor transient, such as an unknown
+	device or an invalid device token. Retrying it gets the same answer.
+	"""
+
+class TokenBucket:
+	"""
+	A token bucket. Not thread-safe on its own; RateLimiter guards its buckets with one lock.
+
+	Attributes:
+		capacity (float): Maximum number of tokens, i.e. the largest burst.
+		rate     (float): Tokens added per second.
+		tokens   (float): Tokens currently available.
+	"""
+	def __init__(self, capacity: float, rate: float):
+		self.capacity = capacity
+		self.rate = rate
+		self.tokens = capacity
+		self.updated = time.monotonic()
+
+	def refill(self, now: float) -> None:
+		self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+		self.updated = now
+
+	def is_full(self, now: float) -> bool:
+		"""
+		Whether the bucket would be full if it were refilled now.
+		"""
+		return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+	def get_wait(self) -> float:
+		"""
+		Returns the seconds until a token is available. Call refill first.
+		"""
+		if self.tokens >= 1:
+			return 0.0
+		return (1 - self.tokens) / self.rate
+
+@dataclass
+class RequestStats:
+	"""
+	Counters for tuning poll intervals against the API quota.
+
+	Attributes:
+		requests  (int): Requests let through by the limiter.
+		throttled (int): Requests that had to wait for the limiter.
+		retried   (int): Retries caused by rate limit or transient error codes.
+		dropped   (int): Requests abandoned after waiting too long or running out of retries.
+	"""
+	requests: int = 0
+	throttled: int = 0
+	retried: int = 0
+	dropped: int = 0
+
+class RateLimiter:
+	"""
+	Client-side rate limiter with one token bucket for the account and one per device.
+	A request to a device needs a token from both buckets. A device bucket that refilled completely is the same as
+	a new one, so such buckets are dropped once per refill period, keeping memory bounded by the active devices.
+
+	Methods:
+		reserve: Takes the tokens for a request if they are available, otherwise returns how long to wait.
+		acquire: Blocks until a request may be sent.
+		acquire_async: Waits on the event loop until a request may be sent.
+		record_retry: Counts a retry.
+		record_drop: Counts a dropped request.
+
+	Attributes:
+		stats (RequestStats): Request counters.
+	"""
+	def __init__(self,
+			account_capacity: float = DEFAULT_ACCOUNT_CAPACITY,
+			account_rate    : float = DEFAULT_ACCOUNT_RATE,
+			device_capacity : float = DEFAULT_DEVICE_CAPACITY,
+			device_rate     : float = DEFAULT_DEVICE_RATE,
+			max_wait        : float | None = DEFAULT_MAX_WAIT
+		):
+		"""
+		Args:
+			account_capacity (float, optional): Burst size for the whole account.
+			account_rate     (float, optional): Requests per second for the whole account.
+			device_capacity  (float, optional): Burst size for a single device.
+			device_rate      (float, optional): Requests per second for a single device.
+			max_wait         (float, optional): Seconds a request may wait before it is dropped.
+				Defaults to the time the account bucket takes to refill completely.
+		"""
+		self.account_bucket = TokenBucket(account_capacity, account_rate)
+		self.device_capacity = device_capacity
+		self.device_rate = device_rate
+		self.device_buckets: dict[str, TokenBucket] = {}
+		self.eviction_interval = device_capacity / device_rate # Time an emptied device bucket takes to refill
+		self.next_eviction = time.monotonic() + self.eviction_interval
+		self.max_wait = max_wait if max_wait is not None else account_capacity / account_rate
+		self.stats = RequestStats()
+		self.lock = threading.Lock()
+
+	def reserve(self, device_id: str | None) -> float:
+		"""
+		Takes a token from the account bucket and the device's bucket if both have one.
+
+		Args:
+			device_id (str | None): The target device, or None for account-level requests.
+
+		Returns:
+			float: 0 if the request may be sent now, otherwise the seconds to wait before trying again.
+		"""
+		with self.lock:
+			now = time.monotonic()
+			if now >= self.next_eviction:
+				self.evict_full_buckets(now)
+			buckets = [self.account_bucket]
+			if device_id is not None:
+				device_bucket = self.device_buckets.get(device_id)
+				if device_bucket is None:
+					device_bucket = TokenBucket(self.device_capacity, self.device_rate)
+					self.device_buckets[device_id] = device_bucket
+				buckets.append(device_bucket)
+
+			for bucket in buckets:
+				bucket.refill(now)
+			wait = max(bucket.get_wait() for bucket in buckets)
+			if wait == 0:
+				for bucket in buckets:
+					bucket.tokens -= 1
+			return wait
+
+	def evict_full_buckets(self, now: float) -> None:
+		"""
+		Drops the device buckets that are full again. Called with the lock held.
+		"""
+		self.device_buckets = {
+			device_id: bucket for device_id, bucket in self.device_buckets.items() if not bucket.is_full(now)
+		}
+		self.next_eviction = now + self.eviction_interval
+
+	def acquire(self, device_id: str | None) -> bool:
+		"""
+		Blocks until a request to the device may be sent.
+
+		Args:
+			device_id (str | None): The target device, or None for account-level requests.
+
+		Returns:
+			bool: False if the request would have waited longer than max_wait and was dropped.
+		"""
+		deadline = time.monotonic() + self.max_wait
+		throttled = False
+		while True:
+			wait = self.reserve(device_id)
+			if wait == 0:
+				self.record_request(throttled)
+				return True
+			if time.monotonic() + wait > deadline:
+				self.record_drop()
+				return False
+			throttled = True
+			time.sleep(wait)
+
+	async def acquire_async(self, device_id: str | None) -> bool:
+		"""
+		Waits on the event loop until a request to the device may be sent. See acquire.
+		"""
+		deadline = time.monotonic() + self.max_wait
+		throttled = False
+		while True:
+			wait = self.reserve(device_id)
+			if wait == 0:
+				self.record_request(throttled)
+				return True
+			if time.monotonic() + wait > deadline:
+				self.record_drop()
+				return False
+			throttled = True
+			await asyncio.sleep(wait)
+
+	def record_request(self, throttled: bool) -> None:
+		with self.lock:
+			self.stats.requests += 1
+			if throttled:
+				self.stats.throttled += 1
+
+	def record_retry(self) -> None:
+		with self.lock:
+			self.stats.retried += 1
+
+	def record_drop(self) -> None:
+		with self.lock:
+			self.stats.dropped += 1
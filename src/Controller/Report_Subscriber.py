@@ -0,0 +1,229 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from Controller.Device_Poller import DevicePoller, PollResult
+from Controller.YoLink_Controller import YoLinkController
+from Interfaces.Data.Event import to_report_at
+from Interfaces.Device import Device
+from Interfaces.Responses.Decoder import loads
+from Interfaces.Responses.Response import ResponseData, get_response_type, get_state_method
+
+MQTT_HOST = "api.yosmart.com"
+MQTT_PORT = 8003
+REPORT_TOPIC = "yl-home/{}/+/report" # Formatted with the home ID
+REPORT_EVENTS = {"Report", "Alert", "StatusChange"} # Events that carry a device's state
+DEFAULT_QUIET_AFTER = 900 # Seconds without a report before a device is polled instead
+
+# Device types whose getState data nests the reported state under "state"
+NESTED_STATE_TYPES = {"THSensor", "DoorSensor", "LeakSensor", "MotionSensor", "VibrationSensor", "SmartRemoter"}
+
+def create_mqtt_client(client_id: str) -> Any:
+	"""
+	Creates a paho MQTT client. paho-mqtt is only required when push reports are used.
+	"""
+	import paho.mqtt.client as mqtt
+	return mqtt.Client(callback_api_version=mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+
+def format_report_time(milliseconds: int) -> str:
+	"""
+	Formats a report's millisecond timestamp like the reportAt field of getState responses.
+	"""
+	return to_report_at(milliseconds / 1000)
+
+def report_to_state_data(device_type: str, report: dict) -> dict:
+	"""
+	Reshapes a pushed BUDP report into the data of the device type's getState response,
+	so it can be decoded by the same ResponseData subclass.
+
+	Args:
+		device_type (str):  The type of the reporting device.
+		report      (dict): The report, with "event", "time", "deviceId" and "data".
+
+	Returns:
+		dict: The report's data in the getState layout.
+	"""
+	data = report["data"]
+	if device_type in NESTED_STATE_TYPES:
+		data = {"online": True, "state": {**data, "online": True}}
+	return {
+		**data,
+		"reportAt": format_report_time(report["time"]),
+		"deviceId": report["deviceId"]
+	}
+
+@dataclass
+class SubscriberStats:
+	"""
+	Attributes:
+		received (int): Messages received from the broker.
+		decoded  (int): Reports decoded into ResponseData and handed to the reading callback.
+		ignored  (int): Messages that were not state reports, or came from unknown devices.
+		failed   (int): Reports that could not be decoded.
+		polled   (int): Polls made for devices that went quiet.
+	"""
+	received: int = 0
+	decoded: int = 0
+	ignored: int = 0
+	failed: int = 0
+	polled: int = 0
+
+class ReportSubscriber:
+	"""
+	Receives device state reports pushed over the YoLink MQTT broker instead of polling for them.
+	Reports are decoded into the same ResponseData subclasses as getState responses and handed to a callback,
+	so they follow the same persistence path as polled readings. Devices that have not reported for a while
+	can be polled with poll_quiet_devices.
+
+	Methods:
+		start: Connects to the broker and subscribes to the home's reports.
+		stop: Disconnects from the broker.
+		handle_report: Decodes a report and passes it to the reading callback.
+		add_device: Accepts reports from a device, or replaces a known device.
+		remove_device: Stops accepting reports from a device.
+		get_quiet_devices: Returns devices that have not reported recently.
+		poll_quiet_devices: Polls the quiet devices and passes their state to the reading callback.
+
+	Attributes:
+		controller  (YoLinkController): Provides the access token used as the MQTT username.
+		home_id     (str):              The home whose reports are subscribed to.
+		devices     (dict[str, Device]): Known devices, by device ID.
+		on_reading  (Callable[[Device, ResponseData], None]): Receives every decoded reading.
+		quiet_after (float):            Seconds without a report before a device counts as quiet.
+		stats       (SubscriberStats):  Message counters.
+	"""
+	def __init__(self,
+			controller    : YoLinkController,
+			home_id       : str,
+			devices       : list[Device],
+			on_reading    : Callable[[Device, ResponseData], None],
+			quiet_after   : float = DEFAULT_QUIET_AFTER,
+			host          : str = MQTT_HOST,
+			port          : int = MQTT_PORT,
+			client_factory: Callable[[str], Any] = create_mqtt_client
+		):
+		"""
+		Args:
+			controller     (YoLinkController):            Provides the access token used as the MQTT username.
+			home_id        (str):                         The home whose reports are subscribed to.
+			devices        (list[Device]):                Devices to accept reports from.
+			on_reading     (Callable[[Device, ResponseData], None]): Receives every decoded reading.
+			quiet_after    (float, optional):             Seconds without a report before a device counts as quiet.
+			host           (str, optional):               The MQTT broker's host.
+			port           (int, optional):               The MQTT broker's port.
+			client_factory (Callable[[str], Any], optional): Creates the MQTT client from a client ID.
+				Replace it to run against a local broker stand-in.
+		"""
+		self.controller = controller
+		self.home_id = home_id
+		self.devices = {device.device_id: device for device in devices}
+		self.on_reading = on_reading
+		self.quiet_after = quiet_after
+		self.host = host
+		self.port = port
+		self.stats = SubscriberStats()
+
+		# Devices count as heard from at startup, so they are only polled once they stay quiet
+		now = time.monotonic()
+		self.last_seen: dict[str, float] = {device_id: now for device_id in self.devices}
+		self.lock = threading.Lock()
+
+		self.client = client_factory(f"{controller.user_id}-{int(now)}")
+		self.client.on_connect = self.on_connect
+		self.client.on_disconnect = self.on_disconnect
+		self.client.on_message = self.on_message
+
+	def start(self) -> None:
+		"""
+		Connects to the broker with the current access token and starts the network thread.
+		"""
+		self.client.username_pw_set(self.controller.token_manager.get_access_token())
+		self.client.connect(self.host, self.port)
+		self.client.loop_start()
+
+	def stop(self) -> None:
+		self.client.disconnect()
+		self.client.loop_stop()
+
+	def on_connect(self, client, userdata, flags, reason_code, properties=None) -> None:
+		client.subscribe(REPORT_TOPIC.format(self.home_id))
+
+	def on_disconnect(self, client, userdata, flags, reason_code, properties=None) -> None:
+		# The token may have been refreshed since connecting; reconnect with the current one
+		client.username_pw_set(self.controller.token_manager.get_access_token())
+
+	def on_message(self, client, userdata, message) -> None:
+		self.stats.received += 1
+		try:
+			report = loads(message.payload)
+		except ValueError:
+			self.stats.failed += 1
+			return
+		self.handle_report(report)
+
+	def handle_report(self, report: dict) -> None:
+		"""
+		Decodes a report into its device type's getState ResponseData and passes it to the reading callback.
+
+		Args:
+			report (dict): The decoded JSON of a BUDP report.
+		"""
+		device_type, _, event = report.get("event", "").partition(".")
+		device = self.devices.get(report.get("deviceId"))
+		if event not in REPORT_EVENTS or device is None or device.type != device_type:
+			self.stats.ignored += 1
+			return
+
+		try:
+			response_type = get_response_type(device_type, get_state_method(device_type))
+			data = response_type(report_to_state_data(device_type, report))
+		except (KeyError, TypeError, ValueError, AttributeError):
+			# Reports may omit fields that getState always includes; polling covers those devices
+			self.stats.failed += 1
+			return
+
+		with self.lock:
+			self.last_seen[device.device_id] = time.monotonic()
+		self.stats.decoded += 1
+		self.on_reading(device, data)
+
+	def add_device(self, device: Device) -> None:
+		"""
+		Accepts reports from a device. A known device is replaced, keeping when it was last heard from.
+		"""
+		with self.lock:
+			self.devices[device.device_id] = device
+			self.last_seen.setdefault(device.device_id, time.monotonic())
+
+	def remove_device(self, device_id: str) -> None:
+		with self.lock:
+			self.devices.pop(device_id, None)
+			self.last_seen.pop(device_id, None)
+
+	def get_quiet_devices(self) -> list[Device]:
+		"""
+		Returns the devices that have not reported for quiet_after seconds.
+		"""
+		deadline = time.monotonic() - self.quiet_after
+		with self.lock:
+			return [self.devices[device_id] for device_id, seen in self.last_seen.items() if seen < deadline]
+
+	def poll_quiet_devices(self, poller: DevicePoller) -> list[PollResult]:
+		"""
+		Polls the devices that went quiet and passes their state to the reading callback.
+
+		Args:
+			poller (DevicePoller): The poller used for the fallback requests.
+
+		Returns:
+			list[PollResult]: The results of the polls.
+		"""
+		results = poller.poll(self.get_quiet_devices())
+		for result in results:
+			self.stats.polled += 1
+			if result.ok and result.data is not None:
+				with self.lock:
+					self.last_seen[result.device.device_id] = time.monotonic()
+				self.on_reading(result.device, result.data)
+		return results
@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Callable
+
+import requests
+
+DEFAULT_REFRESH_MARGIN = 300 # Refresh this many seconds before the token expires
+DEFAULT_RETRY_DELAY = 30 # Seconds to wait before retrying a failed background refresh, and at least between two of them
+
+@dataclass
+class AccessToken:
+	"""
+	An access token for the YoLink API.
+
+	Attributes:
+		access_token    (str): The access token.
+		refresh_token   (str): The refresh token, used to obtain the next access token.
+		expiration_time (int): Timestamp at which the access token expires.
+	"""
+	access_token: str
+	refresh_token: str
+	expiration_time: int
+
+	def expires_within(self, seconds: int, current_time: int) -> bool:
+		return current_time + seconds >= self.expiration_time
+
+def load_token_cache(path: str, user_id: str) -> AccessToken | None:
+	"""
+	Loads a cached token. Returns None if there is no cache, it is unreadable, or it belongs to another user.
+	"""
+	try:
+		with open(path, "r") as file:
+			cache = json.load(file)
+		if cache.pop("user_id") != user_id:
+			return None
+		return AccessToken(**cache)
+	except (OSError, ValueError, KeyError, TypeError):
+		return None
+
+def save_token_cache(path: str, user_id: str, token: AccessToken) -> None:
+	"""
+	Atomically writes a token to the cache file. The file is only readable by its owner.
+	"""
+	temporary_path = path + ".tmp"
+	descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+	with os.fdopen(descriptor, "w") as file:
+		json.dump({"user_id": user_id, **asdict(token)}, file)
+	os.replace(temporary_path, path)
+
+class TokenManager:
+	"""
+	Owns the access token lifecycle for one YoLink account.
+
+	Tokens are refreshed ahead of expiry by a background thread using the refresh_token grant, falling back
+	to client credentials when the refresh token is rejected. Concurrent refreshes are serialised so that
+	callers arriving while a refresh is in flight reuse its result instead of requesting their own.
+	The current token is persisted to a cache file, letting restarts skip the token request while it is valid.
+
+	Methods:
+		get_access_token: Returns a valid access token, refreshing it first if it is about to expire.
+		get_token: Returns a valid token, refreshing it first if it is about to expire.
+		establish: Loads the cached token, or requests a new one if there is no valid cache.
+		refresh: Requests a new token. Only one refresh runs at a time.
+		start: Starts the background refresh thread.
+		stop: Stops the background refresh thread.
+
+	Attributes:
+		token           (AccessToken | None): The current token.
+		refresh_margin  (int):                Seconds before expiry at which the token is refreshed.
+		refresh_count   (int):                Number of token requests made.
+	"""
+	def __init__(self,
+			request_tokens: Callable[[dict], AccessToken],
+			user_id       : str,
+			user_key      : str,
+			cache_path    : str | None = None,
+			refresh_margin: int = DEFAULT_REFRESH_MARGIN,
+			retry_delay   : int = DEFAULT_RETRY_DELAY
+		):
+		"""
+		Args:
+			request_tokens (Callable[[dict], AccessToken]): Sends a token request with the given form data.
+			user_id        (str):                           The user ID for the YoLink API.
+			user_key       (str):                           The user key for the YoLink API.
+			cache_path     (str, optional):                 Where to persist the token. Defaults to no cache.
+			refresh_margin (int, optional):                 Seconds before expiry at which the token is refreshed.
+			retry_delay    (int, optional):                 Seconds to wait before retrying a failed background refresh,
+				and at least between two background refreshes.
+		"""
+		self.request_tokens = request_tokens
+		self.user_id = user_id
+		self.user_key = user_key
+		self.cache_path = cache_path
+		self.refresh_margin = refresh_margin
+		self.retry_delay = retry_delay
+
+		self.token: AccessToken | None = None
+		self.refresh_count = 0
+		self.lock = threading.Lock()
+		self.stopped = threading.Event()
+		self.thread: threading.Thread | None = None
+
+	def get_access_token(self) -> str:
+		"""
+		Returns a valid access token, refreshing it first if it is missing or about to expire.
+		"""
+		return self.get_token().access_token
+
+	def get_token(self) -> AccessToken:
+		"""
+		Returns a valid token, refreshing it first if it is missing or about to expire. Callers that may find the
+		token rejected pass this object to refresh as the stale token, so that only one of them refreshes it.
+		"""
+		token = self.token
+		if token is None or token.expires_within(self.refresh_margin, self.get_timestamp()):
+			token = self.refresh(stale_token=token)
+		return token
+
+	def establish(self) -> None:
+		"""
+		Loads the cached token if it is still valid, otherwise requests a new one.
+		"""
+		if self.cache_path is not None:
+			cached_token = load_token_cache(self.cache_path, self.user_id)
+			if cached_token is not None and not cached_token.expires_within(self.refresh_margin, self.get_timestamp()):
+				self.token = cached_token
+				return
+		self.refresh(stale_token=self.token)
+
+	def refresh(self, stale_token: AccessToken | None = None, force: bool = False) -> AccessToken:
+		"""
+		Requests a new token and returns it. If another thread replaced the stale token while this one waited
+		for the lock, that token is returned instead of requesting another.
+
+		Args:
+			stale_token (AccessToken, optional): The token the caller considers out of date.
+			force       (bool, optional):        Refresh even if the current token is not close to expiring.
+
+		Returns:
+			AccessToken: The new token.
+		"""
+		with self.lock:
+			token = self.token
+			if token is not None and token is not stale_token:
+				return token
+			if token is not None and not force and not token.expires_within(self.refresh_margin, self.get_timestamp()):
+				return token
+
+			token = None
+			if self.token is not None:
+				try:
+					token = self.request_tokens({
+						"grant_type": "refresh_token",
+						"client_id": self.user_id,
+						"refresh_token": self.token.refresh_token
+					})
+				except (KeyError, ValueError, ConnectionError, requests.RequestException):
+					token = None
+				finally:
+					self.refresh_count += 1
+
+			# No token yet, or the refresh token was rejected
+			if token is None:
+				self.refresh_count += 1
+				token = self.request_tokens({
+					"grant_type": "client_credentials",
+					"client_id": self.user_id,
+					"client_secret": self.user_key
+				})
+
+			self.token = token
+			if self.cache_path is not None:
+				save_token_cache(self.cache_path, self.user_id, token)
+			return token
+
+	def start(self) -> None:
+		"""
+		Starts a daemon thread that refreshes the token shortly before it expires.
+		"""
+		if self.thread is not None:
+			return
+		self.stopped.clear()
+		self.thread = threading.Thread(target=self.refresh_loop, name="token-refresh", daemon=True)
+		self.thread.start()
+
+	def stop(self) -> None:
+		"""
+		Stops the background refresh thread.
+		"""
+		self.stopped.set()
+		if self.thread is not None:
+			self.thread.join()
+			self.thread = None
+
+	def refresh_loop(self) -> None:
+		while not self.stopped.is_set():
+			token = self.token
+			if token is None:
+				wait = 0
+			else:
+				# A token that lives no longer than the margin, or a skewed clock, would otherwise be refreshed
+				# over and over without waiting
+				wait = max(token.expiration_time - self.refresh_margin - self.get_timestamp(), self.retry_delay)
+			if self.stopped.wait(wait):
+				return
+			try:
+				self.refresh(stale_token=token, force=True)
+			except Exception:
+				# Requests will refresh on demand; try again later in the background
+				if self.stopped.wait(self.retry_delay):
+					return
+
+	def get_timestamp(self) -> int:
+		return int(datetime.now().timestamp())
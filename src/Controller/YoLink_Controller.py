@@ -1,7 +1,12 @@
 import requests
 import json
+import time
 from datetime import datetime
+from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
 
+from Controller.Rate_Limiter import RateLimiter, RequestDropped, RequestRejected, RATE_LIMIT_CODES, TRANSIENT_ERROR_CODES, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_CAP, get_backoff_delay
+from Controller.Token_Manager import AccessToken, TokenManager, DEFAULT_REFRESH_MARGIN
 from Interfaces.Device import Device
 from Interfaces.Responses.Response import MethodNames, Response, ResponseData, get_response_type
 from typing import Type, TypeVar, Generic
@@ -9,6 +14,77 @@ from typing import Type, TypeVar, Generic
 TOKEN_URL = 'https://api.yosmart.com/open/yolink/token'
 API_URL = 'https://api.yosmart.com/open/yolink/v2/api'
 NO_DEVICE = "No Device"
+CREDENTIALS_PATH = "./../credentials.json"
+
+# Connection pool defaults. Both endpoints live on the same host, so a single host pool is shared between them.
+DEFAULT_POOL_CONNECTIONS = 1
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_TIMEOUT = (5.0, 15.0) # (connect, read) in seconds
+
+TOKEN_CACHE_PATH = "./../.yolink_token_{}.json" # Formatted with the current user
+TOKEN_ERROR_CODES = {"000103", "010104"} # Token is invalid, token is expired
+DEFAULT_MAX_RETRIES = 3 # Retries for rate limit and transient errors
+
+@dataclass
+class ConnectionStats:
+	"""
+	Connection usage of a controller's HTTP session.
+
+	Attributes:
+		requests (int): Requests sent through the pool.
+		opened   (int): New TCP/TLS connections that had to be opened.
+		reused   (int): Requests that were sent over an already open keep-alive connection.
+	"""
+	requests: int
+	opened: int
+	reused: int
+
+def create_session(pool_connections: int, pool_maxsize: int, pool_block: bool) -> tuple[requests.Session, HTTPAdapter]:
+	"""
+	Creates a keep-alive session with a bounded connection pool, shared by its http and https adapters.
+
+	Args:
+		pool_connections (int):  Number of host pools to cache.
+		pool_maxsize     (int):  Maximum number of connections kept open per host.
+		pool_block       (bool): Whether to wait for a free connection instead of opening an extra, unpooled one.
+
+	Returns:
+		tuple[requests.Session, HTTPAdapter]: The configured session, and the adapter holding its connection pools.
+	"""
+	session = requests.Session()
+	adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
+	session.headers.update({"Connection": "keep-alive"})
+	return session, adapter
+
+def load_credentials(current_user: str, path: str = CREDENTIALS_PATH) -> tuple[str, str]:
+	"""
+	Loads the YoLink user ID and user key of a user from the credentials file.
+
+	Args:
+		current_user (str):           The user whose credentials are loaded.
+		path         (str, optional): The credentials file.
+
+	Returns:
+		tuple[str, str]: The user ID and user key.
+	"""
+	with open(path, "r") as file:
+		credentials = json.load(file)
+	return credentials[current_user + "_yolink_user_id"], credentials[current_user + "_yolink_user_key"]
+
+def create_request_body(method_name: MethodNames, timestamp: int, msgid: str | None, device: Device | None, params) -> str:
+	"""
+	Creates the JSON body of an API request. Follows the BDDP property list.
+	"""
+	return json.dumps({
+		"method": method_name.value,
+		"time": timestamp,
+		"msgid": msgid,
+		"targetDevice": device.device_id if device else None,
+		"token": device.token if device else None,
+		"params": params
+	})
 
 # TODO: make the constructor take the username as a parameter
 class YoLinkController:
@@ -16,10 +92,12 @@ class YoLinkController:
 	A controller for the YoLink API. Handles requests to the API and manages access tokens.
  
 	Methods:
-		establish_access_token: Establishes an access token for the YoLink API. If a token already exists, it will be refreshed if it is expired.
-		create_tokens: Creates access and refresh tokens from the YoLink API. Updates the controller's token variables.
+		establish_access_token: Establishes an access token for the YoLink API, from the token cache if it is still valid.
+		create_tokens: Creates access and refresh tokens from the YoLink API.
 		make_request: Makes a request to the YoLink API with the given parameters. Returns the data from the response.
 		get_timestamp: Returns the current timestamp
+		get_connection_stats: Returns how many connections were opened and reused by the session.
+		close: Closes the pooled session.
    
 	Attributes:
 		user_id (str): The user ID for the YoLink API.
@@ -27,60 +105,127 @@ class YoLinkController:
 		access_token (str): The access token for the YoLink API.
 		refresh_token (str): The refresh token for the YoLink API.
 		token_expiration_time (int): The time at which the access token will expire.
+		token_manager (TokenManager): Refreshes the token ahead of expiry and persists it to the token cache.
+		rate_limiter (RateLimiter): Limits requests per account and per device, and counts throttled, retried and dropped requests.
+		max_retries (int): Retries for rate limit and transient errors, with exponential backoff and jitter.
+		session (requests.Session): Pooled keep-alive session shared by the token and API endpoints.
+		adapter (HTTPAdapter): The session's adapter, holding its connection pools.
+		timeout (float | tuple): Per-request timeout passed to every request.
+		lazy (bool): Whether response data fields are only extracted when accessed.
+		token_url (str): The token endpoint.
+		api_url (str): The API endpoint.
 	"""
-	def __init__(self, current_user):
+	def __init__(self, current_user,
+			pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+			pool_maxsize    : int = DEFAULT_POOL_MAXSIZE,
+			pool_block      : bool = False,
+			timeout         : float | tuple[float, float] = DEFAULT_TIMEOUT,
+			token_cache_path: str | None = TOKEN_CACHE_PATH,
+			refresh_margin  : int = DEFAULT_REFRESH_MARGIN,
+			background_refresh: bool = True,
+			rate_limiter    : RateLimiter | None = None,
+			max_retries     : int = DEFAULT_MAX_RETRIES,
+			backoff_base    : float = DEFAULT_BACKOFF_BASE,
+			backoff_cap     : float = DEFAULT_BACKOFF_CAP,
+			lazy            : bool = False,
+			token_url       : str = TOKEN_URL,
+			api_url         : str = API_URL,
+			credentials_path: str = CREDENTIALS_PATH
+		):
 		"""
 		Initialize a YoLink API Controller. Also attempts to establish an access token.
+
+		Args:
+			current_user     (str):            The user whose credentials are used.
+			pool_connections (int, optional):  Number of host pools to cache.
+			pool_maxsize     (int, optional):  Maximum number of keep-alive connections per host.
+			pool_block       (bool, optional): Wait for a free connection when the pool is exhausted.
+			timeout          (float | tuple, optional): Per-request timeout, either total or (connect, read).
+			token_cache_path (str, optional):  Token cache file, formatted with the current user. None disables the cache.
+			refresh_margin   (int, optional):  Seconds before expiry at which the token is refreshed.
+			background_refresh (bool, optional): Refresh the token from a background thread instead of only on demand.
+			rate_limiter     (RateLimiter, optional): Client-side rate limiter. Defaults to one with conservative limits.
+			max_retries      (int, optional):  Retries for rate limit and transient errors.
+			backoff_base     (float, optional): Backoff ceiling of the first retry in seconds.
+			backoff_cap      (float, optional): Largest backoff ceiling in seconds.
+			lazy             (bool, optional): Only extract the fields of response data when they are accessed.
+				Pays off when few fields of large responses are read; errors for missing fields surface on access.
+			token_url        (str, optional):  The token endpoint, overridden to test against a local server.
+			api_url          (str, optional):  The API endpoint, overridden to test against a local server.
+			credentials_path (str, optional):  The credentials file the user's keys are loaded from.
 		"""
 		# Load credentials 
-		with open("./../credentials.json", "r") as file:
-			credentials = json.load(file)
-		self.user_id = credentials[current_user + "_yolink_user_id"]
-		self.user_key = credentials[current_user + "_yolink_user_key"]
+		self.user_id, self.user_key = load_credentials(current_user, credentials_path)
+		self.token_url = token_url
+		self.api_url = api_url
+		
+		# Create the pooled session used by every request
+		self.session, self.adapter = create_session(pool_connections, pool_maxsize, pool_block)
+		self.timeout = timeout
+		self.lazy = lazy
+		
+		# Initialize request limits
+		self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+		self.max_retries = max_retries
+		self.backoff_base = backoff_base
+		self.backoff_cap = backoff_cap
 		
 		# Initialize token information
-		self.access_token = None
-		self.refresh_token = None
-		self.token_expiration_time = None
+		self.token_manager = TokenManager(
+			request_tokens = self.create_tokens,
+			user_id        = self.user_id,
+			user_key       = self.user_key,
+			cache_path     = token_cache_path.format(current_user) if token_cache_path else None,
+			refresh_margin = refresh_margin
+		)
 		
 		# Attempt to establish access token
 		self.establish_access_token()
+		if background_refresh:
+			self.token_manager.start()
+
+	@property
+	def access_token(self) -> str | None:
+		token = self.token_manager.token
+		return token.access_token if token else None
+
+	@property
+	def refresh_token(self) -> str | None:
+		token = self.token_manager.token
+		return token.refresh_token if token else None
+
+	@property
+	def token_expiration_time(self) -> int | None:
+		token = self.token_manager.token
+		return token.expiration_time if token else None
 
 	def establish_access_token(self) -> None:
 		"""
-		Establishes an access token for the YoLink API. If a token already exists, it will be refreshed if it is expired.
+		Establishes an access token for the YoLink API. A valid cached token is reused, otherwise a new one is created.
 		"""
-		current_time = self.get_timestamp()
-		
-		# If token exists but is expired, refresh it
-		if self.token_expiration_time is not None and current_time > self.token_expiration_time:
-			self.create_tokens(data = {
-				"grant_type": "refresh_token",
-				"client_id": self.user_id,
-				"refresh_token": self.refresh_token
-			})
-			
-		# Otherwise create token normally
-		self.create_tokens(data = {
-			"grant_type": "client_credentials",
-			"client_id": self.user_id,
-			"client_secret": self.user_key
-		})
-
-	def create_tokens(self, data: dict) -> None:
+		self.token_manager.establish()
+
+	def create_tokens(self, data: dict) -> AccessToken:
 		"""
-		Creates access and refresh tokens from the YoLink API. Updates the controller's token variables.
+		Creates access and refresh tokens from the YoLink API.
 
 		Args:
 			data (dict): The data to be sent in the request to the YoLink API.
+
+		Raises:
+			KeyError: The API did not return a token, for example because the refresh token was rejected.
+
+		Returns:
+			AccessToken: The new token.
 		"""
 		# Make request
-		response = requests.post(TOKEN_URL, data=data).json()
+		response = self.session.post(self.token_url, data=data, timeout=self.timeout).json()
 		
-		# Update token variables
-		self.access_token = response["access_token"]
-		self.refresh_token = response["refresh_token"]
-		self.token_expiration_time = response["expires_in"] + self.get_timestamp()
+		return AccessToken(
+			access_token    = response["access_token"],
+			refresh_token   = response["refresh_token"],
+			expiration_time = response["expires_in"] + self.get_timestamp()
+		)
 	
 	# Follows BDDP property list at http://doc.yosmart.com/docs/protocol/datapacket/#BDDP
 	T = TypeVar('T', bound=ResponseData)
@@ -103,29 +248,89 @@ class YoLinkController:
 
 		Raises:
 			ConnectionError: There was an error connecting to the YoLink API. The error message will specify the error code.
+				Rate limit and transient errors are only raised once the retries are exhausted.
+			RequestDropped: The rate limiter dropped the request, as it would have waited longer than its max_wait.
+			RequestRejected: The API answered with an error code that is neither a rate limit nor transient.
 
 		Returns:
 			T: An object representing the data from the response.
 		"""
-		# Setup data
+		device_id = device.device_id if device else None
+		token_refreshed = False
+		attempt = 0
+		
+		while True:
+			if not self.rate_limiter.acquire(device_id):
+				raise RequestDropped(f'request dropped by the rate limiter after waiting {self.rate_limiter.max_wait:.0f}s for the quota')
+			# Stamped per attempt, as retries may be sent long after the first one
+			data = create_request_body(method_name, self.get_timestamp(), msgid, device, params)
+			
+			# Make and return data from request unless there is an error
+			token = self.token_manager.get_token()
+			try:
+				response = self.post_request(token.access_token, data, response_type)
+				error = f'code {response.code}'
+			except (requests.ConnectionError, requests.Timeout) as e:
+				response = None
+				error = str(e)
+			
+			if response is not None:
+				if response.code == "000000":
+					return response
+				
+				# The token was revoked or expired early; refresh it once and retry
+				if response.code in TOKEN_ERROR_CODES and not token_refreshed:
+					# Requests rejected with the same token share a single refresh
+					self.token_manager.refresh(stale_token=token, force=True)
+					token_refreshed = True
+					continue
+				
+				if response.code not in RATE_LIMIT_CODES and response.code not in TRANSIENT_ERROR_CODES:
+					raise RequestRejected(error)
+			
+			# Throttled or transient error; back off and retry
+			if attempt >= self.max_retries:
+				self.rate_limiter.record_drop()
+				raise ConnectionError(error)
+			self.rate_limiter.record_retry()
+			time.sleep(get_backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+			attempt += 1
+
+	def post_request(self, access_token: str, data: str, response_type: Type[T]) -> Response[T]:
 		headers = {
 			"Content-Type": "application/json",
-			"Authorization": f'Bearer {self.access_token}'
+			"Authorization": f'Bearer {access_token}'
 		}
-		data = json.dumps({
-			"method": method_name.value,
-			"time": self.get_timestamp(),
-			"msgid": msgid,
-			"targetDevice": device.device_id if device else None,
-			"token": device.token if device else None,
-			"params": params
-		})
-		
-		# Make and return data from request unless there is an error
-		response = Response(requests.post(API_URL, headers=headers, data=data).json(), response_type)
-		if response.code != "000000":
-			raise ConnectionError(f'code {response.code}')
-		return response
+		http_response = self.session.post(self.api_url, headers=headers, data=data, timeout=self.timeout)
+		return Response.from_bytes(http_response.content, response_type, self.lazy)
 
 	def get_timestamp(self) -> int:
 		return int(datetime.now().timestamp())
+
+	def get_connection_stats(self) -> ConnectionStats:
+		"""
+		Returns how many requests were sent through the session, and how many of them needed a new connection.
+		"""
+		requests_sent = 0
+		opened = 0
+		pools = self.adapter.poolmanager.pools
+		for key in pools.keys():
+			pool = pools.get(key)
+			if pool is None:
+				continue
+			requests_sent += pool.num_requests
+			opened += pool.num_connections
+		return ConnectionStats(requests=requests_sent, opened=opened, reused=max(requests_sent - opened, 0))
+
+	def close(self) -> None:
+		"""
+		Stops the background token refresh, then closes the pooled session and every connection it holds.
+		"""
+		self.token_manager.stop()
+		self.session.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.close()
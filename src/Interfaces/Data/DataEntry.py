@@ -1,11 +1,9 @@
 from pydantic.dataclasses import dataclass
-from typing import TypeVar, Generic
-from Interfaces.Data.Event import Event
 
-T = TypeVar('T')
-
-class DataEntry(dataclass, Generic[T]):
-    event_id: int
+@dataclass
+class DataEntry:
+    '''
+    A single named value of an event, such as a temperature.
+    '''
     name: str
-    value: T
-    event: Event
\ No newline at end of file
+    value: str | int | float | bool
@@ -1,7 +1,65 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
 from pydantic.dataclasses import dataclass
 from typing import List
 from Interfaces.Data.DataEntry import DataEntry
 
-class Event(dataclass):
+# Row fields describing the event itself rather than its data
+DEVICE_NAME_FIELD = "name"
+DEVICE_ID_FIELD = "deviceId"
+TIMESTAMP_FIELD = "reportAt"
+EVENT_FIELDS = {DEVICE_NAME_FIELD, DEVICE_ID_FIELD, TIMESTAMP_FIELD}
+
+def to_report_at(seconds: float) -> str:
+    '''
+    Convert epoch seconds to a reportAt timestamp, such as "2024-01-01T00:00:00.000Z". The events table stores reportAt
+    as text, which sorts in time order in this format.
+    '''
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None).isoformat(timespec="milliseconds") + "Z"
+
+@dataclass
+class Event:
+    '''
+    A reading of one device at one time.
+
+    Attributes:
+        device_id (str): The YoLink device ID.
+        device_name (str): The device's name.
+        device_type (str): The device's type, such as "THSensor".
+        timestamp (str): ISO 8601 time of the reading.
+        data_entries (List[DataEntry]): The values of the reading.
+    '''
+    device_id: str
+    device_name: str
+    device_type: str
+    timestamp: str
     data_entries: List[DataEntry]
-    timestamp: str
\ No newline at end of file
+
+    @classmethod
+    def from_row(cls, device_type: str, header: OrderedDict[str, str|int|float]) -> 'Event':
+        '''
+        Create an event from a row as passed to Database.save. Rows without an ID are identified by name,
+        and rows without a reportAt are timestamped now.
+        '''
+        timestamp = header.get(TIMESTAMP_FIELD) or to_report_at(time.time())
+        return cls(
+            device_id = str(header.get(DEVICE_ID_FIELD, header[DEVICE_NAME_FIELD])),
+            device_name = str(header[DEVICE_NAME_FIELD]),
+            device_type = device_type,
+            timestamp = str(timestamp),
+            data_entries = [DataEntry(name, value) for name, value in header.items() if name not in EVENT_FIELDS]
+        )
+
+    def to_row(self) -> OrderedDict[str, str|int|float]:
+        '''
+        Convert the event back to a row as passed to Database.save.
+        '''
+        row: OrderedDict[str, str|int|float] = OrderedDict({
+            DEVICE_NAME_FIELD: self.device_name,
+            DEVICE_ID_FIELD: self.device_id,
+            TIMESTAMP_FIELD: self.timestamp
+        })
+        for entry in self.data_entries:
+            row[entry.name] = entry.value
+        return row
@@ -0,0 +1,115 @@
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Any
+
+DEFAULT_CHUNK_SIZE = 10000 # Rows per chunk returned by Database.query
+
+@dataclass
+class QueryChunk:
+    '''
+    Readings returned by Database.query, by column. Every column has one value per row.
+
+    Attributes:
+        device_ids (list[str]): The YoLink device ID of every row.
+        times (array): reportAt of every row, in milliseconds since the epoch, as signed 64-bit integers.
+        columns (dict[str, array | list]): Values by field. Columns whose values are all numbers are arrays of doubles,
+            with NaN where a row has no value. Other columns are lists, with None where a row has no value.
+    '''
+    device_ids: list[str]
+    times: array
+    columns: dict[str, array | list]
+
+    def __len__(self) -> int:
+        return len(self.device_ids)
+
+    def to_numpy(self) -> dict[str, Any]:
+        '''
+        Returns the columns as NumPy arrays by field, along with "deviceId" and "reportAt" as datetime64[ms].
+        The times and numeric columns are viewed without copying them.
+        '''
+        import numpy as np
+        columns: dict[str, Any] = {
+            "deviceId": np.array(self.device_ids),
+            "reportAt": np.frombuffer(self.times, dtype=np.int64).view("datetime64[ms]"),
+        }
+        for name, values in self.columns.items():
+            columns[name] = np.frombuffer(values, dtype=np.float64) if isinstance(values, array) else np.array(values, dtype=object)
+        return columns
+
+class ChunkBuilder:
+    '''
+    Collects rows for a QueryChunk.
+
+    Methods:
+        add: Adds a row.
+        build: Returns the rows collected as a chunk.
+    '''
+
+    def __init__(self, fields: list[str] | None = None):
+        '''
+        Args:
+            fields (list[str], optional): Fields to keep, in column order. Defaults to every field seen, in the order first seen.
+        '''
+        self.fields = fields
+        self.reset()
+
+    def __len__(self) -> int:
+        return len(self.device_ids)
+
+    def reset(self) -> None:
+        self.device_ids: list[str] = []
+        self.times = array('q')
+        self.values: dict[str, list] = {name: [] for name in self.fields or []}
+
+    def add(self, device_id: str, at: int, values: dict[str, Any]) -> None:
+        '''
+        Add a row.
+
+        Args:
+            device_id (str): The YoLink device ID.
+            at (int): reportAt in milliseconds since the epoch.
+            values (dict[str, Any]): Values of the row by field. Missing fields have no value.
+        '''
+        row = len(self.device_ids)
+        self.device_ids.append(device_id)
+        self.times.append(at)
+        if self.fields is None:
+            for name in values:
+                if name not in self.values:
+                    self.values[name] = [None] * row
+        for name, column in self.values.items():
+            column.append(values.get(name))
+
+    def build(self) -> QueryChunk:
+        '''
+        Returns the rows collected as a chunk, and starts collecting the next one.
+        '''
+        chunk = QueryChunk(self.device_ids, self.times, {name: to_column(values) for name, values in self.values.items()})
+        self.reset()
+        return chunk
+
+def to_column(values: list) -> array | list:
+    '''
+    Returns the values as an array of doubles if they are all numbers or missing, otherwise as they are.
+    '''
+    if all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)) for value in values):
+        return array('d', [math.nan if value is None else value for value in values])
+    return values
+
+def parse_value(text: str) -> str | int | float | bool | None:
+    '''
+    Convert a value stored as text back to the type it was saved as.
+    '''
+    if text in ("", "None"):
+        return None
+    if text in ("True", "False"):
+        return text == "True"
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
@@ -1,19 +1,72 @@
 from abc import ABC, abstractmethod
 from collections import OrderedDict
+from typing import Iterator
+from Interfaces.Data.Event import Event
+from Interfaces.Data.QueryChunk import QueryChunk, DEFAULT_CHUNK_SIZE
+
+class WriteRejected(RuntimeError):
+    '''
+    Raised by Database.flush when the backend rejected readings, such as ones with values it cannot store,
+    so that writing them again would fail the same way.
+    '''
 
 class Database(ABC):
     
     @abstractmethod
-    def save(self, device_type: str, header: OrderedDict[str, str|int]) -> None:
+    def save(self, device_type: str, header: OrderedDict[str, str|int|float]) -> None:
         '''
         Save the header to a file of the given device type.
         
         Args:
             device_type (str): The type of device.
-            header (OrderedDict[str, str|int]): The header to save.
+            header (OrderedDict[str, str|int|float]): The header to save.
         '''
         pass
     
+    def save_events(self, batch: list[Event]) -> None:
+        '''
+        Save a batch of events. Backends that can write a batch at once override this.
+
+        Args:
+            batch (list[Event]): The events to save.
+        '''
+        for event in batch:
+            self.save(event.device_type, event.to_row())
+    
     @abstractmethod
-    def add_device(self, device_id, device_name, device_type, timestamp) -> None:
+    def add_device(self, device_id, device_name, device_type, timestamp) -> int | None:
+        '''
+        Register a device. Backends that key devices on a surrogate key return it, the others return None.
+        '''
+        pass
+    
+    def query(self, device_ids: list[str] | None, fields: list[str] | None, start: float, end: float,
+            chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[QueryChunk]:
+        '''
+        Read the readings reported within a time range, in chunks of columns. Every reading of a device comes
+        in time order; readings of different devices may interleave. Backends that can be read override this.
+
+        Args:
+            device_ids (list[str] | None): Devices to read. None reads every device.
+            fields (list[str] | None): Fields to read, in column order. None reads every field.
+            start (float): Start of the range in epoch seconds, included.
+            end (float): End of the range in epoch seconds, excluded.
+            chunk_size (int, optional): Most readings per chunk.
+
+        Returns:
+            Iterator[QueryChunk]: The readings, one chunk at a time.
+        '''
+        raise NotImplementedError(f"{type(self).__name__} cannot be queried")
+    
+    def flush(self) -> None:
+        '''
+        Write everything saved so far to durable storage, blocking until it is written.
+        Raises an exception if some of it could not be written, WriteRejected if the backend rejected it.
+        '''
+        pass
+    
+    def close(self) -> None:
+        '''
+        Write any buffered data and release the backend's resources.
+        '''
         pass
@@ -17,3 +17,21 @@ class Device():
         self.name        = data["name"]
         self.type        = data["type"]
 
+    def to_data(self) -> dict:
+        """
+        Returns the device in the layout of the device list it was decoded from.
+        """
+        return {
+            "deviceId"  : self.device_id,
+            "deviceUDID": self.device_udid,
+            "token"     : self.token,
+            "name"      : self.name,
+            "type"      : self.type
+        }
+
+
+def get_devices(data: list[dict]) -> list[Device]:
+    """
+    Decode the devices of a getDeviceList response.
+    """
+    return [Device(device) for device in data]
@@ -0,0 +1,27 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError: # Optional, responses are decoded with the standard library without it
+    orjson = None # type: ignore[assignment]
+
+JSON_DECODER = "orjson" if orjson is not None else "json"
+
+def loads(content: bytes | str) -> Any:
+    """
+    Decode a JSON document, straight from the raw bytes of a response or message.
+    Uses orjson when it is installed, which parses the bytes without decoding them to a str first.
+
+    Args:
+        content (bytes | str): The JSON document.
+
+    Returns:
+        Any: The decoded document.
+
+    Raises:
+        ValueError: The document is not valid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
@@ -1,5 +1,6 @@
 from typing import List
-from Interfaces.Device import Device
+from Interfaces.Device import Device, get_devices
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class HomeGetDeviceListData(ResponseData):
@@ -10,8 +11,23 @@ class HomeGetDeviceListData(ResponseData):
         devices (List[DeviceInfo]): List of devices connected to the hub.
     """
 
-    def __init__(self, data: dict):
-        self.devices = [Device(device) for device in data["devices"]]
-        
+    devices: list[Device]
+
+    FIELDS = {
+        "devices": Field(list, "devices", decode=get_devices),
+    }
+    __slots__ = tuple(FIELDS)
+
     def print_data(self):
-        return 
+        return
+
+class HomeGetGeneralInfoData(ResponseData):
+    """
+    Represents the response of the Home.getGeneralInfo method in the YoLink API.
+
+    Attributes:
+        id (str): ID of the home. Used in the topics of the MQTT report subscription.
+    """
+
+    def __init__(self, data: dict):
+        self.id: str = data["id"]
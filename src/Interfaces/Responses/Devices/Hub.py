@@ -1,5 +1,6 @@
 from typing import List
-from Interfaces.Device import Device
+from Interfaces.Device import Device, get_devices
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 
@@ -11,8 +12,12 @@ class HubGetDeviceListData(ResponseData):
         devices (List[DeviceInfo]): List of devices connected to the hub.
     """
 
-    def __init__(self, data: dict):
-        self.devices: List[Device] = [Device(device) for device in data["devices"]] 
+    devices: list[Device]
+
+    FIELDS = {
+        "devices": Field(list, "devices", decode=get_devices),
+    }
+    __slots__ = tuple(FIELDS)
         
 class HubGetStateData(ResponseData):
     """
@@ -31,14 +36,27 @@ class HubGetStateData(ResponseData):
         eth_mask               (str)  : Current Subnet Mask of Ethernet.
     """
 
-    def __init__(self, data: dict):
-        self.version: str = data["version"]
-        self.wifi_enable: bool = data["wifi"]["enable"]
-        self.wifi_ssid: str = data["wifi"]["ssid"]
-        self.wifi_ip: str = data["wifi"]["ip"]
-        self.wifi_gateway: str = data["wifi"]["gateway"]
-        self.wifi_mask: str = data["wifi"]["mask"]
-        self.eth_enable: bool = data["eth"]["enable"]
-        self.eth_ip: str = data["eth"]["ip"]
-        self.eth_gateway: str = data["eth"]["gateway"]
-        self.eth_mask: str = data["eth"]["mask"]
+    version: str
+    wifi_enable: bool
+    wifi_ssid: str
+    wifi_ip: str
+    wifi_gateway: str
+    wifi_mask: str
+    eth_enable: bool
+    eth_ip: str
+    eth_gateway: str
+    eth_mask: str
+
+    FIELDS = {
+        "version": Field(str, "version"),
+        "wifi_enable": Field(bool, "wifi", "enable"),
+        "wifi_ssid": Field(str, "wifi", "ssid"),
+        "wifi_ip": Field(str, "wifi", "ip"),
+        "wifi_gateway": Field(str, "wifi", "gateway"),
+        "wifi_mask": Field(str, "wifi", "mask"),
+        "eth_enable": Field(bool, "eth", "enable"),
+        "eth_ip": Field(str, "eth", "ip"),
+        "eth_gateway": Field(str, "eth", "gateway"),
+        "eth_mask": Field(str, "eth", "mask"),
+    }
+    __slots__ = tuple(FIELDS)
@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class InfraredRemoterGetStateData(ResponseData):
@@ -11,8 +12,15 @@ class InfraredRemoterGetStateData(ResponseData):
         tz         (int)        : Timezone of this device.
     """
 
-    def __init__(self, data: dict):
-        self.battery: int = data["battery"]
-        self.keys: list[bool] = data["keys"]
-        self.version: str = data["version"]
-        self.tz: int = data["tz"]
\ No newline at end of file
+    battery: int
+    keys: list
+    version: str
+    tz: int
+
+    FIELDS = {
+        "battery": Field(int, "battery"),
+        "keys": Field(list, "keys"),
+        "version": Field(str, "version"),
+        "tz": Field(int, "tz"),
+    }
+    __slots__ = tuple(FIELDS)
\ No newline at end of file
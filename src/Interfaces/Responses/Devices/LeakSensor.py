@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class LeakSensorGetStateData(ResponseData):
@@ -14,11 +15,21 @@ class LeakSensorGetStateData(ResponseData):
         deviceId             (str)   : ID of device.
     """
 
-    def __init__(self, data: dict):
-        self.online: bool = data["state"]["online"]
-        self.state: str = data["state"]["state"]
-        self.battery: str = data["state"]["battery"]
-        self.interval: int | None = data["state"].get("interval")
-        self.version: str = data["state"]["version"]
-        self.reportAt: str = data["reportAt"]
-        self.deviceId: str = data["deviceId"] 
\ No newline at end of file
+    online: bool
+    state: str
+    battery: str
+    interval: int | None
+    version: str
+    reportAt: str
+    deviceId: str
+
+    FIELDS = {
+        "online": Field(bool, "state", "online"),
+        "state": Field(str, "state", "state"),
+        "battery": Field(str, "state", "battery"),
+        "interval": Field(int, "state", "interval", optional=True),
+        "version": Field(str, "state", "version"),
+        "reportAt": Field(str, "reportAt"),
+        "deviceId": Field(str, "deviceId"),
+    }
+    __slots__ = tuple(FIELDS)
\ No newline at end of file
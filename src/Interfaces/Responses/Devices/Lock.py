@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class LockGetStateData(ResponseData):
@@ -11,8 +12,15 @@ class LockGetStateData(ResponseData):
         tz                   (int)  : Timezone of device. -12 ~ 12.
     """
 
-    def __init__(self, data: dict):
-        self.state: str = data["state"]["state"]
-        self.battery: int = data["state"]["battery"]
-        self.version: str = data["version"]
-        self.tz: int = data["tz"]    
\ No newline at end of file
+    state: str
+    battery: int
+    version: str
+    tz: int
+
+    FIELDS = {
+        "state": Field(str, "state", "state"),
+        "battery": Field(int, "state", "battery"),
+        "version": Field(str, "version"),
+        "tz": Field(int, "tz"),
+    }
+    __slots__ = tuple(FIELDS)
\ No newline at end of file
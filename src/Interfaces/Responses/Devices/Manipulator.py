@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class ManipulatorGetStateData(ResponseData):
@@ -13,10 +14,19 @@ class ManipulatorGetStateData(ResponseData):
         tz                   (int)  : Timezone of device. -12 ~ 12.
     """
 
-    def __init__(self, data: dict):
-        self.state: str = data["state"]
-        self.delay_on: int | None = data["delay"].get("on")
-        self.delay_off: int | None = data["delay"].get("off")
-        self.openRemind: int | None = data.get("openRemind")
-        self.version: str = data["version"]
-        self.tz: int = data["tz"]  
\ No newline at end of file
+    state: str
+    delay_on: int | None
+    delay_off: int | None
+    openRemind: int | None
+    version: str
+    tz: int
+
+    FIELDS = {
+        "state": Field(str, "state"),
+        "delay_on": Field(int, "delay", "on", optional=True),
+        "delay_off": Field(int, "delay", "off", optional=True),
+        "openRemind": Field(int, "openRemind", optional=True),
+        "version": Field(str, "version"),
+        "tz": Field(int, "tz"),
+    }
+    __slots__ = tuple(FIELDS)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class MotionSensorGetStateData(ResponseData):
@@ -16,13 +17,25 @@ class MotionSensorGetStateData(ResponseData):
         deviceId             (str)   : ID of device.
     """
 
-    def __init__(self, data: dict):
-        self.online: bool = data["state"]["online"]
-        self.state: str = data["state"]["state"]
-        self.battery: str = data["state"]["battery"]
-        self.alertInterval: int | None = data["state"].get("alertInterval")
-        self.ledAlarm: bool | None = data["state"].get("ledAlarm")
-        self.nomotionDelay: int | None = data["state"].get("nomotionDelay")
-        self.version: str = data["state"]["version"]
-        self.reportAt: str = data["reportAt"]
-        self.deviceId: str = data["deviceId"]   
\ No newline at end of file
+    online: bool
+    state: str
+    battery: str
+    alertInterval: int | None
+    ledAlarm: bool | None
+    nomotionDelay: int | None
+    version: str
+    reportAt: str
+    deviceId: str
+
+    FIELDS = {
+        "online": Field(bool, "state", "online"),
+        "state": Field(str, "state", "state"),
+        "battery": Field(str, "state", "battery"),
+        "alertInterval": Field(int, "state", "alertInterval", optional=True),
+        "ledAlarm": Field(bool, "state", "ledAlarm", optional=True),
+        "nomotionDelay": Field(int, "state", "nomotionDelay", optional=True),
+        "version": Field(str, "state", "version"),
+        "reportAt": Field(str, "reportAt"),
+        "deviceId": Field(str, "deviceId"),
+    }
+    __slots__ = tuple(FIELDS)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class MultiOutletGetStateData(ResponseData):
@@ -12,9 +13,17 @@ class MultiOutletGetStateData(ResponseData):
         tz                   (int)       : Timezone of device. -12 ~ 12.
     """
 
-    def __init__(self, data: dict):
-        self.state: list[str] = data["state"]
-        self.delays_on: int = data["delays"][0]["on"]
-        self.delays_off: int = data["delays"][0]["off"]
-        self.version: str = data["version"]
-        self.tz: int = data["tz"] 
\ No newline at end of file
+    state: list
+    delays_on: int
+    delays_off: int
+    version: str
+    tz: int
+
+    FIELDS = {
+        "state": Field(list, "state"),
+        "delays_on": Field(int, "delays", 0, "on"),
+        "delays_off": Field(int, "delays", 0, "off"),
+        "version": Field(str, "version"),
+        "tz": Field(int, "tz"),
+    }
+    __slots__ = tuple(FIELDS)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class OutletGetStateData(ResponseData):
@@ -13,10 +14,19 @@ class OutletGetStateData(ResponseData):
         tz                   (int)  : Timezone of device. -12 ~ 12.
     """
 
-    def __init__(self, data: dict):
-        self.state: str = data["state"]
-        self.delay_on: int = data["delay"]["on"]
-        self.delay_off: int = data["delay"]["off"]
-        self.power: int | None = data.get("power")
-        self.version: str = data["version"]
-        self.tz: int = data["tz"]
\ No newline at end of file
+    state: str
+    delay_on: int
+    delay_off: int
+    power: int | None
+    version: str
+    tz: int
+
+    FIELDS = {
+        "state": Field(str, "state"),
+        "delay_on": Field(int, "delay", "on"),
+        "delay_off": Field(int, "delay", "off"),
+        "power": Field(int, "power", optional=True),
+        "version": Field(str, "version"),
+        "tz": Field(int, "tz"),
+    }
+    __slots__ = tuple(FIELDS)
\ No newline at end of file
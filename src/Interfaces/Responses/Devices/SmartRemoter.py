@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class SmartRemoterGetStateData(ResponseData):
@@ -14,11 +15,21 @@ class SmartRemoterGetStateData(ResponseData):
         deviceId             (str)            : ID of device.
     """
 
-    def __init__(self, data: dict):
-        self.event: dict | None = data["state"].get("event")
-        self.event_keyMask: int | None = data["state"]["event"]["keyMask"] if self.event else None
-        self.event_type: str | None = data["state"]["event"]["type"] if self.event else None
-        self.battery: int = data["state"]["battery"]
-        self.version: str = data["state"]["version"]
-        self.reportAt: str = data["reportAt"]
-        self.deviceId: str = data["deviceId"] 
\ No newline at end of file
+    event: dict | None
+    event_keyMask: int | None
+    event_type: str | None
+    battery: int
+    version: str
+    reportAt: str
+    deviceId: str
+
+    FIELDS = {
+        "event": Field(dict, "state", "event", optional=True),
+        "event_keyMask": Field(int, "state", "event", "keyMask", optional=True),
+        "event_type": Field(str, "state", "event", "type", optional=True),
+        "battery": Field(int, "state", "battery"),
+        "version": Field(str, "state", "version"),
+        "reportAt": Field(str, "reportAt"),
+        "deviceId": Field(str, "deviceId"),
+    }
+    __slots__ = tuple(FIELDS)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class SpeakerHubGetStateData(ResponseData):
@@ -17,14 +18,27 @@ class SpeakerHubGetStateData(ResponseData):
         options_mute           (bool) : Is mute mode enabled. True means device will not make any sound, even if you receive a message.
     """
 
-    def __init__(self, data: dict):
-        self.version: str = data["version"]
-        self.wifi_enable: bool = data["wifi"]["enable"]
-        self.wifi_ssid: str = data["wifi"]["ssid"]
-        self.wifi_ip: str = data["wifi"]["ip"]
-        self.wifi_gateway: str = data["wifi"]["gateway"]
-        self.wifi_mask: str = data["wifi"]["mask"]
-        self.eth_enable: bool = data["eth"]["enable"]
-        self.options_volume: int = data["options"]["volume"]
-        self.options_enableBeep: bool = data["options"]["enableBeep"]
-        self.options_mute: bool = data["options"]["mute"] 
\ No newline at end of file
+    version: str
+    wifi_enable: bool
+    wifi_ssid: str
+    wifi_ip: str
+    wifi_gateway: str
+    wifi_mask: str
+    eth_enable: bool
+    options_volume: int
+    options_enableBeep: bool
+    options_mute: bool
+
+    FIELDS = {
+        "version": Field(str, "version"),
+        "wifi_enable": Field(bool, "wifi", "enable"),
+        "wifi_ssid": Field(str, "wifi", "ssid"),
+        "wifi_ip": Field(str, "wifi", "ip"),
+        "wifi_gateway": Field(str, "wifi", "gateway"),
+        "wifi_mask": Field(str, "wifi", "mask"),
+        "eth_enable": Field(bool, "eth", "enable"),
+        "options_volume": Field(int, "options", "volume"),
+        "options_enableBeep": Field(bool, "options", "enableBeep"),
+        "options_mute": Field(bool, "options", "mute"),
+    }
+    __slots__ = tuple(FIELDS)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class THSensorGetStateData(ResponseData):
@@ -12,7 +13,7 @@ class THSensorGetStateData(ResponseData):
         temperature          (float): Current temperature.
         humidity             (float): Current humidity.
         tempLimit            (dict) : Normal temperature range, alert when temperature is out of it.
-        humidityLimit        (float): Normal humidity range, alert when humidity is out of it.
+        humidityLimit        (dict) : Normal humidity range, alert when humidity is out of it.
         tempCorrection       (float): Calibration of temperature.
         humidityCorrection   (float): Calibration of humidity.
         version              (str)  : Firmware version of the device.
@@ -21,17 +22,33 @@ class THSensorGetStateData(ResponseData):
         interval is omitted due to it being optional in the documentation.
     """
 
-    def __init__(self, data: dict):
-        self.online: bool = data["online"]
-        self.state: str = data["state"]["state"]
-        self.battery: str = data["state"]["battery"]
-        self.interval: int | None = data["state"].get("interval")
-        self.temperature: float = data["state"]["temperature"]
-        self.humidity: float = data["state"]["humidity"]
-        self.tempLimit: dict = data["state"]["tempLimit"]
-        self.humidityLimit: float = data["state"]["humidityLimit"]
-        self.tempCorrection: float = data["state"]["tempCorrection"]
-        self.humidityCorrection: float = data["state"]["humidityCorrection"]
-        self.version: str = data["state"]["version"]
-        self.reportAt: str = data["reportAt"]
-        self.deviceId: str = data["deviceId"]
+    online: bool
+    state: str
+    battery: str
+    interval: int | None
+    temperature: float
+    humidity: float
+    tempLimit: dict
+    humidityLimit: dict
+    tempCorrection: float
+    humidityCorrection: float
+    version: str
+    reportAt: str
+    deviceId: str
+
+    FIELDS = {
+        "online": Field(bool, "online"),
+        "state": Field(str, "state", "state"),
+        "battery": Field(str, "state", "battery"),
+        "interval": Field(int, "state", "interval", optional=True),
+        "temperature": Field(float, "state", "temperature"),
+        "humidity": Field(float, "state", "humidity"),
+        "tempLimit": Field(dict, "state", "tempLimit"),
+        "humidityLimit": Field(dict, "state", "humidityLimit"),
+        "tempCorrection": Field(float, "state", "tempCorrection"),
+        "humidityCorrection": Field(float, "state", "humidityCorrection"),
+        "version": Field(str, "state", "version"),
+        "reportAt": Field(str, "reportAt"),
+        "deviceId": Field(str, "deviceId"),
+    }
+    __slots__ = tuple(FIELDS)
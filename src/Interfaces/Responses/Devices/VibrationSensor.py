@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class VibrationSensorGetStateData(ResponseData):
@@ -15,12 +16,23 @@ class VibrationSensorGetStateData(ResponseData):
         deviceId             (str)   : ID of device.
     """
 
-    def __init__(self, data: dict):
-        self.online: bool = data["state"]["online"]
-        self.state: str = data["state"]["state"]
-        self.battery: str = data["state"]["battery"]
-        self.alertInterval: int | None = data["state"].get("alertInterval")
-        self.noVibrationDelay: int | None = data["state"].get("noVibrationDelay")
-        self.version: str = data["state"]["version"]
-        self.reportAt: str = data["reportAt"]
-        self.deviceId: str = data["deviceId"]     
\ No newline at end of file
+    online: bool
+    state: str
+    battery: str
+    alertInterval: int | None
+    noVibrationDelay: int | None
+    version: str
+    reportAt: str
+    deviceId: str
+
+    FIELDS = {
+        "online": Field(bool, "state", "online"),
+        "state": Field(str, "state", "state"),
+        "battery": Field(str, "state", "battery"),
+        "alertInterval": Field(int, "state", "alertInterval", optional=True),
+        "noVibrationDelay": Field(int, "state", "noVibrationDelay", optional=True),
+        "version": Field(str, "state", "version"),
+        "reportAt": Field(str, "reportAt"),
+        "deviceId": Field(str, "deviceId"),
+    }
+    __slots__ = tuple(FIELDS)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from Interfaces.Responses.Fields import Field
 from Interfaces.Responses.Response import ResponseData
 
 class WaterMeterControllerGetStateData(ResponseData):
@@ -39,36 +40,71 @@ class WaterMeterControllerGetStateData(ResponseData):
         tz                          (int)  : Timezone of device. -12 ~ 12.
     """
 
-    def __init__(self, data: dict):
-        self.valve: str = data["state"]["valve"]
-        self.meter: int = data["state"]["meter"]
-        self.waterFlowing: bool = data["state"]["waterFlowing"]
-        self.openReminder: bool = data["alarm"]["openReminder"]
-        self.leak: bool = data["alarm"]["leak"]
-        self.amountOverrun: bool = data["alarm"]["amountOverrun"]
-        self.durationOverrun: bool = data["alarm"]["durationOverrun"]
-        self.valveError: bool = data["alarm"]["valveError"]
-        self.reminder: bool = data["alarm"]["reminder"]
-        self.freezeError: bool = data["alarm"]["freezeError"]
-        self.battery: int = data["battery"]
-        self.powerSupply: str = data["powerSupply"]
-        self.valveDelay_on: int | None = data["valveDelay"].get("on")
-        self.valveDelay_off: int | None = data["valveDelay"].get("off")
-        self.openReminder_duration: int = data["attributes"]["openReminder"]
-        self.meterUnit: int = data["attributes"]["meterUnit"]
-        self.alertInterval: int = data["attributes"]["alertInterval"]
-        self.meterStepFactor: int = data["attributes"]["meterStepFactor"]
-        self.leakLimit: float = data["attributes"]["leakLimit"]
-        self.autoCloseValve: bool = data["attributes"]["autoCloseValve"]
-        self.overrunAmountACV: bool = data["attributes"]["overrunAmountACV"]
-        self.overrunDurationACV: bool = data["attributes"]["overrunDurationACV"]
-        self.leakPlan: str = data["attributes"]["leakPlan"]
-        self.overrunAmount: float = data["attributes"]["overrunAmount"]
-        self.overrunDuration: int = data["attributes"]["overrunDuration"]
-        self.freezeTemp: float = data["attributes"]["freezeTemp"]
-        self.recentUsage_amount: int = data["recentUsage"]["amount"]
-        self.recentUsage_duration: int = data["recentUsage"]["duration"]
-        self.dailyUsage: int = data["dailyUsage"]
-        self.temperature: float = data["temperature"]
-        self.version: str = data["version"]
-        self.tz: int = data["tz"]
+    valve: str
+    meter: int
+    waterFlowing: bool
+    openReminder: bool
+    leak: bool
+    amountOverrun: bool
+    durationOverrun: bool
+    valveError: bool
+    reminder: bool
+    freezeError: bool
+    battery: int
+    powerSupply: str
+    valveDelay_on: int | None
+    valveDelay_off: int | None
+    openReminder_duration: int
+    meterUnit: int
+    alertInterval: int
+    meterStepFactor: int
+    leakLimit: float
+    autoCloseValve: bool
+    overrunAmountACV: bool
+    overrunDurationACV: bool
+    leakPlan: str
+    overrunAmount: float
+    overrunDuration: int
+    freezeTemp: float
+    recentUsage_amount: int
+    recentUsage_duration: int
+    dailyUsage: int
+    temperature: float
+    version: str
+    tz: int
+
+    FIELDS = {
+        "valve": Field(str, "state", "valve"),
+        "meter": Field(int, "state", "meter"),
+        "waterFlowing": Field(bool, "state", "waterFlowing"),
+        "openReminder": Field(bool, "alarm", "openReminder"),
+        "leak": Field(bool, "alarm", "leak"),
+        "amountOverrun": Field(bool, "alarm", "amountOverrun"),
+        "durationOverrun": Field(bool, "alarm", "durationOverrun"),
+        "valveError": Field(bool, "alarm", "valveError"),
+        "reminder": Field(bool, "alarm", "reminder"),
+        "freezeError": Field(bool, "alarm", "freezeError"),
+        "battery": Field(int, "battery"),
+        "powerSupply": Field(str, "powerSupply"),
+        "valveDelay_on": Field(int, "valveDelay", "on", optional=True),
+        "valveDelay_off": Field(int, "valveDelay", "off", optional=True),
+        "openReminder_duration": Field(int, "attributes", "openReminder"),
+        "meterUnit": Field(int, "attributes", "meterUnit"),
+        "alertInterval": Field(int, "attributes", "alertInterval"),
+        "meterStepFactor": Field(int, "attributes", "meterStepFactor"),
+        "leakLimit": Field(float, "attributes", "leakLimit"),
+        "autoCloseValve": Field(bool, "attributes", "autoCloseValve"),
+        "overrunAmountACV": Field(bool, "attributes", "overrunAmountACV"),
+        "overrunDurationACV": Field(bool, "attributes", "overrunDurationACV"),
+        "leakPlan": Field(str, "attributes", "leakPlan"),
+        "overrunAmount": Field(float, "attributes", "overrunAmount"),
+        "overrunDuration": Field(int, "attributes", "overrunDuration"),
+        "freezeTemp": Field(float, "attributes", "freezeTemp"),
+        "recentUsage_amount": Field(int, "recentUsage", "amount"),
+        "recentUsage_duration": Field(int, "recentUsage", "duration"),
+        "dailyUsage": Field(int, "dailyUsage"),
+        "temperature": Field(float, "temperature"),
+        "version": Field(str, "version"),
+        "tz": Field(int, "tz"),
+    }
+    __slots__ = tuple(FIELDS)
@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING: # Response imports this module to compile its data classes
+    from Interfaces.Responses.Response import ResponseData
+
+@dataclass(frozen=True, init=False)
+class Field:
+    """
+    Where an attribute of a ResponseData subclass is found in the response data.
+
+    Attributes:
+        value_type (type):                   Type of the value.
+        path       (tuple[str | int, ...]): Keys and list indices from the root of the data to the value.
+        optional   (bool):                   Whether a missing key anywhere on the path gives None instead of a KeyError.
+        decode     (Callable | None):        Converts the raw value, such as a list of dicts into Devices.
+    """
+    value_type: type
+    path: tuple[str | int, ...]
+    optional: bool
+    decode: Callable[[Any], Any] | None
+
+    def __init__(self, value_type: type, *path: str | int, optional: bool = False, decode: Callable[[Any], Any] | None = None):
+        if not path:
+            raise ValueError("a field needs a path")
+        if optional and any(isinstance(key, int) for key in path):
+            raise ValueError("optional fields cannot index lists")
+        object.__setattr__(self, "value_type", value_type)
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "optional", optional)
+        object.__setattr__(self, "decode", decode)
+
+def get_value_source(name: str, field: Field, parent: str) -> str:
+    """
+    Generate the expression of a field's value, given the expression of the container holding it.
+    """
+    key = field.path[-1]
+    value = f"{parent}.get({key!r})" if field.optional else f"{parent}[{key!r}]"
+    if field.decode is not None:
+        value = f"_decode_{name}({value})"
+    return value
+
+def get_decoders(fields: dict[str, Field]) -> dict[str, Callable[[Any], Any]]:
+    """
+    Returns the globals the generated source calls the decoders of the fields by.
+    """
+    return {f"_decode_{name}": field.decode for name, field in fields.items() if field.decode is not None}
+
+def get_init_source(fields: dict[str, Field]) -> str:
+    """
+    Generate the source of an __init__ that sets every field from the data.
+    Every container on the fields' paths is looked up once, into a local. A container only reached by optional
+    fields falls back to an empty dict when it is missing.
+    """
+    required: set[tuple[str | int, ...]] = set()
+    prefixes: dict[tuple[str | int, ...], None] = {} # In order of first use
+    for field in fields.values():
+        for depth in range(1, len(field.path)):
+            prefixes.setdefault(field.path[:depth])
+            if not field.optional:
+                required.add(field.path[:depth])
+
+    lines = ["def __init__(self, data):"]
+    containers: dict[tuple[str | int, ...], str] = {(): "data"}
+    for prefix in sorted(prefixes, key=len):
+        container = f"_{len(containers)}"
+        lookup = f"{containers[prefix[:-1]]}[{prefix[-1]!r}]"
+        if prefix not in required:
+            lookup = f"({containers[prefix[:-1]]}.get({prefix[-1]!r}) or {{}})"
+        lines.append(f"    {container} = {lookup}")
+        containers[prefix] = container
+
+    for name, field in fields.items():
+        lines.append(f"    self.{name} = {get_value_source(name, field, containers[field.path[:-1]])}")
+    return "\n".join(lines)
+
+def get_extractors_source(fields: dict[str, Field]) -> str:
+    """
+    Generate the source of one function per field, named after it, that extracts its value from the data.
+    """
+    functions = []
+    for name, field in fields.items():
+        parent = "data"
+        for key in field.path[:-1]:
+            parent = f"({parent}.get({key!r}) or {{}})" if field.optional else f"{parent}[{key!r}]"
+        functions.append(f"def {name}(data):\n    return {get_value_source(name, field, parent)}")
+    return "\n".join(functions)
+
+def compile_init(fields: dict[str, Field]) -> Callable[[Any, dict], None]:
+    """
+    Compile the fields of a response into an __init__ that extracts them from the data.
+    """
+    namespace: dict[str, Any] = {}
+    exec(get_init_source(fields), get_decoders(fields), namespace)
+    return namespace["__init__"]
+
+def compile_extractors(fields: dict[str, Field]) -> dict[str, Callable[[dict], Any]]:
+    """
+    Compile a function per field that extracts its value from the data.
+    """
+    namespace: dict[str, Any] = {}
+    exec(get_extractors_source(fields), get_decoders(fields), namespace)
+    return {name: namespace[name] for name in fields}
+
+def compile_get_values(fields: dict[str, Field]) -> Callable[[Any], dict[str, Any]]:
+    """
+    Compile a method returning the values of the fields by name.
+    """
+    names = tuple(fields)
+    get_all = attrgetter(*names)
+    if len(names) == 1:
+        return lambda self: {names[0]: get_all(self)}
+    return lambda self: dict(zip(names, get_all(self)))
+
+def compile_lazy_type(cls: "type[ResponseData]") -> "type[ResponseData]":
+    """
+    Compile a subclass of a response data class whose fields are only extracted from the data when accessed.
+    An unset slot falls through to __getattr__, which extracts the field into the slot, so later reads cost nothing.
+    Instances keep a reference to the data, and a missing required field raises its KeyError on access.
+    """
+    extractors = compile_extractors(cls.FIELDS)
+
+    def __init__(self, data: dict) -> None:
+        self._data = data
+
+    def __getattr__(self, name: str) -> Any:
+        extract = extractors.get(name)
+        if extract is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        value = extract(self._data)
+        setattr(self, name, value)
+        return value
+
+    namespace: dict[str, Any] = {
+        "__slots__": ("_data",),
+        "__init__": __init__,
+        "__getattr__": __getattr__,
+        "__doc__": f"{cls.__name__}, extracting each field on first access.",
+    }
+    return type(f"Lazy{cls.__name__}", (cls,), namespace)
@@ -1,15 +1,19 @@
 from enum import Enum
-from typing import Any, Tuple, Type, TypeVar, Generic
-from pydantic.dataclasses import dataclass
+from importlib import import_module
+from typing import Any, ClassVar, Tuple, Type, TypeVar, Generic, cast
+from Interfaces.Responses.Decoder import loads
+from Interfaces.Responses.Fields import Field, compile_init, compile_get_values, compile_lazy_type
 
 T = TypeVar('T', bound='ResponseData')
 
 class Response(Generic[T]):
     """
     Class to represent common data between Responses. Specifics lie within the data.
+    With lazy, the data's fields are only extracted when accessed, if its type declares FIELDS.
     """
+    __slots__ = ("time", "method", "msgid", "code", "desc", "data")
 
-    def __init__(self, response_json: dict, response_type: Type[T]):
+    def __init__(self, response_json: dict, response_type: Type[T], lazy: bool = False):
         self.time   = response_json["time"]
         self.method = response_json["method"]
         self.msgid  = response_json["msgid"]
@@ -18,17 +22,57 @@ class Response(Generic[T]):
         
         response_data = response_json.get("data")
         if response_data is not None:
-            self.data: T = response_type(response_data)
+            if lazy and response_type.LAZY_TYPE is not None:
+                self.data: T = cast(T, response_type.LAZY_TYPE(response_data)) # A subclass of response_type
+            else:
+                self.data = response_type(response_data)
+
+    @classmethod
+    def from_bytes(cls, content: bytes, response_type: Type[T], lazy: bool = False) -> "Response[T]":
+        """
+        Decode a response from the raw bytes of its body, with the fastest available JSON decoder.
+
+        Args:
+            content       (bytes): The body of the HTTP response.
+            response_type (Type[T]): The ResponseData subclass of the data.
+            lazy          (bool, optional): Only extract the data's fields when they are accessed.
+
+        Raises:
+            ValueError: The body is not valid JSON.
+        """
+        return cls(loads(content), response_type, lazy)
 
-@dataclass
 class ResponseData():
     '''
     Abstract base class for ResponseData
+
+    Subclasses can declare FIELDS, the Field of each attribute, with __slots__ = tuple(FIELDS) and an annotation
+    of each attribute for type checkers. Their __init__ and get_values are then compiled from FIELDS when the class
+    is created, along with LAZY_TYPE, a subclass extracting each field on first access.
     '''
+    __slots__ = ()
+    FIELDS: ClassVar[dict[str, Field]] = {}
+    LAZY_TYPE: ClassVar[type["ResponseData"] | None] = None
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "FIELDS" in cls.__dict__:
+            missing = [name for name in cls.FIELDS if name not in cls.__dict__.get("__annotations__", {})]
+            if missing:
+                raise TypeError(f"{cls.__name__} declares fields without annotations: {', '.join(missing)}")
+            cls.__init__ = compile_init(cls.FIELDS) # type: ignore[method-assign]
+            cls.get_values = compile_get_values(cls.FIELDS) # type: ignore[method-assign]
+            cls.LAZY_TYPE = compile_lazy_type(cls)
     
     def __init__(self, data: dict):
         raise NotImplementedError
     
+    def get_values(self) -> dict[str, Any]:
+        '''
+        Returns the attributes of the data by name.
+        '''
+        return dict(vars(self))
+    
     def print_data(self):
         self.print_data_header()
         for row in self.data:
@@ -40,23 +84,6 @@ class ResponseData():
     def print_data_row(self, row: Tuple[str, Any]):
         raise NotImplementedError()
     
-from Interfaces.Responses.Devices.DoorSensor import DoorSensorGetStateData
-from Interfaces.Responses.Devices.THSensor import THSensorGetStateData
-from Interfaces.Responses.Devices.WaterMeterController import WaterMeterControllerGetStateData
-from Interfaces.Responses.Devices.InfraredRemoter import InfraredRemoterGetStateData
-from Interfaces.Responses.Devices.MultiOutlet import MultiOutletGetStateData
-from Interfaces.Responses.Devices.Lock import LockGetStateData
-from Interfaces.Responses.Devices.Outlet import OutletGetStateData
-from Interfaces.Responses.Devices.SpeakerHub import SpeakerHubGetStateData
-from Interfaces.Responses.Devices.Manipulator import ManipulatorGetStateData
-from Interfaces.Responses.Devices.VibrationSensor import VibrationSensorGetStateData
-from Interfaces.Responses.Devices.MotionSensor import MotionSensorGetStateData
-from Interfaces.Responses.Devices.SmartRemoter import SmartRemoterGetStateData
-from Interfaces.Responses.Devices.Hub import HubGetStateData
-from Interfaces.Responses.Devices.LeakSensor import LeakSensorGetStateData
-from Interfaces.Responses.Devices.Switch import SwitchGetStateData
-from Interfaces.Responses.Devices.Home import HomeGetDeviceListData
-
 class MethodNames(Enum):
     THSENSOR_GET_STATE = "THSensor.getState"
     WATERMETERCONTROLLER_GET_STATE = "WaterMeterController.getState"
@@ -74,36 +101,66 @@ class MethodNames(Enum):
     LEAKSENSOR_GET_STATE = "LeakSensor.getState"
     SWITCH_GET_STATE = "Switch.getState"
     HOME_GET_DEVICE_LIST = "Home.getDeviceList"
+    HOME_GET_GENERAL_INFO = "Home.getGeneralInfo"
+
+DEVICES_PACKAGE = "Interfaces.Responses.Devices"
+
+# The module and class of each response type. Modules are only imported once their responses are needed,
+# so processes that poll a few device types do not load the rest.
+RESPONSE_MODULES: dict[tuple[str, MethodNames], tuple[str, str]] = {
+    ("THSensor", MethodNames.THSENSOR_GET_STATE): ("THSensor", "THSensorGetStateData"),
+    ("WaterMeterController", MethodNames.WATERMETERCONTROLLER_GET_STATE): ("WaterMeterController", "WaterMeterControllerGetStateData"),
+    ("DoorSensor", MethodNames.DOORSENSOR_GET_STATE): ("DoorSensor", "DoorSensorGetStateData"),
+    ("InfraredRemoter", MethodNames.INFRAREDREMOTER_GET_STATE): ("InfraredRemoter", "InfraredRemoterGetStateData"),
+    ("MultiOutlet", MethodNames.MULTIOUTLET_GET_STATE): ("MultiOutlet", "MultiOutletGetStateData"),
+    ("Lock", MethodNames.LOCK_GET_STATE): ("Lock", "LockGetStateData"),
+    ("Outlet", MethodNames.OUTLET_GET_STATE): ("Outlet", "OutletGetStateData"),
+    ("SpeakerHub", MethodNames.SPEAKERHUB_GET_STATE): ("SpeakerHub", "SpeakerHubGetStateData"),
+    ("Manipulator", MethodNames.MANIPULATOR_GET_STATE): ("Manipulator", "ManipulatorGetStateData"),
+    ("VibrationSensor", MethodNames.VIBRATIONSENSOR_GET_STATE): ("VibrationSensor", "VibrationSensorGetStateData"),
+    ("MotionSensor", MethodNames.MOTIONSENSOR_GET_STATE): ("MotionSensor", "MotionSensorGetStateData"),
+    ("SmartRemoter", MethodNames.SMARTREMOTER_GET_STATE): ("SmartRemoter", "SmartRemoterGetStateData"),
+    ("Hub", MethodNames.HUB_GET_STATE): ("Hub", "HubGetStateData"),
+    ("LeakSensor", MethodNames.LEAKSENSOR_GET_STATE): ("LeakSensor", "LeakSensorGetStateData"),
+    ("Switch", MethodNames.SWITCH_GET_STATE): ("Switch", "SwitchGetStateData"),
+    ("No Device", MethodNames.HOME_GET_DEVICE_LIST): ("Home", "HomeGetDeviceListData"),
+    ("No Device", MethodNames.HOME_GET_GENERAL_INFO): ("Home", "HomeGetGeneralInfoData"),
+}
+response_types: dict[tuple[str, MethodNames], type[ResponseData]] = {} # Resolved entries of RESPONSE_MODULES
 
-def get_response_type(sensor_type: str, method: MethodNames) -> type:
+def get_response_type(sensor_type: str, method: MethodNames) -> type[ResponseData]:
     """
-    Factory method to create a BUDPResponse object based on the sensor type and method.
+    Get the ResponseData subclass of a sensor type's method, importing its module on first use.
 
     Args:
-    sensor_type (str): The type of sensor.
-    method (str): The method used to get the data.
-    data (dict): The data to be used to create the response.
+    sensor_type (str): The type of sensor, or "No Device" for methods that do not target a device.
+    method (MethodNames): The method used to get the data.
 
     Returns:
-    BUDPResponse: The response object.
+    type[ResponseData]: The ResponseData subclass.
+
+    Raises:
+    KeyError: The sensor type has no such method.
+    """
+    key = (sensor_type, method)
+    response_type = response_types.get(key)
+    if response_type is None:
+        module_name, class_name = RESPONSE_MODULES[key]
+        response_type = getattr(import_module(f"{DEVICES_PACKAGE}.{module_name}"), class_name)
+        response_types[key] = response_type
+    return response_type
+
+def get_state_method(device_type: str) -> MethodNames:
+    """
+    Get the getState method for a device type.
+
+    Args:
+    device_type (str): The type of device, such as "THSensor".
+
+    Returns:
+    MethodNames: The device type's getState method.
+
+    Raises:
+    KeyError: The device type has no getState method.
     """
-    response_classes: dict[tuple[str, MethodNames], type] = {
-        ("THSensor", MethodNames.THSENSOR_GET_STATE): THSensorGetStateData,
-        ("WaterMeterController", MethodNames.WATERMETERCONTROLLER_GET_STATE): WaterMeterControllerGetStateData,
-        ("DoorSensor", MethodNames.DOORSENSOR_GET_STATE): DoorSensorGetStateData,
-        ("InfraredRemoter", MethodNames.INFRAREDREMOTER_GET_STATE): InfraredRemoterGetStateData,
-        ("MultiOutlet", MethodNames.MULTIOUTLET_GET_STATE): MultiOutletGetStateData,
-        ("Lock", MethodNames.LOCK_GET_STATE): LockGetStateData,
-        ("Outlet", MethodNames.OUTLET_GET_STATE): OutletGetStateData,
-        ("SpeakerHub", MethodNames.SPEAKERHUB_GET_STATE): SpeakerHubGetStateData,
-        ("Manipulator", MethodNames.MANIPULATOR_GET_STATE): ManipulatorGetStateData,
-        ("VibrationSensor", MethodNames.VIBRATIONSENSOR_GET_STATE): VibrationSensorGetStateData,
-        ("MotionSensor", MethodNames.MOTIONSENSOR_GET_STATE): MotionSensorGetStateData,
-        ("SmartRemoter", MethodNames.SMARTREMOTER_GET_STATE): SmartRemoterGetStateData,
-        ("Hub", MethodNames.HUB_GET_STATE): HubGetStateData,
-        ("LeakSensor", MethodNames.LEAKSENSOR_GET_STATE): LeakSensorGetStateData,
-        ("Switch", MethodNames.SWITCH_GET_STATE): SwitchGetStateData,
-        ("No Device", MethodNames.HOME_GET_DEVICE_LIST): HomeGetDeviceListData,
-    }
-
-    return response_classes[(sensor_type, method)]
\ No newline at end of file
+    return MethodNames[f"{device_type.upper()}_GET_STATE"]
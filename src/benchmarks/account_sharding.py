@@ -0,0 +1,96 @@
+'''
+Measures the readings per second collected by AccountSupervisor with a growing number of worker processes,
+against the local simulator of the YoLink API. The simulator runs one server process per account, sharing a port, so
+it scales with the workers; both compete for the same cores.
+
+Usage, from the src directory:
+    python -m benchmarks.account_sharding [--accounts N] [--devices N] [--sweeps N] [--workers N ...]
+'''
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+
+from Controller.Account_Supervisor import AccountSupervisor, AccountCollector, group_accounts
+from Interfaces.Database import Database
+from Interfaces.Device import Device
+from Interfaces.Responses.Response import ResponseData
+from benchmarks.simulator import YoLinkSimulator, SimulatorConfig
+
+DEFAULT_ACCOUNTS = 4
+DEFAULT_DEVICES = 200 # THSensors per account
+DEFAULT_SWEEPS = 5
+DEFAULT_WORKERS = [1, 2, 4]
+UNLIMITED = 1e9 # Rate limits of the client, so that the client-side limiter never waits
+
+class NullDatabase(Database):
+    '''
+    A backend that counts the readings it receives and drops them, so only collection is measured.
+    '''
+
+    def __init__(self):
+        self.saved = 0
+
+    def save(self, device_type: str, header: OrderedDict[str, str|int|float]) -> None:
+        self.saved += 1
+
+    def add_device(self, device_id, device_name, device_type, timestamp) -> None:
+        pass
+
+def create_row(device: Device, data: ResponseData) -> OrderedDict[str, str|int|float]:
+    '''
+    Keeps the scalar values of a reading, as main's rows do.
+    '''
+    row: OrderedDict[str, str|int|float] = OrderedDict({"name": device.name, "deviceId": device.device_id})
+    for name, value in data.get_values().items():
+        if isinstance(value, (str, int, float)):
+            row[name] = value
+    return row
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark collecting accounts with worker processes.")
+    parser.add_argument("--accounts", type=int, default=DEFAULT_ACCOUNTS, help="Accounts collected")
+    parser.add_argument("--devices", type=int, default=DEFAULT_DEVICES, help="THSensors per account")
+    parser.add_argument("--sweeps", type=int, default=DEFAULT_SWEEPS, help="Sweeps of every account")
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS, help="Worker process counts measured")
+    arguments = parser.parse_args()
+
+    simulator = YoLinkSimulator(SimulatorConfig({"THSensor": arguments.devices}), processes=arguments.accounts)
+    simulator.start()
+    directory = tempfile.mkdtemp()
+    try:
+        accounts = [f"account{index}" for index in range(arguments.accounts)]
+        credentials_path = os.path.join(directory, "credentials.json")
+        with open(credentials_path, "w") as file:
+            json.dump({account + suffix: account for account in accounts for suffix in ("_yolink_user_id", "_yolink_user_key")}, file)
+        collector = AccountCollector(create_row, sweep_interval=0, max_sweeps=arguments.sweeps, controller_options={
+            "token_url": simulator.token_url, "api_url": simulator.api_url, "credentials_path": credentials_path,
+            "token_cache_path": None, "background_refresh": False}, rate_limits={"account_capacity": UNLIMITED,
+            "account_rate": UNLIMITED, "device_capacity": UNLIMITED, "device_rate": UNLIMITED})
+
+        print(f'{arguments.accounts} accounts of {arguments.devices} THSensors, {arguments.sweeps} sweeps, '
+            f'{os.cpu_count()} cores')
+        baseline = None
+        for workers in arguments.workers:
+            database = NullDatabase()
+            groups = group_accounts(accounts, -(-len(accounts) // workers))
+            supervisor = AccountSupervisor(groups, collector, database, check_interval=0.05)
+            start = time.perf_counter()
+            supervisor.start()
+            supervisor.run()
+            supervisor.stop()
+            elapsed = time.perf_counter() - start
+            stats = supervisor.get_stats()
+            rate = database.saved / elapsed
+            baseline = baseline or rate
+            print(f'  {len(groups)} workers: {database.saved:,} readings in {elapsed:.2f}s, {rate:,.0f}/s '
+                f'({rate / baseline:.2f}x), {stats.restarts} restarts')
+    finally:
+        shutil.rmtree(directory)
+        simulator.stop()
+
+if __name__ == "__main__":
+    main()
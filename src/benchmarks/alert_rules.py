@@ -0,0 +1,90 @@
+'''
+Measures evaluating alert rules on sweeps of readings from thousands of devices, and the memory their state takes.
+
+Usage, from the src directory:
+    python -m benchmarks.alert_rules [--devices N] [--sweeps N]
+'''
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any
+
+from Controller.Alert_Engine import Alert, AlertEngine, CallbackAlertSink, Rule, ThresholdRule, StateRule, RateOfChangeRule, NoReportRule
+from Interfaces.Device import Device
+
+DEFAULT_DEVICES = 5000
+DEFAULT_SWEEPS = 20
+START = 1_704_067_200 # 2024-01-01T00:00:00Z
+SWEEP_INTERVAL = 60 # Seconds between the readings of a device
+RULES: list[Rule] = [
+    ThresholdRule("temperature limit", "temperature", limits_field="tempLimit", hysteresis=0.5, device_types=("THSensor",)),
+    ThresholdRule("humidity limit", "humidity", above=70, below=20, hysteresis=1, device_types=("THSensor",)),
+    RateOfChangeRule("temperature swing", "temperature", max_rate=0.5, device_types=("THSensor",)),
+    StateRule("leak detected", "state", ("alert",), device_types=("LeakSensor",)),
+    NoReportRule("not reporting", minutes=10),
+]
+
+def create_readings(devices: list[Device], sweep: int) -> list[dict[str, Any]]:
+    '''
+    Returns a reading of every device. Every 50th THSensor runs hot in half of the sweeps, every 100th leak sensor
+    alerts, and every 20th device stops reporting after the first sweep.
+    '''
+    report_at = datetime.fromtimestamp(START + sweep * SWEEP_INTERVAL, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    readings: list[dict[str, Any]] = []
+    for index, device in enumerate(devices):
+        if sweep and index % 20 == 0:
+            readings.append({"reportAt": "2024-01-01T00:00:00.000Z"}) # Polled again, without a new report
+        elif device.type == "THSensor":
+            hot = index % 50 == 0 and sweep % 10 < 5
+            readings.append({"reportAt": report_at, "state": "normal", "temperature": 35 if hot else 20,
+                "humidity": 40 + sweep % 3, "tempLimit": {"min": -10, "max": 30}})
+        else:
+            readings.append({"reportAt": report_at, "state": "alert" if index % 100 == 1 else "normal"})
+    return readings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark alert rules.")
+    parser.add_argument("--devices", type=int, default=DEFAULT_DEVICES, help="Devices reporting, half THSensors and half LeakSensors")
+    parser.add_argument("--sweeps", type=int, default=DEFAULT_SWEEPS, help="Readings of every device")
+    arguments = parser.parse_args()
+
+    devices = [Device({"deviceId": f"d88b4c01{index:08x}", "deviceUDID": "", "token": "", "name": f"Sensor {index}",
+        "type": "THSensor" if index % 2 == 0 else "LeakSensor"}) for index in range(arguments.devices)]
+    sweeps = [create_readings(devices, sweep) for sweep in range(arguments.sweeps)]
+
+    received: list[Alert] = []
+    engine = AlertEngine(RULES, [CallbackAlertSink(received.append)])
+    evaluating = 0.0
+    checking = 0.0
+    for sweep, readings in enumerate(sweeps):
+        start = time.perf_counter()
+        for device, values in zip(devices, readings):
+            engine.evaluate(device, values)
+        evaluating += time.perf_counter() - start
+        start = time.perf_counter()
+        engine.check_silence(START + sweep * SWEEP_INTERVAL)
+        checking += time.perf_counter() - start
+
+    # Measured apart, as tracing slows evaluating down
+    tracemalloc.start()
+    traced = AlertEngine(RULES, [CallbackAlertSink(lambda alert: None)])
+    for sweep, readings in enumerate(sweeps[:2]):
+        for device, values in zip(devices, readings):
+            traced.evaluate(device, values)
+        traced.check_silence(START + sweep * SWEEP_INTERVAL)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = engine.get_stats()
+    print(f'{stats.readings:,} readings from {arguments.devices:,} devices in {arguments.sweeps} sweeps, '
+        f'{stats.evaluations:,} rule evaluations')
+    print(f'  evaluated in {evaluating:.2f}s: {stats.readings / evaluating:,.0f} readings/s, '
+        f'{evaluating / arguments.sweeps * 1000:.1f} ms per sweep, '
+        f'{evaluating / stats.evaluations * 1e9:.0f} ns per rule evaluation')
+    print(f'  silence checks: {checking / arguments.sweeps * 1000:.2f} ms per sweep')
+    print(f'  {stats.triggered:,} alerts triggered, {stats.resolved:,} resolved, {stats.firing:,} firing, {len(received):,} emitted')
+    print(f'  engine state: {memory / 1024:,.0f} KiB, {memory / arguments.devices:.0f} bytes per device')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+'''
+Compares the buffered CSV writer with the previous open-per-row writer on synthetic THSensor rows.
+
+Usage, from the src directory:
+    python -m benchmarks.csv_writer [--rows N]
+'''
+import argparse
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import date
+
+from Api.persistence_csv import DatabaseCSV, SAVE_EXT
+
+DEFAULT_ROWS = 1_000_000
+
+def create_rows(count: int) -> list[OrderedDict[str, str|int|float]]:
+    return [
+        OrderedDict([
+            ("name", f"Sensor {i % 20}"),
+            ("deviceId", f"d88b4c01000{i % 20:05d}"),
+            ("reportAt", "2024-01-01T00:00:00.000Z"),
+            ("temperature", 20 + i % 10),
+            ("humidity", 40 + i % 30),
+            ("dew point", 10 + i % 5),
+        ])
+        for i in range(count)
+    ]
+
+def save_unbuffered(save_dir: str, device_type: str, header: OrderedDict[str, str|int|float]) -> None:
+    '''
+    The previous DatabaseCSV.save: reopens the file and writes field by field for every row.
+    '''
+    filepath = os.path.join(save_dir, f'{device_type}-{date.today().strftime("%m-%d-%y")}{SAVE_EXT}')
+    with open(filepath, 'a+') as file:
+        if os.path.getsize(filepath) == 0:
+            for header_item in header:
+                file.write(f'{header_item},')
+        file.write('\n')
+        for value in header.values():
+            file.write(f'{value},')
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the CSV writers.")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Synthetic rows written by each writer")
+    arguments = parser.parse_args()
+    rows = create_rows(arguments.rows)
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        start = time.perf_counter()
+        for row in rows:
+            save_unbuffered(save_dir, "THSensor", row)
+        unbuffered = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        start = time.perf_counter()
+        database = DatabaseCSV(save_dir, flush_interval=None)
+        for row in rows:
+            database.save("THSensor", row)
+        database.close()
+        buffered = time.perf_counter() - start
+        stats = database.get_stats()
+
+    print(f'Unbuffered: {unbuffered:.2f}s ({arguments.rows / unbuffered:,.0f} rows/s)')
+    print(f'Buffered:   {buffered:.2f}s ({arguments.rows / buffered:,.0f} rows/s), {stats.flushes} flushes, {stats.opens} opens')
+    print(f'Speedup:    {unbuffered / buffered:.1f}x')
+
+if __name__ == "__main__":
+    main()
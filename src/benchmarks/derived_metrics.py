@@ -0,0 +1,75 @@
+'''
+Measures the throughput of the vectorised derived metrics against computing them one reading at a time,
+as main did before.
+
+Usage, from the src directory:
+    python -m benchmarks.derived_metrics [--rows N] [--devices N]
+'''
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+
+from Api.derived_metrics import DerivedMetrics, CELSIUS, FAHRENHEIT
+
+DEFAULT_ROWS = 2_000_000
+DEFAULT_DEVICES = 1000
+BASELINE_ROWS = 200_000 # The per-reading baseline is timed on fewer rows
+
+# The per-reading formulas main used
+GET_DEW_POINT = lambda temperature, humidity: temperature - ((100 - humidity )/5)
+CONVERT_TEMP = lambda temp: temp * 9/5 + 32
+
+def per_reading(temperatures: list[float], humidities: list[float]) -> list[tuple[float, float]]:
+    return [
+        (round(CONVERT_TEMP(temperature), 1), round(CONVERT_TEMP(GET_DEW_POINT(temperature, humidity)), 1))
+        for temperature, humidity in zip(temperatures, humidities)
+    ]
+
+def measure(name: str, rows: int, run: Callable[[], object]) -> None:
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f'  {name:<44} {rows / elapsed / 1e6:8.2f} M rows/s')
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark derived metrics.")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Readings per measurement")
+    parser.add_argument("--devices", type=int, default=DEFAULT_DEVICES, help="Water meters the readings come from")
+    arguments = parser.parse_args()
+    rows = arguments.rows
+
+    generator = np.random.default_rng(0)
+    temperatures = generator.uniform(-10, 40, rows)
+    humidities = generator.uniform(5, 100, rows)
+    device_ids = np.array([f"d88b4c01{index:08x}" for index in range(arguments.devices)])[generator.integers(0, arguments.devices, rows)]
+    times = 1.7e9 + np.arange(rows, dtype=np.float64)
+    meters = np.arange(rows, dtype=np.float64) * 0.5
+
+    print(f'{rows:,} readings:')
+    baseline_rows = min(rows, BASELINE_ROWS)
+    temperature_list = temperatures[:baseline_rows].tolist()
+    humidity_list = humidities[:baseline_rows].tolist()
+    measure("per reading, temperature and dew point", baseline_rows, lambda: per_reading(temperature_list, humidity_list))
+
+    columns = {"temperature": temperatures, "humidity": humidities}
+    approximate = DerivedMetrics(CELSIUS, FAHRENHEIT)
+    measure("vectorised, temperature, dew point, heat index", rows, lambda: approximate.derive(columns))
+    magnus = DerivedMetrics(CELSIUS, FAHRENHEIT, accurate_dew_point=True)
+    measure("vectorised, with the Magnus dew point", rows, lambda: magnus.derive(columns))
+
+    meter_columns = {"deviceId": device_ids, "meter": meters}
+    measure(f"vectorised, flow rate of {arguments.devices} meters", rows, lambda: DerivedMetrics().derive(meter_columns, times))
+
+    # The same flow rate, one sweep of every meter at a time, keeping the previous sweep's readings
+    sweep_ids = device_ids[:arguments.devices]
+    sweeps = max(rows // arguments.devices, 1)
+    live = DerivedMetrics()
+    def run_sweeps() -> None:
+        for sweep in range(sweeps):
+            live.derive({"deviceId": sweep_ids, "meter": meters[:arguments.devices] + sweep}, times[:arguments.devices] + sweep * 60)
+    measure(f"live sweeps of {arguments.devices} meters", sweeps * arguments.devices, run_sweeps)
+
+if __name__ == "__main__":
+    main()
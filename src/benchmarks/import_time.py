@@ -0,0 +1,65 @@
+'''
+Measures how long modules take to import in a fresh interpreter, and checks main's startup against a budget.
+Exits with status 1 when importing main takes longer than the budget, so it can run as a CI or deploy check.
+
+Usage, from the src directory:
+    python -m benchmarks.import_time [--runs N] [--budget SECONDS] [MODULE ...]
+'''
+import argparse
+import statistics
+import subprocess
+import sys
+
+DEFAULT_RUNS = 7
+DEFAULT_BUDGET = 0.25 # Seconds main may take to import. It took ~0.3 s while every device module was imported eagerly
+DEFAULT_MODULES = [
+    "Interfaces.Responses.Response",
+    "Interfaces.Responses.Devices.THSensor",
+    "Controller.YoLink_Controller",
+    "Controller.Device_Poller",
+    "main",
+]
+
+# Prints the seconds an import took, and how many device response modules it loaded
+MEASURE_SOURCE = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+devices = sum(name.startswith("Interfaces.Responses.Devices.") for name in sys.modules)
+print(elapsed, devices)
+'''
+
+def measure_import(module: str) -> tuple[float, int]:
+    '''
+    Returns the seconds a fresh interpreter takes to import a module, and the device modules it loaded.
+    '''
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_SOURCE.format(module=module)],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[0]), int(output[1])
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark import and startup time.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="Fresh interpreters per module, the median is reported")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Seconds main may take to import")
+    arguments = parser.parse_args()
+
+    medians: dict[str, float] = {}
+    for module in arguments.modules:
+        runs = [measure_import(module) for _ in range(arguments.runs)]
+        medians[module] = statistics.median(elapsed for elapsed, _ in runs)
+        print(f'{module:<40} {medians[module] * 1e3:7.1f} ms, {runs[0][1]:2d} device modules loaded')
+
+    startup = medians.get("main")
+    if startup is None:
+        startup = statistics.median(measure_import("main")[0] for _ in range(arguments.runs))
+    if startup > arguments.budget:
+        print(f'main takes {startup * 1e3:.1f} ms to import, over the budget of {arguments.budget * 1e3:.0f} ms')
+        sys.exit(1)
+    print(f'main takes {startup * 1e3:.1f} ms to import, within the budget of {arguments.budget * 1e3:.0f} ms')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+'''
+Load-tests collecting an account end to end against the local simulator of the YoLink API: sweeps of every device
+with the thread pool and asyncio pollers, then the cost of parsing a reading and of saving it with each backend.
+
+Sweep latency counts from the first request of a sweep to its last response; device latency from the first request
+for a device to its response, retries included. MySQL is left out, as it needs a server.
+
+Usage, from the src directory:
+    python -m benchmarks.load_test [--devices THSensor=200,LeakSensor=50] [--latency lognormal:0.05:0.5]
+        [--error-rate R] [--throttle-rate R] [--sweeps N] [--concurrency N] [--processes N] [--json PATH]
+'''
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Callable
+
+from Api.SpooledDatabase import SpooledDatabase
+from Api.persistence_archive import DatabaseArchive
+from Api.persistence_csv import DatabaseCSV
+from Controller.Device_Inventory import get_device_list
+from Controller.Device_Poller import DevicePoller, AsyncDevicePoller, PollResult, is_pollable
+from Controller.Rate_Limiter import RateLimiter
+from Controller.YoLink_Controller import YoLinkController
+from Interfaces.Database import Database
+from Interfaces.Device import Device
+from Interfaces.Responses.Devices.Home import HomeGetDeviceListData
+from Interfaces.Responses.Response import MethodNames, Response, get_response_type, get_state_method
+from benchmarks.account_sharding import NullDatabase, create_row
+from benchmarks.simulator import YoLinkSimulator, SimulatorConfig, Latency, add_config_arguments, get_config, create_state, get_account_devices
+
+ACCOUNT = "loadtest"
+DEFAULT_DEVICES = {"THSensor": 200, "LeakSensor": 50, "DoorSensor": 50}
+DEFAULT_LATENCY = Latency("lognormal", 0.02, 0.5)
+DEFAULT_SWEEPS = 10
+DEFAULT_CONCURRENCY = 16
+DEFAULT_PARSE_COUNT = 20_000 # Responses parsed per measurement
+UNLIMITED = 1e9 # Rate limits of the client, so that the simulator alone throttles
+
+@dataclass
+class SweepReport:
+    '''
+    Attributes:
+        poller (str): The poller measured.
+        sweeps (int): Sweeps of every device.
+        readings (int): Devices polled successfully, over every sweep.
+        failed (int): Devices every attempt failed for, over every sweep.
+        requests (int): API requests sent, retries included.
+        retried (int): Requests retried after a rate limit or transient error.
+        requests_per_second (float): Requests sent per second of sweeping.
+        sweep_p50, sweep_p90, sweep_p99, sweep_max (float): Sweep latency percentiles, in seconds.
+        device_p50, device_p90, device_p99 (float): Device latency percentiles, in seconds.
+    '''
+    poller: str
+    sweeps: int
+    readings: int
+    failed: int
+    requests: int
+    retried: int
+    requests_per_second: float
+    sweep_p50: float
+    sweep_p90: float
+    sweep_p99: float
+    sweep_max: float
+    device_p50: float
+    device_p90: float
+    device_p99: float
+
+def get_percentile(values: list[float], percentile: float) -> float:
+    '''
+    Returns the nearest-rank percentile of values.
+    '''
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(percentile / 100 * len(ordered)) - 1))]
+
+def create_report(poller: str, sweep_times: list[float], results: list[PollResult], limiter: RateLimiter) -> SweepReport:
+    device_times = [result.elapsed for result in results]
+    return SweepReport(
+        poller = poller,
+        sweeps = len(sweep_times),
+        readings = sum(1 for result in results if result.ok),
+        failed = sum(1 for result in results if not result.ok),
+        requests = limiter.stats.requests,
+        retried = limiter.stats.retried,
+        requests_per_second = limiter.stats.requests / sum(sweep_times),
+        sweep_p50 = get_percentile(sweep_times, 50),
+        sweep_p90 = get_percentile(sweep_times, 90),
+        sweep_p99 = get_percentile(sweep_times, 99),
+        sweep_max = max(sweep_times),
+        device_p50 = get_percentile(device_times, 50),
+        device_p90 = get_percentile(device_times, 90),
+        device_p99 = get_percentile(device_times, 99)
+    )
+
+def create_limiter() -> RateLimiter:
+    return RateLimiter(account_capacity=UNLIMITED, account_rate=UNLIMITED, device_capacity=UNLIMITED, device_rate=UNLIMITED)
+
+def sweep_threaded(simulator: YoLinkSimulator, credentials_path: str, sweeps: int, concurrency: int) -> tuple[SweepReport, list[PollResult]]:
+    '''
+    Sweeps with DevicePoller, as main and the supervisor's workers do.
+    '''
+    limiter = create_limiter()
+    controller = YoLinkController(ACCOUNT, pool_maxsize=concurrency, rate_limiter=limiter, token_cache_path=None,
+        background_refresh=False, token_url=simulator.token_url, api_url=simulator.api_url, credentials_path=credentials_path)
+    devices = [device for device in get_device_list(controller) if is_pollable(device)]
+    limiter.stats.requests = limiter.stats.retried = 0 # Only count the sweeps
+    sweep_times: list[float] = []
+    results: list[PollResult] = []
+    try:
+        with DevicePoller(controller, max_workers=concurrency) as poller:
+            for _ in range(sweeps):
+                start = time.perf_counter()
+                results.extend(poller.poll(devices))
+                sweep_times.append(time.perf_counter() - start)
+    finally:
+        controller.close()
+    return create_report("threads", sweep_times, results, limiter), results
+
+async def sweep_async(simulator: YoLinkSimulator, credentials_path: str, sweeps: int, concurrency: int) -> SweepReport:
+    '''
+    Sweeps with AsyncDevicePoller.
+    '''
+    # aiohttp takes a while to import, and is only needed here
+    from Controller.Async_YoLink_Controller import AsyncYoLinkController
+
+    limiter = create_limiter()
+    async with AsyncYoLinkController(ACCOUNT, max_connections=concurrency, rate_limiter=limiter, token_cache_path=None,
+            background_refresh=False, token_url=simulator.token_url, api_url=simulator.api_url,
+            credentials_path=credentials_path) as controller:
+        devices = [device for device in await get_async_device_list(controller) if is_pollable(device)]
+        limiter.stats.requests = limiter.stats.retried = 0
+        poller = AsyncDevicePoller(controller, max_concurrency=concurrency)
+        sweep_times: list[float] = []
+        results: list[PollResult] = []
+        for _ in range(sweeps):
+            start = time.perf_counter()
+            results.extend(await poller.poll(devices))
+            sweep_times.append(time.perf_counter() - start)
+    return create_report("asyncio", sweep_times, results, limiter)
+
+async def get_async_device_list(controller: Any) -> list[Device]:
+    response = await controller.make_request(MethodNames.HOME_GET_DEVICE_LIST, HomeGetDeviceListData)
+    return response.data.devices
+
+def create_body(data: dict) -> bytes:
+    return json.dumps({"code": "000000", "time": 1704067200000, "msgid": 1704067200000, "method": "Test.method",
+        "desc": "Success", "data": data}).encode()
+
+def measure_parsing(config: SimulatorConfig, count: int, lazy: bool) -> float:
+    '''
+    Returns the seconds to parse a getState response from its body and extract its values, averaged over the
+    device types in proportion to their counts.
+    '''
+    devices = list(get_account_devices(config, ACCOUNT).values())
+    bodies = [(create_body(create_state(device, time.time())), get_response_type(device.device_type,
+        get_state_method(device.device_type))) for device in devices]
+    bodies = (bodies * (count // len(bodies) + 1))[:count]
+    start = time.perf_counter()
+    for body, response_type in bodies:
+        Response.from_bytes(body, response_type, lazy).data.get_values()
+    return (time.perf_counter() - start) / count
+
+def measure_persisting(create_database: Callable[[], Database], rows: list[tuple[str, OrderedDict[str, str|int|float]]]) -> float:
+    '''
+    Returns the seconds to save a row, closing the database included.
+    '''
+    database = create_database()
+    start = time.perf_counter()
+    for device_type, row in rows:
+        database.save(device_type, row)
+    database.close()
+    return (time.perf_counter() - start) / len(rows)
+
+def print_report(report: SweepReport) -> None:
+    print(f'  {report.poller}: {report.readings:,} readings, {report.failed:,} failed, {report.requests:,} requests '
+        f'({report.retried:,} retried), {report.requests_per_second:,.0f} requests/s')
+    print(f'    sweep   p50 {report.sweep_p50 * 1000:,.0f} ms, p90 {report.sweep_p90 * 1000:,.0f} ms, '
+        f'p99 {report.sweep_p99 * 1000:,.0f} ms, max {report.sweep_max * 1000:,.0f} ms')
+    print(f'    device  p50 {report.device_p50 * 1000:,.1f} ms, p90 {report.device_p90 * 1000:,.1f} ms, '
+        f'p99 {report.device_p99 * 1000:,.1f} ms')
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test collection against the YoLink API simulator.")
+    add_config_arguments(parser)
+    parser.set_defaults(devices=dict(DEFAULT_DEVICES), latency=DEFAULT_LATENCY)
+    parser.add_argument("--sweeps", type=int, default=DEFAULT_SWEEPS, help="Sweeps of every device per poller")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Requests in flight")
+    parser.add_argument("--processes", type=int, default=1, help="Simulator server processes")
+    parser.add_argument("--parse-count", type=int, default=DEFAULT_PARSE_COUNT, help="Responses parsed per measurement")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    arguments = parser.parse_args()
+    config = get_config(arguments)
+
+    directory = tempfile.mkdtemp()
+    try:
+        credentials_path = os.path.join(directory, "credentials.json")
+        with open(credentials_path, "w") as file:
+            json.dump({ACCOUNT + "_yolink_user_id": ACCOUNT, ACCOUNT + "_yolink_user_key": ACCOUNT}, file)
+
+        with YoLinkSimulator(config, processes=arguments.processes) as simulator:
+            devices = sum(config.devices.values())
+            print(f'{devices:,} devices, {config.latency.distribution} latency of {config.latency.mean * 1000:g} ms, '
+                f'{config.error_rate:.1%} errors, {config.throttle_rate:.1%} throttled, {arguments.sweeps} sweeps, '
+                f'{arguments.concurrency} in flight, {arguments.processes} simulator processes')
+            threaded, results = sweep_threaded(simulator, credentials_path, arguments.sweeps, arguments.concurrency)
+            print_report(threaded)
+            asynchronous = asyncio.run(sweep_async(simulator, credentials_path, arguments.sweeps, arguments.concurrency))
+            print_report(asynchronous)
+
+        parsing = {"eager": measure_parsing(config, arguments.parse_count, False),
+            "lazy": measure_parsing(config, arguments.parse_count, True)}
+        print('  parse and extract values per reading: ' + ", ".join(f'{name} {seconds * 1e6:.1f} µs'
+            for name, seconds in parsing.items()))
+
+        rows = [(result.device.type, create_row(result.device, result.data)) for result in results
+            if result.ok and result.data is not None]
+        persisting = {
+            "csv": measure_persisting(lambda: DatabaseCSV(os.path.join(directory, "csv"), flush_interval=None), rows),
+            "archive": measure_persisting(lambda: DatabaseArchive(os.path.join(directory, "archive"), flush_interval=None), rows),
+            "spool": measure_persisting(lambda: SpooledDatabase(NullDatabase, os.path.join(directory, "spool")), rows),
+        }
+        print(f'  persist per reading, {len(rows):,} readings: ' + ", ".join(f'{name} {seconds * 1e6:.1f} µs'
+            for name, seconds in persisting.items()))
+
+        if arguments.json:
+            with open(arguments.json, "w") as file:
+                json.dump({"config": asdict(config), "sweeps": [asdict(threaded), asdict(asynchronous)],
+                    "parse_seconds_per_reading": parsing, "persist_seconds_per_reading": persisting}, file, indent=2)
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main()
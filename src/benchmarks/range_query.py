@@ -0,0 +1,70 @@
+'''
+Measures reading a time range back from the CSV backend, with its sparse time index and with a full scan of the file.
+
+Usage, from the src directory:
+    python -m benchmarks.range_query [--rows N] [--devices N]
+'''
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from Api.persistence_csv import DatabaseCSV, INDEX_EXT
+
+DEFAULT_ROWS = 500_000
+DEFAULT_DEVICES = 20
+START = 1_704_067_200 # 2024-01-01T00:00:00Z
+READING_INTERVAL = 60 # Seconds between the readings of a device
+RANGES = (3600, 86400, 7 * 86400) # Seconds of readings queried
+
+def measure_query(database: DatabaseCSV, device_ids: list[str] | None, start: float, end: float) -> tuple[int, float]:
+    '''
+    Returns the rows read and the seconds it took.
+    '''
+    began = time.perf_counter()
+    rows = sum(len(chunk) for chunk in database.query(device_ids, ["temperature", "humidity"], start, end))
+    return rows, time.perf_counter() - began
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark range queries of the CSV backend.")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Rows written")
+    parser.add_argument("--devices", type=int, default=DEFAULT_DEVICES, help="THSensors the rows come from")
+    arguments = parser.parse_args()
+
+    save_dir = tempfile.mkdtemp()
+    try:
+        database = DatabaseCSV(save_dir, flush_interval=None)
+        for index in range(arguments.rows):
+            device = index % arguments.devices
+            report_at = datetime.fromtimestamp(START + index // arguments.devices * READING_INTERVAL, timezone.utc)
+            database.save("THSensor", OrderedDict({"name": f"Sensor {device}", "deviceId": f"d88b4c01{device:08x}",
+                "reportAt": report_at.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+                "temperature": 20 + index % 100 / 10, "humidity": 50}))
+        database.flush()
+        span = arguments.rows // arguments.devices * READING_INTERVAL
+        print(f'{arguments.rows:,} rows over {span / 86400:.1f} days, '
+            f'{database.get_stats().index_entries:,} index entries')
+
+        index_paths = [os.path.join(save_dir, name) for name in os.listdir(save_dir) if name.endswith(INDEX_EXT)]
+        for seconds in RANGES:
+            if seconds > span:
+                continue
+            start = START + (span - seconds) / 2
+            for device_ids, label in ((None, "every device"), (["d88b4c0100000000"], "one device")):
+                rows, indexed = measure_query(database, device_ids, start, start + seconds)
+                for path in index_paths:
+                    os.rename(path, path + ".off")
+                _, scanned = measure_query(database, device_ids, start, start + seconds)
+                for path in index_paths:
+                    os.rename(path + ".off", path)
+                print(f'  {seconds / 3600:6.0f} h, {label:<12} {rows:>8,} rows: indexed {indexed * 1000:8.1f} ms, '
+                    f'full scan {scanned * 1000:8.1f} ms ({scanned / indexed:5.1f}x)')
+        database.close()
+    finally:
+        shutil.rmtree(save_dir)
+
+if __name__ == "__main__":
+    main()
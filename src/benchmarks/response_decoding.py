@@ -0,0 +1,147 @@
+'''
+Compares the compiled, slot-based ResponseData decoding with the previous hand-written constructors.
+
+Usage, from the src directory:
+    python -m benchmarks.response_decoding [--count N]
+'''
+import argparse
+import time
+import tracemalloc
+from typing import Callable
+
+from Interfaces.Responses.Response import ResponseData
+from Interfaces.Responses.Devices.THSensor import THSensorGetStateData
+from Interfaces.Responses.Devices.WaterMeterController import WaterMeterControllerGetStateData
+
+DEFAULT_COUNT = 200_000
+
+THSENSOR_DATA = {
+    "online": True,
+    "state": {
+        "alarm": {"lowBattery": False, "lowTemp": False, "highTemp": False, "lowHumidity": False, "highHumidity": False},
+        "battery": 4, "humidity": 48.5, "humidityCorrection": 0, "humidityLimit": {"max": 100, "min": 0},
+        "interval": 0, "state": "normal", "tempCorrection": 0, "tempLimit": {"max": 40, "min": -20},
+        "temperature": 21.3, "version": "0383",
+    },
+    "reportAt": "2024-01-01T00:00:00.000Z",
+    "deviceId": "d88b4c0100000001",
+}
+
+WATERMETERCONTROLLER_DATA = {
+    "state": {"valve": "open", "meter": 123456, "waterFlowing": False},
+    "alarm": {
+        "openReminder": False, "leak": False, "amountOverrun": False, "durationOverrun": False,
+        "valveError": False, "reminder": False, "freezeError": False,
+    },
+    "battery": 4, "powerSupply": "PowerLine", "valveDelay": {"on": 0, "off": 0},
+    "attributes": {
+        "openReminder": 0, "meterUnit": 0, "alertInterval": 0, "meterStepFactor": 10, "leakLimit": 20.0,
+        "autoCloseValve": False, "overrunAmountACV": False, "overrunDurationACV": False, "leakPlan": "on",
+        "overrunAmount": 100.0, "overrunDuration": 60, "freezeTemp": 2.0,
+    },
+    "recentUsage": {"amount": 12, "duration": 3}, "dailyUsage": 120, "temperature": 18.5,
+    "version": "0412", "tz": -5,
+}
+
+class HandWrittenTHSensorGetStateData(ResponseData):
+    '''
+    The THSensor constructor before field specs, kept as the baseline.
+    '''
+
+    def __init__(self, data: dict):
+        self.online: bool = data["online"]
+        self.state: str = data["state"]["state"]
+        self.battery: str = data["state"]["battery"]
+        self.interval: int | None = data["state"].get("interval")
+        self.temperature: float = data["state"]["temperature"]
+        self.humidity: float = data["state"]["humidity"]
+        self.tempLimit: dict = data["state"]["tempLimit"]
+        self.humidityLimit: dict = data["state"]["humidityLimit"]
+        self.tempCorrection: float = data["state"]["tempCorrection"]
+        self.humidityCorrection: float = data["state"]["humidityCorrection"]
+        self.version: str = data["state"]["version"]
+        self.reportAt: str = data["reportAt"]
+        self.deviceId: str = data["deviceId"]
+
+class HandWrittenWaterMeterControllerGetStateData(ResponseData):
+    '''
+    The WaterMeterController constructor before field specs, kept as the baseline.
+    '''
+
+    def __init__(self, data: dict):
+        self.valve: str = data["state"]["valve"]
+        self.meter: int = data["state"]["meter"]
+        self.waterFlowing: bool = data["state"]["waterFlowing"]
+        self.openReminder: bool = data["alarm"]["openReminder"]
+        self.leak: bool = data["alarm"]["leak"]
+        self.amountOverrun: bool = data["alarm"]["amountOverrun"]
+        self.durationOverrun: bool = data["alarm"]["durationOverrun"]
+        self.valveError: bool = data["alarm"]["valveError"]
+        self.reminder: bool = data["alarm"]["reminder"]
+        self.freezeError: bool = data["alarm"]["freezeError"]
+        self.battery: int = data["battery"]
+        self.powerSupply: str = data["powerSupply"]
+        self.valveDelay_on: int | None = data["valveDelay"].get("on")
+        self.valveDelay_off: int | None = data["valveDelay"].get("off")
+        self.openReminder_duration: int = data["attributes"]["openReminder"]
+        self.meterUnit: int = data["attributes"]["meterUnit"]
+        self.alertInterval: int = data["attributes"]["alertInterval"]
+        self.meterStepFactor: int = data["attributes"]["meterStepFactor"]
+        self.leakLimit: float = data["attributes"]["leakLimit"]
+        self.autoCloseValve: bool = data["attributes"]["autoCloseValve"]
+        self.overrunAmountACV: bool = data["attributes"]["overrunAmountACV"]
+        self.overrunDurationACV: bool = data["attributes"]["overrunDurationACV"]
+        self.leakPlan: str = data["attributes"]["leakPlan"]
+        self.overrunAmount: float = data["attributes"]["overrunAmount"]
+        self.overrunDuration: int = data["attributes"]["overrunDuration"]
+        self.freezeTemp: float = data["attributes"]["freezeTemp"]
+        self.recentUsage_amount: int = data["recentUsage"]["amount"]
+        self.recentUsage_duration: int = data["recentUsage"]["duration"]
+        self.dailyUsage: int = data["dailyUsage"]
+        self.temperature: float = data["temperature"]
+        self.version: str = data["version"]
+        self.tz: int = data["tz"]
+
+def time_decoding(response_type: Callable[[dict], ResponseData], data: dict, count: int) -> float:
+    '''
+    Returns the mean seconds to decode one response.
+    '''
+    start = time.perf_counter()
+    for _ in range(count):
+        response_type(data)
+    return (time.perf_counter() - start) / count
+
+def measure_memory(response_type: Callable[[dict], ResponseData], data: dict, count: int) -> float:
+    '''
+    Returns the mean bytes held by one decoded response, excluding the values it shares with the data.
+    '''
+    tracemalloc.start()
+    responses = [response_type(data) for _ in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del responses
+    return size / count
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ResponseData decoding.")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="Responses decoded per measurement")
+    arguments = parser.parse_args()
+
+    cases = [
+        ("THSensor", HandWrittenTHSensorGetStateData, THSensorGetStateData, THSENSOR_DATA),
+        ("WaterMeterController", HandWrittenWaterMeterControllerGetStateData, WaterMeterControllerGetStateData,
+            WATERMETERCONTROLLER_DATA),
+    ]
+    for name, hand_written, compiled, data in cases:
+        assert hand_written(data).get_values() == compiled(data).get_values()
+        hand_written_time = time_decoding(hand_written, data, arguments.count)
+        compiled_time = time_decoding(compiled, data, arguments.count)
+        hand_written_memory = measure_memory(hand_written, data, arguments.count // 10)
+        compiled_memory = measure_memory(compiled, data, arguments.count // 10)
+        print(f'{name}:')
+        print(f'  hand-written: {hand_written_time * 1e9:6.0f} ns, {hand_written_memory:5.0f} bytes per response')
+        print(f'  compiled:     {compiled_time * 1e9:6.0f} ns, {compiled_memory:5.0f} bytes per response')
+        print(f'  speedup {hand_written_time / compiled_time:.2f}x, memory {compiled_memory / hand_written_memory:.0%}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+'''
+Compares parsing responses from their raw bytes, eagerly and lazily, with decoding them the way requests does.
+
+Usage, from the src directory:
+    python -m benchmarks.response_parsing [--count N] [--devices N]
+'''
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from Interfaces.Responses.Decoder import JSON_DECODER
+from Interfaces.Responses.Response import Response
+from Interfaces.Responses.Devices.Home import HomeGetDeviceListData
+from Interfaces.Responses.Devices.THSensor import THSensorGetStateData
+from benchmarks.response_decoding import THSENSOR_DATA
+
+DEFAULT_COUNT = 20_000
+DEFAULT_DEVICES = 500
+
+def create_body(data: dict) -> bytes:
+    return json.dumps({
+        "time": 1704067200000, "method": "Test.method", "msgid": 1704067200000, "code": "000000", "desc": "Success",
+        "data": data,
+    }).encode()
+
+def create_device_list(count: int) -> dict:
+    return {"devices": [
+        {
+            "deviceId": f"d88b4c01{index:08x}", "deviceUDID": f"{index:032x}", "name": f"Sensor {index}",
+            "token": f"{index:08x}-0000-0000-0000-000000000000", "type": "THSensor",
+            "parentDeviceId": None, "modelName": "YS8003-UC", "serviceZone": "us_west_1",
+        }
+        for index in range(count)
+    ]}
+
+def parse_like_requests(content: bytes, response_type: type) -> Response:
+    '''
+    The previous path: requests' Response.json() decodes the body to a str, then parses it with json.
+    '''
+    return Response(json.loads(content.decode("utf-8")), response_type)
+
+def parse_raw(content: bytes, response_type: type) -> Response:
+    return Response.from_bytes(content, response_type)
+
+def parse_lazy(content: bytes, response_type: type) -> Response:
+    return Response.from_bytes(content, response_type, lazy=True)
+
+def time_parsing(parse: Callable[[bytes, type], Response], content: bytes, response_type: type,
+        read: Callable[[Any], Any], count: int) -> float:
+    '''
+    Returns the mean seconds to parse one response and read from its data.
+    '''
+    start = time.perf_counter()
+    for _ in range(count):
+        read(parse(content, response_type).data)
+    return (time.perf_counter() - start) / count
+
+def measure_memory(parse: Callable[[bytes, type], Response], content: bytes, response_type: type,
+        read: Callable[[Any], Any]) -> tuple[int, int]:
+    '''
+    Returns the peak bytes allocated while parsing one response and reading from its data,
+    and the bytes the response still holds afterwards.
+    '''
+    tracemalloc.start()
+    response = parse(content, response_type)
+    read(response.data)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del response
+    return peak, size
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark response parsing.")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="Small responses parsed per measurement")
+    parser.add_argument("--devices", type=int, default=DEFAULT_DEVICES, help="Devices in the device list response")
+    arguments = parser.parse_args()
+
+    cases = [
+        ("THSensor.getState, reading 2 fields", create_body(THSENSOR_DATA), THSensorGetStateData,
+            lambda data: (data.temperature, data.humidity), arguments.count),
+        ("THSensor.getState, reading every field", create_body(THSENSOR_DATA), THSensorGetStateData,
+            lambda data: data.get_values(), arguments.count),
+        (f"Home.getDeviceList of {arguments.devices} devices, reading none", create_body(create_device_list(arguments.devices)),
+            HomeGetDeviceListData, lambda data: None, max(arguments.count // arguments.devices, 50)),
+        (f"Home.getDeviceList of {arguments.devices} devices, reading every device", create_body(create_device_list(arguments.devices)),
+            HomeGetDeviceListData, lambda data: data.devices, max(arguments.count // arguments.devices, 50)),
+    ]
+    parsers = [("requests .json()", parse_like_requests), (f"raw bytes ({JSON_DECODER})", parse_raw), ("raw bytes, lazy", parse_lazy)]
+    for name, content, response_type, read, count in cases:
+        print(f'{name} ({len(content)} bytes):')
+        baseline_time = None
+        for parser_name, parse in parsers:
+            elapsed = time_parsing(parse, content, response_type, read, count)
+            peak, size = measure_memory(parse, content, response_type, read)
+            baseline_time = baseline_time or elapsed
+            print(f'  {parser_name:<22} {elapsed * 1e6:9.1f} us ({baseline_time / elapsed:4.2f}x), '
+                f'peak {peak:9,d} bytes, held {size:9,d} bytes')
+
+if __name__ == "__main__":
+    main()
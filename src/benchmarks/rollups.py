@@ -0,0 +1,85 @@
+'''
+Measures rolling up readings as they are saved, and answering range queries from the rollups
+rather than from every reading.
+
+Usage, from the src directory:
+    python -m benchmarks.rollups [--days N] [--devices N]
+'''
+import argparse
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from Api.RollupDatabase import RollupDatabase, FileRollupStore, MINUTE, DAY, query_rollups, summarize_rollups
+from Interfaces.Database import Database
+
+DEFAULT_DAYS = 7
+DEFAULT_DEVICES = 10
+START = 1_704_067_200 # 2024-01-01T00:00:00Z
+READING_INTERVAL = 60 # Seconds between the readings of a device
+
+class NullDatabase(Database):
+    '''
+    A backend that drops every reading, so only the rollups are measured.
+    '''
+
+    def save(self, device_type: str, header: OrderedDict[str, str|int|float]) -> None:
+        pass
+
+    def add_device(self, device_id, device_name, device_type, timestamp) -> None:
+        pass
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark rollups.")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Days of readings")
+    parser.add_argument("--devices", type=int, default=DEFAULT_DEVICES, help="THSensors reporting")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        store = FileRollupStore(directory)
+        database = RollupDatabase(NullDatabase(), store)
+        readings = arguments.days * DAY // READING_INTERVAL
+        rows: list[OrderedDict[str, str|int|float]] = []
+        for index in range(readings):
+            report_at = datetime.fromtimestamp(START + index * READING_INTERVAL, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            for device in range(arguments.devices):
+                rows.append(OrderedDict({"name": f"Sensor {device}", "deviceId": f"d88b4c01{device:08x}", "reportAt": report_at,
+                    "temperature": 20 + (index % 600) / 100, "humidity": 40 + device, "battery": 4}))
+
+        start = time.perf_counter()
+        for number, row in enumerate(rows, 1):
+            database.save("THSensor", row)
+            if number % 1000 == 0:
+                database.flush()
+        database.flush()
+        elapsed = time.perf_counter() - start
+        stats = database.get_stats()
+        print(f'{len(rows):,} readings rolled up in {elapsed:.2f}s ({len(rows) / elapsed:,.0f}/s), '
+            f'{stats.values:,} values into {stats.buckets:,} bucket merges')
+
+        device_id = "d88b4c0100000000"
+        end = START + arguments.days * DAY
+        print(f'Readings of one device over {arguments.days} days: {readings:,}')
+        for min_points in (100, 1000, 10000):
+            query_start = time.perf_counter()
+            series = query_rollups(store, device_id, "temperature", START, end, min_points)
+            print(f'  query for {min_points:>5} points: {len(series.buckets):>6,} buckets at {series.resolution:>5}s '
+                f'in {(time.perf_counter() - query_start) * 1000:7.1f} ms')
+        for name, resolution_only in (("minute buckets", True), ("fewest buckets", False)):
+            query_start = time.perf_counter()
+            if resolution_only:
+                buckets = query_rollups(store, device_id, "temperature", START + 30, end - 30, resolution=MINUTE).buckets
+                count = sum(bucket.count for bucket in buckets)
+            else:
+                summary = summarize_rollups(store, device_id, "temperature", START + 30, end - 30)
+                count = summary.count if summary is not None else 0
+            print(f'  summary from {name:<14} {count:>6,} readings in {(time.perf_counter() - query_start) * 1000:7.1f} ms')
+        database.close()
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+'''
+A local simulator of the YoLink API: the token endpoint, Home.getDeviceList, Home.getGeneralInfo and the getState
+method of every device type in MethodNames, with configurable device counts, latency, errors and throttling.
+
+Every account, identified by its user ID, gets the same simulated devices under its own device IDs. Readings are
+derived from the device and the time of its latest report, so every server process answers alike without sharing
+state, and polling a device again before its next report returns the same reading.
+
+Point a controller at it with token_url and api_url. Any user ID and key are accepted.
+
+Usage, from the src directory:
+    python -m benchmarks.simulator [--port N] [--devices THSensor=100,LeakSensor=20] [--latency lognormal:0.08:0.5]
+        [--error-rate R] [--throttle-rate R] [--report-interval S] [--processes N]
+'''
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import random
+import socket
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs
+
+from Controller.Rate_Limiter import RATE_LIMIT_CODES, TRANSIENT_ERROR_CODES
+from Interfaces.Responses.Fields import Field
+from Interfaces.Responses.Response import MethodNames, get_response_type, get_state_method
+
+SUCCESS_CODE = "000000"
+INVALID_TOKEN_CODE = "000103"
+EXPIRED_TOKEN_CODE = "010104"
+REJECTED_CODE = "010203" # Unknown devices and methods. Not retried by the controllers
+THROTTLE_CODE = sorted(RATE_LIMIT_CODES)[0]
+ERROR_CODES = sorted(TRANSIENT_ERROR_CODES)
+DEFAULT_DEVICES = {"THSensor": 10}
+DEFAULT_TOKEN_LIFETIME = 7200 # Seconds
+
+# Values of fields, by the last key of their path, that the type of the field alone would not give
+SAMPLE_VALUES: dict[str, Any] = {
+    "online": True,
+    "battery": 4,
+    "version": "0401",
+    "tz": 0,
+    "tempLimit": {"max": 30.0, "min": 0.0},
+    "humidityLimit": {"max": 80.0, "min": 10.0},
+    "powerSupply": "battery",
+    "leakPlan": "on",
+    "valve": "close",
+    "ssid": "home",
+    "ip": "192.168.1.2",
+    "gateway": "192.168.1.1",
+    "mask": "255.255.255.0",
+    "enable": True,
+    "volume": 5,
+}
+STATES: dict[str, str] = { # Idle state of each device type with a string state; others report "normal"
+    "DoorSensor": "closed",
+    "Lock": "locked",
+    "Manipulator": "closed",
+    "MultiOutlet": "closed",
+    "Outlet": "closed",
+    "Switch": "closed",
+}
+EMPTY_VALUES: dict[type, Any] = {bool: False, int: 0, float: 0.0, str: "", dict: {}, list: []}
+
+@dataclass(frozen=True)
+class Latency:
+    '''
+    Latency added to every response, in seconds.
+
+    Attributes:
+        distribution (str): constant, uniform, normal, lognormal or exponential.
+        mean (float): Mean latency. For lognormal, the median.
+        spread (float): Half-width for uniform, standard deviation for normal, sigma of the logarithm for lognormal.
+    '''
+    distribution: str = "constant"
+    mean: float = 0.0
+    spread: float = 0.0
+
+    def __post_init__(self):
+        if self.distribution not in ("constant", "uniform", "normal", "lognormal", "exponential"):
+            raise ValueError(f"unknown latency distribution {self.distribution}")
+
+    def sample(self, generator: random.Random) -> float:
+        if self.distribution == "uniform":
+            return max(0.0, generator.uniform(self.mean - self.spread, self.mean + self.spread))
+        if self.distribution == "normal":
+            return max(0.0, generator.gauss(self.mean, self.spread))
+        if self.distribution == "lognormal":
+            return self.mean * math.exp(generator.gauss(0.0, self.spread)) if self.mean > 0 else 0.0
+        if self.distribution == "exponential":
+            return generator.expovariate(1 / self.mean) if self.mean > 0 else 0.0
+        return self.mean
+
+    @classmethod
+    def parse(cls, text: str) -> "Latency":
+        '''
+        Parses "distribution:mean[:spread]", such as "lognormal:0.08:0.5", or a constant number of seconds.
+        '''
+        parts = text.split(":")
+        if len(parts) == 1:
+            return cls("constant", float(parts[0]))
+        return cls(parts[0], float(parts[1]), float(parts[2]) if len(parts) > 2 else 0.0)
+
+@dataclass(frozen=True)
+class SimulatorConfig:
+    '''
+    Attributes:
+        devices (dict[str, int]): Devices of every account, by type. Types need a getState method.
+        latency (Latency): Latency of every response.
+        error_rate (float): Share of API requests answered with a transient error code.
+        throttle_rate (float): Share of API requests answered with the rate limit code.
+        report_interval (float): Seconds between the reports of a device. 0 reports on every poll.
+        token_lifetime (int): Seconds an access token is valid.
+        seed (int | None): Seeds the latency and errors of every server process. None seeds them randomly.
+    '''
+    devices: dict[str, int] = field(default_factory=lambda: dict(DEFAULT_DEVICES))
+    latency: Latency = Latency()
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    report_interval: float = 0.0
+    token_lifetime: int = DEFAULT_TOKEN_LIFETIME
+    seed: int | None = None
+
+    def __post_init__(self):
+        for device_type in self.devices:
+            get_response_type(device_type, get_state_method(device_type)) # Raises KeyError for types without getState
+
+def parse_devices(text: str) -> dict[str, int]:
+    '''
+    Parses device counts, such as "THSensor=100,LeakSensor=20".
+    '''
+    devices = {}
+    for entry in text.split(","):
+        device_type, count = entry.split("=")
+        devices[device_type.strip()] = int(count)
+    return devices
+
+@dataclass(frozen=True)
+class SimulatedDevice:
+    device_id: str
+    device_type: str
+    name: str
+    phase: float # Fraction of the report interval and daily cycle the device is offset by
+
+def get_account_devices(config: SimulatorConfig, user_id: str) -> dict[str, SimulatedDevice]:
+    '''
+    Returns the devices of an account by ID. IDs are 16 hex digits, like those of real devices.
+    '''
+    prefix = hashlib.md5(user_id.encode()).hexdigest()[:8]
+    devices = {}
+    for type_index, (device_type, count) in enumerate(config.devices.items()):
+        for index in range(count):
+            device_id = f"{prefix}{type_index:02x}{index:06x}"
+            phase = int(hashlib.md5(device_id.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+            devices[device_id] = SimulatedDevice(device_id, device_type, f"{device_type} {index + 1}", phase)
+    return devices
+
+def get_report_time(device: SimulatedDevice, now: float, report_interval: float) -> float:
+    '''
+    Returns the time of the device's latest report.
+    '''
+    if report_interval <= 0:
+        return now
+    offset = device.phase * report_interval
+    return math.floor((now - offset) / report_interval) * report_interval + offset
+
+def get_sample_value(device: SimulatedDevice, value_field: Field, report_time: float) -> Any:
+    '''
+    Returns the value of a field in a reading reported at report_time.
+    '''
+    key = value_field.path[-1]
+    cycle = math.sin(2 * math.pi * (report_time / 86400 + device.phase))
+    if key == "temperature":
+        return round(20 + 5 * cycle + device.phase, 1)
+    if key == "humidity":
+        return round(45 + 10 * cycle, 1)
+    if key in ("meter", "dailyUsage"):
+        return int(report_time / 60 * (1 + device.phase)) % 1_000_000
+    if key == "reportAt":
+        return datetime.fromtimestamp(report_time, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    if key == "deviceId":
+        return device.device_id
+    if key == "state":
+        state = STATES.get(device.device_type, "normal")
+        return [state, state] if value_field.value_type is list else state
+    if key in SAMPLE_VALUES:
+        return SAMPLE_VALUES[key]
+    return EMPTY_VALUES.get(value_field.value_type)
+
+def create_state(device: SimulatedDevice, report_time: float) -> dict:
+    '''
+    Returns the data of a getState response, built from the FIELDS of the device type's response data.
+    '''
+    fields: dict[str, Field] = get_response_type(device.device_type, get_state_method(device.device_type)).FIELDS
+    data: dict = {}
+    for value_field in fields.values():
+        container: Any = data
+        for key, next_key in zip(value_field.path, value_field.path[1:]):
+            empty: Any = [{}] if isinstance(next_key, int) else {}
+            container = container[key] if isinstance(key, int) else container.setdefault(key, empty)
+        key = value_field.path[-1]
+        value = get_sample_value(device, value_field, report_time)
+        if isinstance(container, dict):
+            existing = container.get(key)
+            if isinstance(existing, dict) and isinstance(value, dict):
+                existing.update(value) # A dict field whose keys are also fields of their own
+            else:
+                container[key] = value
+        else:
+            container[key] = value
+    return data
+
+def encode_token(user_id: str, expires_at: int) -> str:
+    return f"{user_id}:{expires_at}"
+
+def create_handler(config: SimulatorConfig, counters: dict[str, Any]) -> type[BaseHTTPRequestHandler]:
+    '''
+    Returns the request handler of a server process.
+    '''
+    generator = random.Random(config.seed)
+    devices_by_account: dict[str, dict[str, SimulatedDevice]] = {}
+
+    def count(name: str) -> None:
+        with counters[name].get_lock():
+            counters[name].value += 1
+
+    def get_devices(user_id: str) -> dict[str, SimulatedDevice]:
+        devices = devices_by_account.get(user_id)
+        if devices is None:
+            devices = devices_by_account[user_id] = get_account_devices(config, user_id)
+        return devices
+
+    def create_token(form: dict[str, list[str]]) -> dict:
+        if form.get("grant_type", [""])[0] == "refresh_token":
+            user_id = form.get("refresh_token", [""])[0].removeprefix("refresh:")
+        else:
+            user_id = form.get("client_id", [""])[0]
+        if not user_id:
+            return {"code": INVALID_TOKEN_CODE, "desc": "missing client_id"}
+        expires_at = int(time.time()) + config.token_lifetime
+        return {"access_token": encode_token(user_id, expires_at), "refresh_token": f"refresh:{user_id}",
+            "expires_in": config.token_lifetime, "token_type": "bearer", "scope": ["create"]}
+
+    def call_method(request: dict, authorization: str) -> tuple[str, Any]:
+        user_id, _, expires_at = authorization.removeprefix("Bearer ").rpartition(":")
+        if not user_id or not expires_at.isdigit():
+            return INVALID_TOKEN_CODE, None
+        if int(expires_at) < time.time():
+            return EXPIRED_TOKEN_CODE, None
+        draw = generator.random()
+        if draw < config.throttle_rate:
+            count("throttled")
+            return THROTTLE_CODE, None
+        if draw < config.throttle_rate + config.error_rate:
+            count("errors")
+            return generator.choice(ERROR_CODES), None
+
+        method = request.get("method")
+        devices = get_devices(user_id)
+        if method == MethodNames.HOME_GET_DEVICE_LIST.value:
+            return SUCCESS_CODE, {"devices": [{"deviceId": device.device_id, "deviceUDID": device.device_id,
+                "token": f"token-{device.device_id}", "name": device.name, "type": device.device_type, "parentDeviceId": None}
+                for device in devices.values()]}
+        if method == MethodNames.HOME_GET_GENERAL_INFO.value:
+            return SUCCESS_CODE, {"id": hashlib.md5(user_id.encode()).hexdigest()}
+        device = devices.get(request.get("targetDevice") or "")
+        if device is None or method != get_state_method(device.device_type).value:
+            return REJECTED_CODE, None
+        return SUCCESS_CODE, create_state(device, get_report_time(device, time.time(), config.report_interval))
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True # Headers and body are written separately
+
+        def do_POST(self) -> None:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            count("requests")
+            time.sleep(config.latency.sample(generator))
+            if self.path.endswith("/token"):
+                response = create_token(parse_qs(body.decode()))
+            else:
+                try:
+                    request = json.loads(body)
+                except ValueError:
+                    self.send_error(400)
+                    return
+                code, data = call_method(request, self.headers.get("Authorization", ""))
+                response = {"code": code, "time": int(time.time() * 1000), "msgid": request.get("msgid") or int(time.time() * 1000),
+                    "method": request.get("method"), "desc": "Success" if code == SUCCESS_CODE else "Simulated failure"}
+                if data is not None:
+                    response["data"] = data
+            encoded = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return Handler
+
+class SimulatorServer(ThreadingHTTPServer):
+    allow_reuse_port = True # Every server process accepts connections on the same port
+    daemon_threads = True
+
+def serve(config: SimulatorConfig, host: str, port: int, counters: dict[str, Any], ready: Any) -> None:
+    '''
+    Entry point of a server process.
+    '''
+    server = SimulatorServer((host, port), create_handler(config, counters))
+    ready.put(True)
+    server.serve_forever()
+
+@dataclass
+class SimulatorStats:
+    '''
+    Attributes:
+        requests (int): Requests received by every server process, tokens included.
+        errors (int): Requests answered with a transient error code.
+        throttled (int): Requests answered with the rate limit code.
+    '''
+    requests: int
+    errors: int
+    throttled: int
+
+class YoLinkSimulator:
+    '''
+    Serves the simulated API from server processes sharing one port, so the simulator is not limited to one core.
+
+    Methods:
+        start: Starts the server processes and waits until they accept connections.
+        get_stats: Returns the requests served so far.
+        stop: Stops the server processes.
+
+    Attributes:
+        token_url (str): The token endpoint, for the controllers' token_url.
+        api_url (str): The API endpoint, for the controllers' api_url.
+    '''
+
+    def __init__(self, config: SimulatorConfig | None = None, host: str = "127.0.0.1", port: int = 0, processes: int = 1):
+        '''
+        Args:
+            config (SimulatorConfig, optional): Devices, latency and failures simulated.
+            host (str, optional): Address served on.
+            port (int, optional): Port served on. 0 picks a free port.
+            processes (int, optional): Server processes.
+        '''
+        self.config = config or SimulatorConfig()
+        self.host = host
+        self.port = port or get_free_port(host)
+        self.processes_count = processes
+        self.context = multiprocessing.get_context("spawn")
+        self.counters = {name: self.context.Value("q", 0) for name in ("requests", "errors", "throttled")}
+        self.processes: list[Any] = []
+        self.token_url = f"http://{host}:{self.port}/open/yolink/token"
+        self.api_url = f"http://{host}:{self.port}/open/yolink/v2/api"
+
+    def start(self) -> None:
+        ready = self.context.Queue()
+        for index in range(self.processes_count):
+            # Every process draws its own latencies and failures
+            config = self.config if self.config.seed is None else replace(self.config, seed=self.config.seed + index)
+            process = self.context.Process(target=serve, args=(config, self.host, self.port, self.counters, ready),
+                name=f"simulator-{index}", daemon=True)
+            process.start()
+            self.processes.append(process)
+        for _ in self.processes:
+            ready.get()
+
+    def get_stats(self) -> SimulatorStats:
+        return SimulatorStats(**{name: counter.value for name, counter in self.counters.items()})
+
+    def stop(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+
+    def __enter__(self) -> "YoLinkSimulator":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+def get_free_port(host: str) -> int:
+    with socket.socket() as probe:
+        probe.bind((host, 0))
+        return probe.getsockname()[1]
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    '''
+    Adds the options of a SimulatorConfig to a command line parser. See get_config.
+    '''
+    parser.add_argument("--devices", type=parse_devices, default=dict(DEFAULT_DEVICES),
+        help="Devices of every account by type, such as THSensor=100,LeakSensor=20")
+    parser.add_argument("--latency", type=Latency.parse, default=Latency(),
+        help="Response latency, distribution:mean[:spread] in seconds, such as lognormal:0.08:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a transient error")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with the rate limit code")
+    parser.add_argument("--report-interval", type=float, default=0.0, help="Seconds between the reports of a device")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the latencies and failures")
+
+def get_config(arguments: argparse.Namespace) -> SimulatorConfig:
+    return SimulatorConfig(arguments.devices, arguments.latency, arguments.error_rate, arguments.throttle_rate,
+        arguments.report_interval, seed=arguments.seed)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a simulated YoLink API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address served on")
+    parser.add_argument("--port", type=int, default=8080, help="Port served on")
+    parser.add_argument("--processes", type=int, default=1, help="Server processes")
+    add_config_arguments(parser)
+    arguments = parser.parse_args()
+
+    simulator = YoLinkSimulator(get_config(arguments), arguments.host, arguments.port, arguments.processes)
+    simulator.start()
+    print(f'Token URL: {simulator.token_url}')
+    print(f'API URL:   {simulator.api_url}')
+    try:
+        while True:
+            time.sleep(60)
+            stats = simulator.get_stats()
+            print(f'{stats.requests:,} requests, {stats.errors:,} errors, {stats.throttled:,} throttled')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,72 @@
+import math
+import threading
+import time
 from collections import OrderedDict
-from typing import Dict, Type
+from typing import TYPE_CHECKING, Type, cast
 from Controller.YoLink_Controller import YoLinkController
-from Api.DatabaseMySQL import DatabaseMySQL
+from Controller.Device_Inventory import DeviceInventory, InventoryDiff, get_device_list
+from Controller.Device_Poller import DevicePoller, is_pollable
+from Controller.Account_Supervisor import AccountSupervisor, AccountCollector, group_accounts
+from Controller.Report_Subscriber import ReportSubscriber
+from Controller.Poll_Scheduler import PollScheduler
+from Controller.Alert_Engine import (AlertEngine, AlertSink, PrintAlertSink, JSONLinesAlertSink,
+    Rule, ThresholdRule, StateRule, RateOfChangeRule, NoReportRule)
+from Api.DatabaseMySQL import DatabaseMySQL, SCHEMA_EAV
+from Api.SpooledDatabase import SpooledDatabase
+from Api.DeduplicatingDatabase import DeduplicatingDatabase
+from Api.RollupDatabase import RollupDatabase, MySQLRollupStore
 from Interfaces.Device import Device
-from Interfaces.Responses.Devices.Home import HomeGetDeviceListData
-from Interfaces.Responses.Devices.THSensor import THSensorGetStateData
-from Interfaces.Responses.Response import MethodNames
+from Interfaces.Responses.Devices.Home import HomeGetGeneralInfoData
+from Interfaces.Responses.Response import MethodNames, ResponseData
 from Interfaces.Database import Database
 
+if TYPE_CHECKING:
+    from Api.derived_metrics import DerivedMetrics
+    from Interfaces.Responses.Devices.THSensor import THSensorGetStateData
+
 # Yolink API Documentation: http://doc.yosmart.com/docs
 
 CURRENT_USER = "scott"
 
-# Approximation from https://iridl.ldeo.columbia.edu/dochelp/QA/Basic/dewpoint.html. "fairly accurate for relative humidity values above 50%"
-GET_DEW_POINT = lambda temperature, humidity: temperature - ((100 - humidity )/5)
 USE_FAHRENHEIT = True
-CONVERT_TEMP = lambda temp: temp * 9/5 + 32 if USE_FAHRENHEIT else temp
+# The approximation is "fairly accurate for relative humidity values above 50%"; the Magnus formula is accurate at any humidity
+ACCURATE_DEW_POINT = False
 SENSORS_WITH_DEWPOINT = {"THSensor"}
+POLL_CONCURRENCY = 8 # Maximum number of device requests in flight during a sweep
+USE_PUSH_REPORTS = False # Receive readings from the MQTT broker instead of polling, polling only devices that go quiet
+QUIET_CHECK_INTERVAL = 60 # Seconds between checks for devices that stopped reporting
+CONTINUOUS_POLLING = False # Keep polling every device at its own adaptive interval instead of polling THSensors once
+STATS_INTERVAL = 300 # Seconds between scheduler statistics reports
+DATABASE_SCHEMA = SCHEMA_EAV # SCHEMA_EAV or SCHEMA_TIMESERIES, see DatabaseMySQL
+SPOOL_DIR = "./../spool" # Readings are queued here until MySQL has stored them
+INVENTORY_CACHE_PATH = "./../.yolink_devices_{}.json" # Formatted with the current user
+DEDUPLICATION_STATE_PATH = "./../.dedup_state.json" # Last reading of every device, so separate runs skip repeats
+# One 0.1 °C step of the sensor in the unit temperatures are saved in, 0.18 °F, with room for rounding to 0.1
+TEMPERATURE_DEADBAND = 0.25 if USE_FAHRENHEIT else 0.15
+# Largest change of a field that is not saved, in the units it is saved in. Every numeric field of a THSensor row needs one,
+# or any change of it is saved; humidity is reported in whole percent, so none of its changes are dropped
+DEADBANDS = {"temperature": TEMPERATURE_DEADBAND, "dew point": TEMPERATURE_DEADBAND, "heat index": TEMPERATURE_DEADBAND}
+HEARTBEAT_INTERVAL = 3600 # Seconds after which a reading within the deadbands is saved anyway
+INVENTORY_TTL = 3600 # Seconds the cached device list is used before it is requested again
+USE_ROLLUPS = True # Maintain minute, hour and day aggregates of every numeric field next to the readings
+USE_SUPERVISOR = False # Collect every account of ACCOUNTS from worker processes, saving their readings to one database
+ACCOUNTS = [CURRENT_USER] # Accounts collected by the supervisor, each with its keys in credentials.json
+ACCOUNTS_PER_WORKER = 1 # Accounts polled by each worker process
+SWEEP_INTERVAL = 300 # Seconds between the sweeps of every account by the supervisor's workers
+USE_ALERTS = True # Evaluate ALERT_RULES on every reading
+ALERT_LOG_PATH = "./../alerts.jsonl" # Alerts are appended here as JSON lines, besides being printed
+REPORT_AT_TYPES = ("THSensor", "DoorSensor", "LeakSensor", "MotionSensor", "VibrationSensor", "SmartRemoter") # Report a reportAt
+ALERT_RULES: list[Rule] = [ # Compared with the values as the devices report them, temperatures in °C
+    ThresholdRule("temperature limit", "temperature", limits_field="tempLimit", hysteresis=0.5, device_types=("THSensor",)),
+    ThresholdRule("humidity limit", "humidity", limits_field="humidityLimit", hysteresis=1, device_types=("THSensor",)),
+    RateOfChangeRule("temperature swing", "temperature", max_rate=0.5, device_types=("THSensor",)),
+    StateRule("water leak", "leak", (True,), device_types=("WaterMeterController",)),
+    StateRule("pipe freezing", "freezeError", (True,), device_types=("WaterMeterController",)),
+    StateRule("leak detected", "state", ("alert",), device_types=("LeakSensor",)),
+    StateRule("door open", "state", ("open",), device_types=("DoorSensor",)),
+    StateRule("motion", "state", ("alert",), device_types=("MotionSensor",)),
+    NoReportRule("not reporting", minutes=180, device_types=REPORT_AT_TYPES),
+]
      
 def main() -> None:
     
@@ -26,32 +76,78 @@ def main() -> None:
     # TODO: file name consistency
     # TODO: Should main provide credentials? currently credentials are obtained in each class
     
-    # Establish connection to MySQL Database
-    database = DatabaseMySQL(CURRENT_USER)
+    # Readings are spooled locally and drained to MySQL, which is connected in the background
+    # so that polling starts even while it is down. Repeated readings are dropped before they reach the spool
+    database = DeduplicatingDatabase(
+        SpooledDatabase(create_backend, SPOOL_DIR),
+        DEADBANDS,
+        HEARTBEAT_INTERVAL,
+        DEDUPLICATION_STATE_PATH
+    )
+    
+    if USE_SUPERVISOR:
+        try:
+            supervise_accounts(database)
+        finally:
+            database.close()
+        return
     
     # Establish connection to YoLink API
     controller = YoLinkController(CURRENT_USER)
     
-    # Get connected devices
-    devices_data: HomeGetDeviceListData = controller.make_request(
-        MethodNames.HOME_GET_DEVICE_LIST, 
-        HomeGetDeviceListData
-    ).data
-    devices: list[Device] = devices_data.devices
-    
-    # Create a list of every type of device
-    device_types = set()
-    for device in devices:
-        device_types.add(device.type)
+    # Get connected devices. The device list is only requested when the cached one is older than its TTL
+    inventory = DeviceInventory(
+        lambda: get_device_list(controller),
+        controller.user_id,
+        INVENTORY_CACHE_PATH.format(CURRENT_USER),
+        INVENTORY_TTL
+    )
+    inventory.establish()
     
-    # Create a dictionary in the format {deviceType: deviceInfo[]}
-    devices_sorted = create_sorted_device_list(devices, device_types)
+    # Alert rules are evaluated on every reading, and silent devices are checked for in the background
+    alerts = create_alert_engine()
+    if alerts is not None:
+        for device in inventory.get_devices():
+            if is_pollable(device):
+                alerts.add_device(device)
+        alerts.start()
     
-    for device_type in device_types:
-        print_device_list(devices_sorted[device_type])
+    for device_type in inventory.get_types():
+        print_device_list(inventory.get_devices(device_type))
         print()
     
-    poll_sensors(devices_sorted["THSensor"], controller, database)
+    try:
+        if USE_PUSH_REPORTS:
+            listen_for_reports(inventory, controller, database, alerts)
+        elif CONTINUOUS_POLLING:
+            schedule_polls(inventory, controller, database, alerts)
+        else:
+            poll_sensors(inventory.get_devices("THSensor"), controller, database, alerts)
+    finally:
+        # Flush buffered readings before exiting
+        database.close()
+        if alerts is not None:
+            alerts.stop()
+        controller.close()
+
+def create_backend() -> Database:
+    '''
+    Connect to MySQL, with the rollups of the stored readings kept in the same database if enabled.
+    '''
+    # Created again after connection failures, so it must never drop the readings already stored
+    mysql_database = DatabaseMySQL(CURRENT_USER, schema=DATABASE_SCHEMA, reset_on_start=False)
+    if not USE_ROLLUPS:
+        return mysql_database
+    return RollupDatabase(mysql_database, MySQLRollupStore(mysql_database))
+
+def create_alert_engine() -> AlertEngine | None:
+    '''
+    Compile ALERT_RULES into an alert engine printing its alerts and appending them to ALERT_LOG_PATH, if enabled.
+    '''
+    if not USE_ALERTS:
+        return None
+    sinks: list[AlertSink] = [PrintAlertSink(), JSONLinesAlertSink(ALERT_LOG_PATH)]
+    return AlertEngine(ALERT_RULES, sinks, QUIET_CHECK_INTERVAL)
 
 def print_device_list(devices: list[Device]) -> None:
     '''
@@ -74,61 +170,284 @@ def print_device_list(devices: list[Device]) -> None:
         ]
         print("{: <20} {: <40} {: <30}".format(*device_information))
 
-# Given a list of json DBUPs representing devices and a set of each device type present, creates a list for each device type
-def create_sorted_device_list(devices: list[Device], device_types: set[str]) -> Dict[str, list[Device]]:
+derived_metrics: "DerivedMetrics | None" = None # Created by get_derived_metrics
+
+def get_derived_metrics() -> "DerivedMetrics":
+    '''
+    Returns the derived metrics engine, created on first use. NumPy is imported along with it, so that it does not
+    count towards main's import time.
+    '''
+    global derived_metrics
+    if derived_metrics is None:
+        from Api.derived_metrics import DerivedMetrics, CELSIUS, FAHRENHEIT
+        derived_metrics = DerivedMetrics(CELSIUS, FAHRENHEIT if USE_FAHRENHEIT else CELSIUS, ACCURATE_DEW_POINT)
+    return derived_metrics
+
+def create_row(device: Device, data: ResponseData) -> OrderedDict[str, str|int|float]:
     '''
-    Create a dictionary in the format {deviceType: deviceInfo[]} from a list of devices.
+    Create the row saved to the database for a single reading. See create_rows.
+    '''
+    return create_rows([(device, data)])[0]
+
+def create_rows(readings: list[tuple[Device, ResponseData]]) -> list[OrderedDict[str, str|int|float]]:
+    '''
+    Create the rows saved to the database for readings. Every row starts with the device name and ID.
+    THSensor rows contain the converted temperature, the dew point and the heat index, other devices save their
+    scalar fields as is, and water meters add their flow rate since the previous reading.
+    The derived metrics of each device type are computed for all its readings at once.
     
     Args:
-        devices (list): A list of JSON BDUPs representing devices.
-        device_types (set): A set of strings representing the types of devices present.
+        readings (list[tuple[Device, ResponseData]]): The readings, with the devices they came from.
         
     Returns:
-        dict: A dictionary in the format {deviceType: deviceInfo[]}.
+        list[OrderedDict]: The rows, in the order of the readings.
     '''
+    by_type: dict[str, list[int]] = {}
+    for index, (device, _) in enumerate(readings):
+        by_type.setdefault(device.type, []).append(index)
     
-    devices_sorted_type: Dict[str, list[Device]] = {}
-    
-    # Create entries for each type
-    for device_type in device_types:
-        devices_sorted_type[device_type] = []
-    
-    # Populate entries
-    for device in devices:
-        devices_sorted_type[device.type].append(device)
+    rows: dict[int, OrderedDict[str, str|int|float]] = {}
+    for device_type, indices in by_type.items():
+        group = [readings[index] for index in indices]
+        if device_type in SENSORS_WITH_DEWPOINT:
+            group_rows = create_dew_point_rows(cast("list[tuple[Device, THSensorGetStateData]]", group))
+        else:
+            group_rows = create_scalar_rows(group)
+        rows.update(zip(indices, group_rows))
+    return [rows[index] for index in range(len(readings))]
+
+def create_dew_point_rows(readings: list[tuple[Device, "THSensorGetStateData"]]) -> list[OrderedDict[str, str|int|float]]:
+    derived = get_derived_metrics().derive({
+        "temperature": [data.temperature for _, data in readings],
+        "humidity": [data.humidity for _, data in readings]
+    })
+    columns = {name: values.round(1).tolist() for name, values in derived.items()}
+    return [
+        OrderedDict({ # Use an ordered dict to maintain order in csv file
+            "name": device.name, 
+            "deviceId": device.device_id,
+            "reportAt": data.reportAt,
+            "temperature": columns["temperature"][index], 
+            "humidity": data.humidity,
+            "dew point": columns["dew point"][index],
+            "heat index": columns["heat index"][index]
+        })
+        for index, (device, data) in enumerate(readings)
+    ]
+
+def create_scalar_rows(readings: list[tuple[Device, ResponseData]]) -> list[OrderedDict[str, str|int|float]]:
+    rows: list[OrderedDict[str, str|int|float]] = []
+    for device, data in readings:
+        row: OrderedDict[str, str|int|float] = OrderedDict({"name": device.name, "deviceId": device.device_id})
+        for field, value in data.get_values().items():
+            if isinstance(value, (str, int, float)) and field not in row:
+                row[field] = value
+        rows.append(row)
     
-    return devices_sorted_type
+    # Water meters report a running total; the flow rate is measured from the previous reading of each meter
+    if rows and all("meter" in row for row in rows):
+        columns = {name: [row[name] for row in rows] for name in ("deviceId", "meter", "meterStepFactor", "reportAt")
+            if all(name in row for row in rows)}
+        times = None if "reportAt" in columns else [time.time()] * len(rows)
+        flow_rates = get_derived_metrics().derive(columns, times)["flow rate"]
+        for row, flow_rate in zip(rows, flow_rates.round(3).tolist()):
+            # The first reading of a meter has no flow rate
+            if not math.isnan(flow_rate):
+                row["flow rate"] = flow_rate
+    return rows
 
-def poll_sensors(sensors: list[Device], controller: YoLinkController, database: Database):
+def poll_sensors(sensors: list[Device], controller: YoLinkController, database: Database, alerts: AlertEngine | None = None):
     '''
     Not final.
-    Poll the sensors and print the data. Only works for THSensors currently.
+    Poll the sensors concurrently and print the data. Only works for THSensors currently.
+    Sensors that fail after retrying are reported and skipped without aborting the sweep.
     TODO: Add support for other sensor types.
     '''
     
     # Print header for data
     column_titles = ["Sensor name", "Temp", "%Hum.", "Dew P"]
     print("{: ^35} {: ^6} {: ^6} {: ^6}".format(*column_titles))
+    
+    with DevicePoller(controller, max_workers=POLL_CONCURRENCY) as poller:
+        results = poller.poll(sensors)
+    
+    # Results are in the same order as the sensors
+    for result in results:
+        if not result.ok:
+            print("{: <35} failed after {} attempts: {}".format(result.device.name, result.attempts, result.error))
+    
+    # Process the whole sweep at once, then show and save it
+    readings = [(result.device, result.data) for result in results if result.ok]
+    if alerts is not None:
+        for device, data in readings:
+            alerts.evaluate(device, data)
+    for information in create_rows(readings):
+        print("{: <35} {: <6} {: <6} {: <6}".format(
+            information["name"], information["temperature"], information["humidity"], information["dew point"]
+        ))
         
-    for sensor in sensors:
-        sensor_data = controller.make_request(
-            method_name = MethodNames.THSENSOR_GET_STATE, 
-            device = sensor,
-            response_type = THSensorGetStateData
-        ).data
+        database.save("THSensor", information)
+    
+    print_write_reduction(database)
+
+def print_write_reduction(database: Database) -> None:
+    '''
+    Print how many readings the deduplication stage kept from being written, if the database has one.
+    '''
+    if not isinstance(database, DeduplicatingDatabase):
+        return
+    stats = database.get_stats()
+    print("Saved {} of {} readings, {} repeated and {} within deadbands: {:.0%} fewer writes".format(
+        stats.written, stats.received, stats.duplicates, stats.within_deadband, stats.reduction_ratio))
+
+def listen_for_reports(inventory: DeviceInventory, controller: YoLinkController, database: Database,
+        alerts: AlertEngine | None = None):
+    '''
+    Save readings pushed by the YoLink MQTT broker until interrupted.
+    Devices that stop reporting are polled instead, so their readings keep arriving.
+    Devices added to or removed from the account are followed as the inventory refreshes.
+    '''
+    
+    home_data: HomeGetGeneralInfoData = controller.make_request(
+        MethodNames.HOME_GET_GENERAL_INFO,
+        HomeGetGeneralInfoData
+    ).data
+    
+    # Only poll devices that have a getState method
+    pollable_devices = [device for device in inventory.get_devices() if is_pollable(device)]
+    subscriber = ReportSubscriber(controller, home_data.id, pollable_devices,
+        lambda device, data: save_reading(device, data, database, alerts))
+    
+    def follow_inventory(diff: InventoryDiff) -> None:
+        for device in diff.removed:
+            subscriber.remove_device(device.device_id)
+        for device in diff.added + diff.renamed + diff.updated:
+            if is_pollable(device):
+                subscriber.add_device(device)
+        follow_alert_devices(alerts, diff)
+    inventory.subscribe(follow_inventory)
+    
+    with DevicePoller(controller, max_workers=POLL_CONCURRENCY) as poller:
+        subscriber.start()
+        inventory.start()
+        try:
+            while True:
+                time.sleep(QUIET_CHECK_INTERVAL)
+                subscriber.poll_quiet_devices(poller)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            inventory.stop()
+            subscriber.stop()
+
+def schedule_polls(inventory: DeviceInventory, controller: YoLinkController, database: Database,
+        alerts: AlertEngine | None = None):
+    '''
+    Poll every device at an interval adapted to its type and how often its readings change, until interrupted.
+    Devices added to or removed from the account are scheduled or dropped as the inventory refreshes.
+    Scheduler lag and per-device poll rates are printed periodically.
+    '''
+    with DevicePoller(controller, max_workers=POLL_CONCURRENCY) as poller:
+        scheduler = PollScheduler(poller, lambda device, data: save_reading(device, data, database, alerts))
+        for device in inventory.get_devices():
+            if is_pollable(device):
+                scheduler.add_device(device)
         
-        # Access, process, and show data
-        temperature = sensor_data.temperature
-        humidity = sensor_data.humidity
-        information = OrderedDict({ # Use an ordered dict to maintain order in csv file
-            "name": sensor.name, 
-            "temperature": round(CONVERT_TEMP(temperature), 1), 
-            "humidity": humidity,
-            "dew point": round(CONVERT_TEMP(GET_DEW_POINT(temperature, humidity)), 1)
-        })
-        print("{: <35} {: <6} {: <6} {: <6}".format(*information.values()))
+        def follow_inventory(diff: InventoryDiff) -> None:
+            for device in diff.removed:
+                scheduler.remove_device(device.device_id)
+            for device in diff.added:
+                if is_pollable(device):
+                    scheduler.add_device(device)
+            for device in diff.renamed + diff.updated:
+                scheduler.update_device(device)
+            follow_alert_devices(alerts, diff)
+        inventory.subscribe(follow_inventory)
+        inventory.start()
         
-        database.save("THSensor", information)
+        scheduler_thread = threading.Thread(target=scheduler.run, name="scheduler")
+        scheduler_thread.start()
+        try:
+            while scheduler_thread.is_alive():
+                time.sleep(STATS_INTERVAL)
+                stats = scheduler.get_stats()
+                print("Sweeps: {}, mean lag: {:.2f}s, max lag: {:.2f}s, failed readings: {}".format(
+                    stats.sweeps, stats.mean_lag, stats.max_lag, stats.callback_failures))
+                for device_id, rate in stats.poll_rates.items():
+                    print("{: <30} {: >8.1f} polls/h, interval {:.0f}s".format(device_id, rate, stats.intervals[device_id]))
+                print_write_reduction(database)
+                backend = database.backend if isinstance(database, DeduplicatingDatabase) else database
+                if isinstance(backend, SpooledDatabase):
+                    spool = backend.get_stats()
+                    print("Spool: {} pending ({} bytes), oldest {:.0f}s, draining {:.1f}/s, {} dead-lettered".format(
+                        spool.pending, spool.size, spool.backlog_age, spool.drain_rate, spool.dead_lettered))
+                    if isinstance(backend.backend, RollupDatabase):
+                        rollups = backend.backend.get_stats()
+                        print("Rollups: {} values in {} merges of {} buckets, {} readings skipped".format(
+                            rollups.values, rollups.merges, rollups.buckets, rollups.skipped))
+                if alerts is not None:
+                    alert_stats = alerts.get_stats()
+                    print("Alerts: {} firing, {} triggered, {} resolved over {} readings".format(
+                        alert_stats.firing, alert_stats.triggered, alert_stats.resolved, alert_stats.readings))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            inventory.stop()
+            scheduler.stop()
+            scheduler_thread.join()
+
+def follow_alert_devices(alerts: AlertEngine | None, diff: InventoryDiff) -> None:
+    '''
+    Drop the alert state of devices removed from the account, and start tracking the devices added.
+    Devices renamed or updated are picked up by the alert engine with their next reading.
+    '''
+    if alerts is None:
+        return
+    for device in diff.removed:
+        alerts.remove_device(device.device_id)
+    for device in diff.added:
+        if is_pollable(device):
+            alerts.add_device(device)
+
+def supervise_accounts(database: Database) -> None:
+    '''
+    Poll every account in ACCOUNTS from a pool of worker processes, ACCOUNTS_PER_WORKER accounts each, until interrupted.
+    Readings of every worker are saved to the database by this process. Crashed workers are restarted.
+    '''
+    collector = AccountCollector(
+        create_row,
+        sweep_interval = SWEEP_INTERVAL,
+        poll_concurrency = POLL_CONCURRENCY,
+        inventory_cache_path = INVENTORY_CACHE_PATH,
+        inventory_ttl = INVENTORY_TTL
+    )
+    supervisor = AccountSupervisor(group_accounts(ACCOUNTS, ACCOUNTS_PER_WORKER), collector, database)
+    supervisor.start()
+    
+    def report_stats() -> None:
+        while not supervisor.stopped.wait(STATS_INTERVAL):
+            stats = supervisor.get_stats()
+            print("Workers: {} of {} running, {} restarts; {} readings written in {} batches".format(
+                stats.alive, stats.workers, stats.restarts, stats.events, stats.batches))
+            print_write_reduction(database)
+    threading.Thread(target=report_stats, name="supervisor-stats", daemon=True).start()
+    
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+
+def save_reading(device: Device, data: ResponseData, database: Database, alerts: AlertEngine | None = None) -> None:
+    '''
+    Print a reading, save it to the database and evaluate the alert rules on it.
+    '''
+    information = create_row(device, data)
+    print("{: <20} {}".format(device.type, dict(information)))
+    database.save(device.type, information)
+    if alerts is not None:
+        alerts.evaluate(device, data)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file